@@ -0,0 +1,287 @@
+import argparse
+import time
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import pandas as pd
+from sqlalchemy import Boolean, Date, DateTime, Table, func, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app import feature_store, models
+from app.database import SessionLocal, engine
+from app.sensor_ingest import fold_readings
+
+# -----------------------------
+# Bulk data loading
+# -----------------------------
+#
+# Rows are buffered per table and written with Core insert() executemany
+# calls, one transaction per chunk (file loads: one for the whole file).
+# IDs are assigned up front from
+# max(id) + 1, so no flush is needed to learn a parent's primary key.
+# This assumes a single writer per table while a load is running.
+# Sensor readings are folded into the running statistics and rollups in the
+# same transaction, and vehicles whose child rows were written are marked
+# for a derived-feature refresh (see feature_store).
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+LOADABLE_TABLES: Dict[str, Table] = {
+    "dealerships": models.Dealership.__table__,
+    "vehicles": models.Vehicle.__table__,
+    "production_logs": models.ProductionLog.__table__,
+    "service_records": models.ServiceRecord.__table__,
+    "sensor_readings": models.SensorReading.__table__,
+}
+# Child tables the feature store aggregates
+FEATURE_SOURCE_TABLES = {"production_logs", "service_records", "sensor_readings"}
+
+
+class BulkLoadError(ValueError):
+    """A file that cannot be loaded; nothing of it was committed."""
+
+
+class BulkLoader:
+    """
+    Buffers rows for several tables and writes them in chunked transactions.
+
+    Parent tables are always written before their children within a chunk,
+    following the FK order of the metadata. With commit_chunks=False the
+    chunks are only flushed and finish() commits them all at once.
+    """
+
+    def __init__(
+        self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE, commit_chunks: bool = True
+    ):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.commit_chunks = commit_chunks
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._next_ids: Dict[str, int] = {}
+        self.rows_written: Dict[str, int] = {}
+        self._started = time.perf_counter()
+
+    def next_id(self, table: Table) -> int:
+        if table.name not in self._next_ids:
+            current = self.db.execute(select(func.max(table.c.id))).scalar()
+            self._next_ids[table.name] = (current or 0) + 1
+        value = self._next_ids[table.name]
+        self._next_ids[table.name] = value + 1
+        return value
+
+    def reserve_ids(self, table: Table, count: int) -> int:
+        """Reserve a contiguous block of IDs and return the first one."""
+        first = self.next_id(table)
+        self._next_ids[table.name] = first + count
+        return first
+
+    def add(self, table: Table, row: Dict[str, Any]) -> None:
+        if "id" in table.c and row.get("id") is None:
+            row["id"] = self.next_id(table)
+        buffer = self._buffers.setdefault(table.name, [])
+        buffer.append(row)
+        if len(buffer) >= self.chunk_size:
+            self.flush()
+
+    def add_frame(self, table: Table, frame: pd.DataFrame) -> None:
+        """Buffer a whole DataFrame chunk (columns named after table columns)."""
+        for row in frame_to_rows(frame, table):
+            self.add(table, row)
+
+    def flush(self) -> None:
+        if not any(self._buffers.values()):
+            return
+        touched = set()
+        for table in models.Base.metadata.sorted_tables:
+            rows = self._buffers.get(table.name)
+            if rows:
+                if table.name in FEATURE_SOURCE_TABLES:
+                    # Parents of this chunk were inserted above, so they count
+                    self._check_vehicle_ids(table, rows)
+                self.db.execute(insert(table), rows)
+                self.rows_written[table.name] = (
+                    self.rows_written.get(table.name, 0) + len(rows)
+                )
+                if table.name in FEATURE_SOURCE_TABLES:
+                    touched.update(row["vehicle_id"] for row in rows)
+                if table.name == "sensor_readings":
+                    # Keep the running statistics and rollups in step, as
+                    # the ingest endpoint does
+                    fold_readings(self.db, pd.DataFrame(rows))
+        # Derived features of those vehicles are recomputed by the next
+        # feature_store.refresh_stale_features (new vehicles count as missing)
+        feature_store.mark_features_stale(self.db, touched)
+        if self.commit_chunks:
+            self.db.commit()
+        self._buffers = {}
+
+    def _check_vehicle_ids(self, table: Table, rows: List[Dict[str, Any]]) -> None:
+        # SQLite does not enforce the foreign keys, so orphan child rows
+        # would otherwise be committed.
+        ids = {row.get("vehicle_id") for row in rows}
+        if None in ids:
+            raise BulkLoadError(f"Rows of {table.name} without a vehicle_id")
+        ids = sorted(ids)
+        vehicles = models.Vehicle.__table__
+        known = set()
+        for start in range(0, len(ids), feature_store.ID_CHUNK_SIZE):
+            chunk = ids[start : start + feature_store.ID_CHUNK_SIZE]
+            known.update(
+                self.db.execute(select(vehicles.c.id).where(vehicles.c.id.in_(chunk))).scalars()
+            )
+        unknown = [v for v in ids if v not in known]
+        if unknown:
+            raise BulkLoadError(f"Unknown vehicle ids in {table.name}: {unknown[:20]}")
+
+    def finish(self) -> Dict[str, Any]:
+        self.flush()
+        if not self.commit_chunks:
+            self.db.commit()
+        elapsed = time.perf_counter() - self._started
+        total = sum(self.rows_written.values())
+        return {
+            "rows": dict(self.rows_written),
+            "total_rows": total,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(total / elapsed, 1) if elapsed > 0 else None,
+        }
+
+
+def bulk_insert(
+    db: Session,
+    table: Table,
+    rows: Iterable[Dict[str, Any]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    loader = BulkLoader(db, chunk_size=chunk_size)
+    for row in rows:
+        loader.add(table, row)
+    return loader.finish()
+
+
+# -----------------------------
+# File ingestion (CSV / Parquet)
+# -----------------------------
+
+
+def _iter_file_chunks(
+    source: Union[str, Path, IO], file_format: str, chunk_size: int
+) -> Iterator[pd.DataFrame]:
+    if file_format == "csv":
+        yield from pd.read_csv(source, chunksize=chunk_size)
+    elif file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet ingestion requires pyarrow to be installed.") from exc
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported file format: {file_format!r}")
+
+
+def required_columns(table: Table) -> List[str]:
+    # NOT NULL columns the database cannot fill in; ids are assigned here.
+    # vehicle_id is nullable in the schema, but a feature source row
+    # without a vehicle is meaningless.
+    return [
+        c.name
+        for c in table.columns
+        if (not c.nullable and c.name != "id" and c.default is None and c.server_default is None)
+        or (table.name in FEATURE_SOURCE_TABLES and c.name == "vehicle_id")
+    ]
+
+
+def check_frame(frame: pd.DataFrame, table: Table) -> None:
+    """Raise BulkLoadError for missing or empty NOT NULL columns."""
+    required = required_columns(table)
+    missing = [c for c in required if c not in frame.columns]
+    if missing:
+        raise BulkLoadError(f"Missing required columns for {table.name}: {missing}")
+    empty = [c for c in required if frame[c].isna().any()]
+    if empty:
+        raise BulkLoadError(f"Empty values in required columns of {table.name}: {empty}")
+
+
+def frame_to_rows(frame: pd.DataFrame, table: Table) -> List[Dict[str, Any]]:
+    # Coerce export columns to what the Core column types expect
+    # (SQLite's Date/DateTime types only accept Python date/datetime).
+    frame = frame[[c for c in frame.columns if c in table.c]].copy()
+    for name in frame.columns:
+        col_type = table.c[name].type
+        if isinstance(col_type, DateTime):
+            frame[name] = pd.to_datetime(frame[name], format="ISO8601")
+        elif isinstance(col_type, Date):
+            frame[name] = pd.to_datetime(frame[name], format="ISO8601").dt.date
+        elif isinstance(col_type, Boolean):
+            frame[name] = frame[name].astype(bool)
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict("records")
+
+
+def load_file(
+    db: Session,
+    source: Union[str, Path, IO],
+    table_name: str,
+    file_format: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, Any]:
+    """
+    Stream a CSV or Parquet fleet export into one table. Only one chunk of
+    the file is held in memory at a time. Rows without an id get one
+    assigned; export columns that are not table columns are ignored.
+    The file is loaded in a single transaction: on any error (missing
+    required columns, duplicate ids, unknown vehicle ids, constraint
+    violations) it is rolled back and BulkLoadError is raised, so nothing
+    of the file is kept.
+    """
+    if table_name not in LOADABLE_TABLES:
+        raise ValueError(f"Unknown table {table_name!r}")
+    table = LOADABLE_TABLES[table_name]
+
+    if file_format is None:
+        suffix = Path(getattr(source, "name", str(source))).suffix.lower()
+        file_format = "parquet" if suffix in (".parquet", ".pq") else "csv"
+
+    loader = BulkLoader(db, chunk_size=chunk_size, commit_chunks=False)
+    rows_read = 0
+    try:
+        for frame in _iter_file_chunks(source, file_format, chunk_size):
+            check_frame(frame, table)
+            loader.add_frame(table, frame)
+            loader.flush()
+            rows_read += len(frame)
+        return loader.finish()
+    except DBAPIError as exc:
+        db.rollback()
+        detail = str(getattr(exc, "orig", exc))
+        raise BulkLoadError(
+            f"Load into {table_name} failed after {rows_read} rows and was rolled back: {detail}"
+        ) from exc
+    except Exception:
+        db.rollback()
+        raise
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Bulk-load a CSV or Parquet fleet export into the warranty DB."
+    )
+    parser.add_argument("path", help="CSV or Parquet file")
+    parser.add_argument("--table", required=True, choices=sorted(LOADABLE_TABLES))
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        stats = load_file(db, args.path, args.table, args.format, args.chunk_size)
+    finally:
+        db.close()
+    print("Loaded:", stats)
+
+
+if __name__ == "__main__":
+    main()
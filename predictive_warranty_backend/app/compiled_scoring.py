@@ -0,0 +1,363 @@
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# Compiled NumPy scorers
+# -----------------------------
+#
+# A trained Pipeline(prep=ColumnTransformer[StandardScaler, OneHotEncoder],
+# est=...) is flattened into plain arrays: scaler means/scales, one
+# category -> column lookup per categorical feature, and the estimator's
+# tree arrays, linear/MLP weights, SVM support vectors or Nystroem feature
+# map. Scoring then skips DataFrame construction, ColumnTransformer dispatch
+# and sklearn input validation, which dominate the cost of scoring one or a
+# few vehicles.
+#
+# A compiled scorer is only used after it reproduced the pipeline's
+# probabilities on a sample; anything unsupported keeps using the pipeline.
+
+COMPILED_SCORING_ENABLED = os.environ.get("WARRANTY_COMPILED_SCORING", "1") != "0"
+VERIFY_ATOL = 1e-6
+SVM_ROW_CHUNK = 4096
+
+EstimatorFn = Callable[[np.ndarray], np.ndarray]
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    # Same clipping as sklearn's expit-based logistic activation
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -500, 500)))
+
+
+def _compile_tree(estimator) -> EstimatorFn:
+    tree = estimator.tree_
+    left = tree.children_left.copy()
+    right = tree.children_right.copy()
+    feature = tree.feature.copy()
+    threshold = tree.threshold.copy()
+    values = tree.value[:, 0, :]
+    leaf_proba = values[:, 1] / values.sum(axis=1)
+    depth = tree.max_depth
+    is_leaf = left == -1
+    # Leaves point at themselves so every row can take the same number of steps
+    left[is_leaf] = np.flatnonzero(is_leaf)
+    right[is_leaf] = np.flatnonzero(is_leaf)
+    feature[is_leaf] = 0
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        # sklearn trees split on float32 inputs
+        X32 = X.astype(np.float32)
+        rows = np.arange(len(X32))
+        node = np.zeros(len(X32), dtype=np.intp)
+        for _ in range(depth):
+            go_left = X32[rows, feature[node]] <= threshold[node]
+            node = np.where(go_left, left[node], right[node])
+        return leaf_proba[node]
+
+    return predict
+
+
+_MLP_ACTIVATIONS = {
+    "relu": lambda z: np.maximum(z, 0.0),
+    "tanh": np.tanh,
+    "logistic": _sigmoid,
+    "identity": lambda z: z,
+}
+
+
+def _compile_mlp(estimator) -> Optional[EstimatorFn]:
+    if estimator.out_activation_ != "logistic" or estimator.activation not in _MLP_ACTIVATIONS:
+        return None
+    weights = [np.asarray(w, dtype=np.float64) for w in estimator.coefs_]
+    biases = [np.asarray(b, dtype=np.float64) for b in estimator.intercepts_]
+    hidden = _MLP_ACTIVATIONS[estimator.activation]
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        a = X
+        for w, b in zip(weights[:-1], biases[:-1]):
+            a = hidden(a @ w + b)
+        return _sigmoid(a @ weights[-1] + biases[-1])[:, 0]
+
+    return predict
+
+
+def _compile_linear(estimator) -> Optional[EstimatorFn]:
+    # Logistic-loss linear models: P(positive) = sigmoid(X @ w + b)
+    if type(estimator).__name__ == "SGDClassifier" and estimator.loss != "log_loss":
+        return None
+    weights = np.asarray(estimator.coef_, dtype=np.float64).ravel()
+    intercept = float(np.ravel(estimator.intercept_)[0])
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        return _sigmoid(X @ weights + intercept)
+
+    return predict
+
+
+def _libsvm_binary_coupling(r: np.ndarray) -> np.ndarray:
+    """
+    libsvm's multiclass_probability() for two classes, vectorized over rows.
+    sklearn's bundled libsvm runs this iterative solver even for binary
+    problems, stopping at a loose tolerance, so returning the pairwise
+    sigmoid directly would be off by up to ~1e-3.
+    r is P(first class) from the Platt sigmoid; returns P(second class).
+    """
+    k = 2
+    n = len(r)
+    r01 = r
+    r10 = 1.0 - r
+    q = np.empty((n, 2, 2))
+    q[:, 0, 0] = r10 * r10
+    q[:, 1, 1] = r01 * r01
+    q[:, 0, 1] = q[:, 1, 0] = -r10 * r01
+    p = np.full((n, 2), 1.0 / k)
+    eps = 0.005 / k
+    active = np.arange(n)
+    for _ in range(max(100, k)):
+        if active.size == 0:
+            break
+        qa = q[active]
+        pa = p[active]
+        qp = np.einsum("nij,nj->ni", qa, pa)
+        pqp = (pa * qp).sum(axis=1)
+        max_error = np.abs(qp - pqp[:, None]).max(axis=1)
+        converged = max_error < eps
+        for t in range(k):
+            diff = (-qp[:, t] + pqp) / qa[:, t, t]
+            diff[converged] = 0.0
+            pa[:, t] += diff
+            scale = 1.0 + diff
+            pqp = (pqp + diff * (diff * qa[:, t, t] + 2 * qp[:, t])) / scale**2
+            qp = (qp + diff[:, None] * qa[:, t, :]) / scale[:, None]
+            pa /= scale[:, None]
+        p[active] = pa
+        active = active[~converged]
+    return p[:, 1]
+
+
+def _compile_svc(estimator) -> Optional[EstimatorFn]:
+    if estimator.kernel != "rbf" or estimator.probA_.size != 1:
+        return None
+    sv = estimator.support_vectors_
+    sv = np.asarray(sv.toarray() if hasattr(sv, "toarray") else sv, dtype=np.float64)
+    sv_sq = (sv**2).sum(axis=1)
+    dual_coef = np.asarray(
+        estimator._dual_coef_.toarray()
+        if hasattr(estimator._dual_coef_, "toarray")
+        else estimator._dual_coef_,
+        dtype=np.float64,
+    )[0]
+    intercept = float(estimator._intercept_[0])
+    gamma = float(estimator._gamma)
+    prob_a = float(estimator.probA_[0])
+    prob_b = float(estimator.probB_[0])
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        out = np.empty(len(X))
+        for start in range(0, len(X), SVM_ROW_CHUNK):
+            x = X[start : start + SVM_ROW_CHUNK]
+            sq_dist = (x**2).sum(axis=1)[:, None] + sv_sq[None, :] - 2.0 * x @ sv.T
+            kernel = np.exp(-gamma * np.maximum(sq_dist, 0.0))
+            # libsvm's decision value; its Platt sigmoid gives P(classes_[0])
+            dec = kernel @ dual_coef + intercept
+            p_first = np.clip(_sigmoid(-(dec * prob_a + prob_b)), 1e-7, 1 - 1e-7)
+            out[start : start + len(x)] = _libsvm_binary_coupling(p_first)
+        return out
+
+    return predict
+
+
+def _compile_nystroem_svm(estimator) -> Optional[EstimatorFn]:
+    # Explicit RBF feature map -> linear decision -> Platt sigmoid
+    feature_map = estimator.feature_map_
+    if feature_map.kernel != "rbf":
+        return None
+    components = np.asarray(feature_map.components_, dtype=np.float64)
+    components_sq = (components**2).sum(axis=1)
+    normalization_t = np.asarray(feature_map.normalization_, dtype=np.float64).T
+    gamma = float(feature_map.gamma)
+    weights = np.asarray(estimator.classifier_.coef_, dtype=np.float64).ravel()
+    intercept = float(np.ravel(estimator.classifier_.intercept_)[0])
+    platt_a = float(np.ravel(estimator.calibrator_.coef_)[0])
+    platt_b = float(np.ravel(estimator.calibrator_.intercept_)[0])
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        out = np.empty(len(X))
+        for start in range(0, len(X), SVM_ROW_CHUNK):
+            x = X[start : start + SVM_ROW_CHUNK]
+            sq_dist = (x**2).sum(axis=1)[:, None] + components_sq[None, :] - 2.0 * x @ components.T
+            mapped = np.exp(-gamma * np.maximum(sq_dist, 0.0)) @ normalization_t
+            dec = mapped @ weights + intercept
+            out[start : start + len(x)] = _sigmoid(platt_a * dec + platt_b)
+        return out
+
+    return predict
+
+
+def _compile_estimator(estimator) -> Optional[EstimatorFn]:
+    if list(getattr(estimator, "classes_", [])) != [0, 1]:
+        return None
+    kind = type(estimator).__name__
+    if kind == "DecisionTreeClassifier":
+        return _compile_tree(estimator)
+    if kind in ("SGDClassifier", "LogisticRegression"):
+        return _compile_linear(estimator)
+    if kind == "MLPClassifier":
+        return _compile_mlp(estimator)
+    if kind == "SVC":
+        return _compile_svc(estimator)
+    if kind == "NystroemSVM":
+        return _compile_nystroem_svm(estimator)
+    return None
+
+
+class CompiledScorer:
+    """NumPy-only equivalent of a fitted preprocessing + classifier pipeline."""
+
+    def __init__(
+        self,
+        feature_numeric: List[str],
+        feature_categorical: List[str],
+        mean: np.ndarray,
+        scale: np.ndarray,
+        categories: List[np.ndarray],
+        estimator_fn: EstimatorFn,
+    ):
+        self.feature_numeric = feature_numeric
+        self.feature_categorical = feature_categorical
+        self.mean = mean
+        self.scale = scale
+        self.category_index = [pd.Index(cats) for cats in categories]
+        self.category_lookup = [{c: i for i, c in enumerate(cats)} for cats in categories]
+        offsets = np.cumsum([len(mean)] + [len(cats) for cats in categories])
+        self.offsets = offsets[:-1]
+        self.n_features = int(offsets[-1])
+        self.estimator_fn = estimator_fn
+        # Equal keys mean identical encoded matrices, so models of one
+        # training run can share a single encode (see predict_with_registry)
+        self.preprocessing_key = (
+            mean.tobytes(),
+            scale.tobytes(),
+            tuple(tuple(index) for index in self.category_index),
+        )
+
+    def _transform(self, numeric: np.ndarray, codes: List[np.ndarray]) -> np.ndarray:
+        n = len(numeric)
+        X = np.zeros((n, self.n_features))
+        X[:, : len(self.mean)] = (numeric - self.mean) / self.scale
+        rows = np.arange(n)
+        for offset, idx in zip(self.offsets, codes):
+            # Unknown categories stay all-zero, like handle_unknown="ignore"
+            known = idx >= 0
+            X[rows[known], offset + idx[known]] = 1.0
+        return X
+
+    def encode_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        numeric = frame[self.feature_numeric].to_numpy(dtype=np.float64)
+        codes = [
+            index.get_indexer(frame[col].astype(object))
+            for index, col in zip(self.category_index, self.feature_categorical)
+        ]
+        return self._transform(numeric, codes)
+
+    def encode_vehicles(self, vehicles: Sequence[Any]) -> np.ndarray:
+        numeric = np.array(
+            [[getattr(v, col) for col in self.feature_numeric] for v in vehicles],
+            dtype=np.float64,
+        ).reshape(len(vehicles), len(self.feature_numeric))
+        codes = [
+            np.array([lookup.get(getattr(v, col), -1) for v in vehicles], dtype=np.intp)
+            for lookup, col in zip(self.category_lookup, self.feature_categorical)
+        ]
+        return self._transform(numeric, codes)
+
+    def encode(self, vehicles: Union[Sequence[Any], pd.DataFrame]) -> np.ndarray:
+        """Preprocessed feature matrix, as the pipeline's prep step would build it."""
+        if isinstance(vehicles, pd.DataFrame):
+            return self.encode_frame(vehicles)
+        return self.encode_vehicles(vehicles)
+
+    def predict_frame(self, frame: pd.DataFrame) -> np.ndarray:
+        if len(frame) == 0:
+            return np.empty(0, dtype=float)
+        return self.estimator_fn(self.encode_frame(frame))
+
+    def predict_vehicles(self, vehicles: Sequence[Any]) -> np.ndarray:
+        if len(vehicles) == 0:
+            return np.empty(0, dtype=float)
+        return self.estimator_fn(self.encode_vehicles(vehicles))
+
+    def predict(self, vehicles: Union[Sequence[Any], pd.DataFrame]) -> np.ndarray:
+        if isinstance(vehicles, pd.DataFrame):
+            return self.predict_frame(vehicles)
+        return self.predict_vehicles(vehicles)
+
+
+def compile_pipeline(
+    pipe,
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    sample: Optional[pd.DataFrame] = None,
+) -> Optional[CompiledScorer]:
+    """
+    Compile a fitted pipeline, or return None if its layout or estimator is
+    not supported. With a sample frame, the compiled probabilities must
+    match pipe.predict_proba within VERIFY_ATOL or None is returned.
+    """
+    try:
+        prep = pipe.named_steps["prep"]
+        estimator = pipe.named_steps["est"]
+        transformers = {name: (trans, cols) for name, trans, cols in prep.transformers_}
+        scaler, num_cols = transformers["num"]
+        encoder, cat_cols = transformers["cat"]
+    except (AttributeError, KeyError, ValueError):
+        return None
+    if [name for name, *_ in prep.transformers_ if name != "remainder"] != ["num", "cat"]:
+        return None
+    if list(num_cols) != feature_numeric or list(cat_cols) != feature_categorical:
+        return None
+    if type(scaler).__name__ != "StandardScaler" or type(encoder).__name__ != "OneHotEncoder":
+        return None
+    if encoder.handle_unknown != "ignore" or encoder.drop_idx_ is not None:
+        return None
+    if getattr(encoder, "_infrequent_enabled", False):
+        return None
+
+    estimator_fn = _compile_estimator(estimator)
+    if estimator_fn is None:
+        return None
+
+    n_num = len(feature_numeric)
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_num)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_num)
+    scorer = CompiledScorer(
+        feature_numeric,
+        feature_categorical,
+        np.asarray(mean, dtype=np.float64),
+        np.asarray(scale, dtype=np.float64),
+        list(encoder.categories_),
+        estimator_fn,
+    )
+
+    if sample is not None and len(sample):
+        expected = pipe.predict_proba(sample[feature_numeric + feature_categorical])[:, 1]
+        if not np.allclose(scorer.predict_frame(sample), expected, rtol=0, atol=VERIFY_ATOL):
+            return None
+    return scorer
+
+
+def compile_registry(
+    registry: Dict[str, Dict[str, Any]],
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    sample: Optional[pd.DataFrame] = None,
+) -> None:
+    """Attach a verified compiled scorer (or None) to every registry entry."""
+    for entry in registry.values():
+        entry["compiled"] = (
+            compile_pipeline(entry["pipeline"], feature_numeric, feature_categorical, sample)
+            if COMPILED_SCORING_ENABLED
+            else None
+        )
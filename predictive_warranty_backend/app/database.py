@@ -1,16 +1,87 @@
+import os
+
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 
 # -----------------------------
 # Database setup
 # -----------------------------
+#
+# The URL comes from WARRANTY_DATABASE_URL, so the same models can run on
+# any SQLAlchemy backend. For SQLite every new connection is switched to
+# WAL (readers no longer block on a writer and vice versa) and waits on a
+# busy lock instead of failing with "database is locked".
+
+DATABASE_URL = os.environ.get("WARRANTY_DATABASE_URL", "sqlite:///./warranty.db")
+
+# Sync endpoints run in Starlette's threadpool (40 threads by default), so
+# the pool holds one connection per worker thread, plus overflow for the
+# background training thread and streaming exports.
+POOL_SIZE = int(os.environ.get("WARRANTY_DB_POOL_SIZE", "40"))
+MAX_OVERFLOW = int(os.environ.get("WARRANTY_DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_SECONDS = float(os.environ.get("WARRANTY_DB_POOL_TIMEOUT", "30"))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": int(os.environ.get("WARRANTY_SQLITE_BUSY_TIMEOUT_MS", "30000")),
+    # NORMAL is durable against app crashes in WAL mode; only an OS crash
+    # can lose the last transactions.
+    "synchronous": os.environ.get("WARRANTY_SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Negative cache_size is in KiB: 64 MiB page cache per connection
+    "cache_size": int(os.environ.get("WARRANTY_SQLITE_CACHE_SIZE", "-65536")),
+    "mmap_size": int(os.environ.get("WARRANTY_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL) -> Engine:
+    if not is_sqlite(url):
+        return create_engine(
+            url,
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT_SECONDS,
+            pool_pre_ping=True,
+        )
+
+    database = make_url(url).database
+    if not database or database == ":memory:":
+        # In-memory databases are per connection, so there is nothing to
+        # pool or to switch to WAL.
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT_SECONDS,
+    )
+    event.listen(db_engine, "connect", _apply_sqlite_pragmas)
+    return db_engine
 
-DATABASE_URL = "sqlite:///./warranty.db"
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+engine = create_db_engine()
+# expire_on_commit=False: endpoints commit cache writes (e.g. freshly computed
+# risk scores) mid-request and keep using the loaded rows; expiring them
+# would reload every row with one extra query each.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
@@ -19,4 +90,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
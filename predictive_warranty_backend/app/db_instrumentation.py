@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import metrics
+
+# -----------------------------
+# Per-request SQL instrumentation
+# -----------------------------
+#
+# Engine-level cursor hooks add every executed statement to the QueryStats
+# object of the current context. A ContextVar carries that object into
+# FastAPI's threadpool (the context is copied, the object is shared), so
+# one request's counts never mix with another's.
+
+
+class QueryStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self) -> None:
+        self.statements = 0
+        self.seconds = 0.0
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+    metrics.observe_statement(statement, elapsed)
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += elapsed
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Count SQL statements and DB time for the enclosed block, e.g.
+
+        with track_queries() as stats:
+            client.get("/vehicles")
+        assert stats.statements <= 3
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
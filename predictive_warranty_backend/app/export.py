@@ -0,0 +1,152 @@
+import io
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app import feature_store
+from app.database import SessionLocal
+from app.generate_synthetic_data_and_train import (
+    buckets_from_risk,
+    predict_with_entry,
+)
+from app.models import Dealership, Vehicle
+from app.vehicle_queries import VehicleFilters
+
+# -----------------------------
+# Streaming fleet score export
+# -----------------------------
+#
+# The fleet is read in id-ordered chunks with a column-projected query,
+# each chunk is scored with one predict_proba call and encoded on its own,
+# so memory stays bounded by the chunk size and the first rows go out as
+# soon as the first chunk is scored.
+
+DEFAULT_EXPORT_CHUNK_SIZE = 5000
+
+EXPORT_COLUMNS = [
+    Vehicle.id,
+    Vehicle.vin,
+    Vehicle.model,
+    Vehicle.model_year,
+    Vehicle.mileage,
+    Vehicle.age_months,
+    Vehicle.region,
+    Vehicle.supplier_code,
+    Vehicle.plant_code,
+    Dealership.name.label("dealership_name"),
+    Vehicle.avg_engine_temp,
+    Vehicle.avg_vibration,
+    Vehicle.services_last_12m,
+    Vehicle.failure_label,
+]
+EXPORT_COLUMN_NAMES = [c.key for c in EXPORT_COLUMNS]
+# Read for scoring only; not part of the export
+DERIVED_COLUMNS = feature_store.derived_columns()
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def iter_scored_chunks(
+    db: Session,
+    model_name: str,
+    entry: Dict[str, Any],
+    filters: Optional[VehicleFilters] = None,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    last_id = 0
+    while True:
+        query = feature_store.join_features(
+            db.query(*EXPORT_COLUMNS, *DERIVED_COLUMNS).outerjoin(
+                Dealership, Vehicle.dealership_id == Dealership.id
+            )
+        )
+        if filters is not None:
+            query = filters.apply(query)
+        rows = (
+            query.filter(Vehicle.id > last_id)
+            .order_by(Vehicle.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not rows:
+            return
+
+        frame = pd.DataFrame(rows, columns=EXPORT_COLUMN_NAMES + feature_store.DERIVED_FEATURES)
+        frame["dealership_name"] = frame["dealership_name"].fillna("N/A")
+        frame["failure_label"] = frame["failure_label"].astype(bool)
+        scores = predict_with_entry(entry, frame)
+        frame = frame.drop(columns=feature_store.DERIVED_FEATURES)
+        frame["risk_score"] = scores
+        frame["risk_bucket"] = buckets_from_risk(scores)
+        frame["model_name"] = model_name
+        frame["model_version"] = entry["version"]
+        yield frame
+
+        last_id = int(frame["id"].iloc[-1])
+        if len(rows) < chunk_size:
+            return
+
+
+def _encode_ndjson(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    for frame in chunks:
+        yield frame.to_json(orient="records", lines=True).encode()
+
+
+def _encode_csv(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    header = True
+    for frame in chunks:
+        yield frame.to_csv(index=False, header=header).encode()
+        header = False
+
+
+def _encode_arrow(chunks: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    import pyarrow as pa
+
+    sink = io.BytesIO()
+    writer = None
+    for frame in chunks:
+        batch = pa.RecordBatch.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+ENCODERS = {"ndjson": _encode_ndjson, "csv": _encode_csv, "arrow": _encode_arrow}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_export(
+    export_format: str,
+    model_name: str,
+    entry: Dict[str, Any],
+    filters: Optional[VehicleFilters] = None,
+    chunk_size: int = DEFAULT_EXPORT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Generator for a StreamingResponse. It owns its DB session because the
+    request-scoped one from get_db is closed before the body is streamed.
+    """
+    db = SessionLocal()
+    try:
+        chunks = iter_scored_chunks(db, model_name, entry, filters, chunk_size)
+        yield from ENCODERS[export_format](chunks)
+    finally:
+        db.close()
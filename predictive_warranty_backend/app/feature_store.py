@@ -0,0 +1,420 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import (
+    bindparam,
+    delete,
+    event,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.orm import Session
+
+from app import models, risk_scores
+from app.sensor_timeseries import METRICS, ROLLUP_RESOLUTIONS
+
+# -----------------------------
+# Derived-feature store
+# -----------------------------
+#
+# vehicle_features holds one row of model features per vehicle, aggregated
+# from its child tables with set-based SQL (GROUP BY vehicle_id over an id
+# chunk):
+#   service_records   visit count, cost sum, repeated fault codes. Warranty
+#                     claims are left out: in this data they are recorded
+#                     because of the failure being predicted (label leak).
+#   vehicle_sensor_stats  reading standard deviations (all components)
+#   sensor_rollups    temperature/vibration trend, a count-weighted
+#                     least-squares slope per day over TREND_RESOLUTION
+#                     buckets (the slope itself is taken in pandas)
+#   production_logs   assembly line, shift and ambient temperature
+#
+# The trend fits are kept as their running sums (TREND_SUMS, x in days
+# since TREND_EPOCH), which add up across batches like the Welford stats.
+#
+# Training and scoring outer-join the table on its primary key, so a
+# vehicle without a row yet reads DERIVED_DEFAULTS. Rows are refreshed
+# only for vehicles whose child rows changed:
+#   - ORM writes to child rows refresh in the same flush (hook below);
+#   - sensor ingestion folds its batch into the sensor features of its
+#     vehicles from the batch alone (fold_sensor_features);
+#   - bulk loads mark the touched rows stale, and refresh_stale_features
+#     (startup, incremental training, /admin/features/refresh) recomputes
+#     stale and missing rows.
+# A refresh drops the refreshed vehicles' cached risk scores.
+
+DERIVED_NUMERIC = [
+    "service_count",
+    "service_cost_total",
+    "repeat_fault_count",
+    "temperature_std",
+    "vibration_std",
+    "pressure_std",
+    "temperature_trend",
+    "vibration_trend",
+    "ambient_temp",
+]
+DERIVED_CATEGORICAL = ["production_line", "production_shift"]
+DERIVED_FEATURES = DERIVED_NUMERIC + DERIVED_CATEGORICAL
+DERIVED_DEFAULTS: Dict[str, Any] = {
+    **{col: 0.0 for col in DERIVED_NUMERIC},
+    "service_count": 0,
+    "repeat_fault_count": 0,
+    **{col: "unknown" for col in DERIVED_CATEGORICAL},
+}
+
+# Running terms of the trend fits, stored next to the features
+TREND_SUMS = [
+    "trend_weight_sum",
+    "trend_x_sum",
+    "trend_xx_sum",
+    "trend_temperature_sum",
+    "trend_x_temperature_sum",
+    "trend_vibration_sum",
+    "trend_x_vibration_sum",
+]
+STORED_COLUMNS = DERIVED_FEATURES + TREND_SUMS
+STORED_DEFAULTS: Dict[str, Any] = {**DERIVED_DEFAULTS, **{col: 0.0 for col in TREND_SUMS}}
+# Origin of the trend x axis; a fixed one keeps the sums additive
+TREND_EPOCH = pd.Timestamp("2020-01-01")
+
+# Rollup width the trends are fitted on: the widest stored resolution not
+# above the configured one (the finest if none is)
+_TREND_RESOLUTION_SETTING = int(os.environ.get("WARRANTY_FEATURE_TREND_RESOLUTION", "3600"))
+TREND_RESOLUTION = max(
+    [r for r in ROLLUP_RESOLUTIONS if r <= _TREND_RESOLUTION_SETTING] or [ROLLUP_RESOLUTIONS[0]]
+)
+ID_CHUNK_SIZE = 500
+# Vehicles per transaction in refresh_stale_features
+REFRESH_COMMIT_SIZE = 5000
+
+features_table = models.VehicleFeatures.__table__
+vehicle_table = models.Vehicle.__table__
+service_table = models.ServiceRecord.__table__
+stats_table = models.VehicleSensorStats.__table__
+rollup_table = models.SensorRollup.__table__
+production_table = models.ProductionLog.__table__
+CHILD_MODELS = (models.ServiceRecord, models.SensorReading, models.ProductionLog)
+
+
+def derived_columns() -> List[Any]:
+    """
+    Select columns for the derived features of a query that outer-joins
+    vehicle_features, with the defaults filled in for missing rows.
+    """
+    return [
+        func.coalesce(features_table.c[col], DERIVED_DEFAULTS[col]).label(col)
+        for col in DERIVED_FEATURES
+    ]
+
+
+def join_features(query, vehicle_id_column=vehicle_table.c.id):
+    return query.outerjoin(features_table, features_table.c.vehicle_id == vehicle_id_column)
+
+
+def derived_values(features: Optional[models.VehicleFeatures]) -> Dict[str, Any]:
+    """Derived features of one vehicle from its (possibly missing) ORM row."""
+    if features is None:
+        return dict(DERIVED_DEFAULTS)
+    return {col: getattr(features, col) for col in DERIVED_FEATURES}
+
+
+# -----------------------------
+# Computation
+# -----------------------------
+
+
+def _service_features(db: Session, ids: Sequence[int]) -> pd.DataFrame:
+    sr = service_table.c
+    rows = db.execute(
+        select(
+            sr.vehicle_id,
+            func.count().label("service_count"),
+            func.sum(sr.cost).label("service_cost_total"),
+            (func.count() - func.count(sr.fault_code.distinct())).label("repeat_fault_count"),
+        )
+        .where(sr.vehicle_id.in_(ids))
+        .group_by(sr.vehicle_id)
+    ).all()
+    columns = ["vehicle_id", "service_count", "service_cost_total", "repeat_fault_count"]
+    return pd.DataFrame(rows, columns=columns).set_index("vehicle_id")
+
+
+def _spreads(stats: pd.DataFrame) -> pd.DataFrame:
+    # stats: count and m2_<metric> columns of all-component running stats
+    out = pd.DataFrame(index=stats.index)
+    dof = (stats["count"] - 1).where(stats["count"] > 1)
+    for metric in METRICS:
+        # The SQL rebuild's M2 can come out a hair below zero
+        out[f"{metric}_std"] = np.sqrt(stats[f"m2_{metric}"].clip(lower=0.0) / dof).fillna(0.0)
+    return out
+
+
+def _sensor_spread_features(db: Session, ids: Sequence[int]) -> pd.DataFrame:
+    st = stats_table.c
+    m2_columns = [f"m2_{metric}" for metric in METRICS]
+    rows = db.execute(
+        select(st.vehicle_id, st.count, *[st[c] for c in m2_columns]).where(
+            st.component == "*", st.vehicle_id.in_(ids)
+        )
+    ).all()
+    stats = pd.DataFrame(rows, columns=["vehicle_id", "count"] + m2_columns)
+    return _spreads(stats.set_index("vehicle_id"))
+
+
+def _trend_sums(
+    vehicle_id: pd.Series,
+    bucket_start: pd.Series,
+    weight: np.ndarray,
+    temperature: np.ndarray,
+    vibration: np.ndarray,
+) -> pd.DataFrame:
+    """
+    Per-vehicle TREND_SUMS of buckets (weight = reading count, metrics =
+    sums of readings) or of raw readings (weight 1, metrics = values).
+    """
+    x = ((pd.to_datetime(bucket_start) - TREND_EPOCH).dt.total_seconds() / 86400.0).to_numpy()
+    w = np.asarray(weight, dtype=float)
+    terms = pd.DataFrame({"vehicle_id": np.asarray(vehicle_id)})
+    terms["trend_weight_sum"] = w
+    terms["trend_x_sum"] = w * x
+    terms["trend_xx_sum"] = w * x * x
+    for metric, sums in (("temperature", temperature), ("vibration", vibration)):
+        sums = np.asarray(sums, dtype=float)
+        terms[f"trend_{metric}_sum"] = sums
+        terms[f"trend_x_{metric}_sum"] = x * sums
+    return terms.groupby("vehicle_id").sum()
+
+
+def trend_from_sums(sums: pd.DataFrame) -> pd.DataFrame:
+    """Weighted least-squares slopes per day from TREND_SUMS columns."""
+    w = sums["trend_weight_sum"]
+    wx = sums["trend_x_sum"]
+    wxx = sums["trend_xx_sum"]
+    denominator = w * wxx - wx**2
+    # Far from the epoch w * wxx is large, and all weight in one bucket
+    # leaves only rounding noise: that has no slope
+    valid = denominator > 1e-12 * w * wxx
+    out = pd.DataFrame(index=sums.index)
+    for metric in ("temperature", "vibration"):
+        numerator = w * sums[f"trend_x_{metric}_sum"] - wx * sums[f"trend_{metric}_sum"]
+        out[f"{metric}_trend"] = (numerator / denominator.where(valid)).fillna(0.0)
+    return out
+
+
+def _trend_features(db: Session, ids: Sequence[int]) -> pd.DataFrame:
+    # Buckets of all components summed per vehicle and time
+    ru = rollup_table.c
+    rows = db.execute(
+        select(
+            ru.vehicle_id,
+            ru.bucket_start,
+            func.sum(ru.count),
+            func.sum(ru.sum_temperature),
+            func.sum(ru.sum_vibration),
+        )
+        .where(ru.resolution_seconds == TREND_RESOLUTION, ru.vehicle_id.in_(ids))
+        .group_by(ru.vehicle_id, ru.bucket_start)
+    ).all()
+    buckets = pd.DataFrame(
+        rows, columns=["vehicle_id", "bucket_start", "w", "temperature", "vibration"]
+    )
+    if buckets.empty:
+        return pd.DataFrame(columns=TREND_SUMS + ["temperature_trend", "vibration_trend"])
+    sums = _trend_sums(
+        buckets["vehicle_id"],
+        buckets["bucket_start"],
+        buckets["w"],
+        buckets["temperature"],
+        buckets["vibration"],
+    )
+    return sums.join(trend_from_sums(sums))
+
+
+def _production_features(db: Session, ids: Sequence[int]) -> pd.DataFrame:
+    pl = production_table.c
+    rows = db.execute(
+        select(
+            pl.vehicle_id,
+            func.avg(pl.ambient_temp).label("ambient_temp"),
+            func.max(pl.line).label("production_line"),
+            func.max(pl.shift).label("production_shift"),
+        )
+        .where(pl.vehicle_id.in_(ids))
+        .group_by(pl.vehicle_id)
+    ).all()
+    return pd.DataFrame(
+        rows, columns=["vehicle_id", "ambient_temp", "production_line", "production_shift"]
+    ).set_index("vehicle_id")
+
+
+def compute_vehicle_features(db: Session, vehicle_ids: Sequence[int]) -> pd.DataFrame:
+    """
+    Stored feature columns of the given vehicles, one row per id in input
+    order (vehicle_id column plus STORED_COLUMNS), defaults where a vehicle
+    has no child rows.
+    """
+    ids = [int(v) for v in vehicle_ids]
+    parts: List[pd.DataFrame] = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk = ids[start : start + ID_CHUNK_SIZE]
+        frame = pd.DataFrame(index=pd.Index(chunk, name="vehicle_id"))
+        for part in (
+            _service_features(db, chunk),
+            _sensor_spread_features(db, chunk),
+            _trend_features(db, chunk),
+            _production_features(db, chunk),
+        ):
+            frame = frame.join(part)
+        parts.append(frame)
+    if not parts:
+        return pd.DataFrame(columns=["vehicle_id"] + STORED_COLUMNS)
+
+    frame = pd.concat(parts)
+    for col in STORED_COLUMNS:
+        default = STORED_DEFAULTS[col]
+        # Columns of a chunk without any child rows come back as object
+        frame[col] = frame[col].infer_objects().fillna(default).astype(type(default))
+    return frame[STORED_COLUMNS].reset_index()
+
+
+# -----------------------------
+# Refresh
+# -----------------------------
+
+
+def refresh_vehicle_features(db: Session, vehicle_ids: Sequence[int]) -> int:
+    """
+    Recompute and store the features of the given vehicles in the caller's
+    transaction (no commit), dropping their cached risk scores.
+    Returns the number of rows written.
+    """
+    ids = sorted({int(v) for v in vehicle_ids})
+    refreshed_at = datetime.utcnow()
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk = ids[start : start + ID_CHUNK_SIZE]
+        frame = compute_vehicle_features(db, chunk)
+        frame["stale"] = False
+        frame["refreshed_at"] = refreshed_at
+        db.execute(delete(features_table).where(features_table.c.vehicle_id.in_(chunk)))
+        db.execute(insert(features_table), frame.astype(object).to_dict("records"))
+        risk_scores.invalidate_vehicle_scores(db, chunk)
+    return len(ids)
+
+
+def fold_sensor_features(db: Session, readings: pd.DataFrame, stats: pd.DataFrame) -> None:
+    """
+    Update the sensor features of a batch's vehicles in the caller's
+    transaction from the batch alone: spreads from the merged running
+    statistics (stats, as returned by sensor_ingest.fold_readings), trends
+    by adding the batch's terms to the stored sums. Vehicles without a
+    feature row get a full refresh. Cached risk scores are left to the
+    caller.
+    """
+    delta = _trend_sums(
+        readings["vehicle_id"],
+        pd.to_datetime(readings["timestamp"]).dt.floor(f"{TREND_RESOLUTION}s"),
+        np.ones(len(readings)),
+        readings["temperature"],
+        readings["vibration"],
+    )
+    ids = [int(v) for v in delta.index]
+    ft = features_table.c
+    rows: List[Any] = []
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        rows.extend(
+            db.execute(
+                select(ft.vehicle_id, *[ft[c] for c in TREND_SUMS]).where(
+                    ft.vehicle_id.in_(ids[start : start + ID_CHUNK_SIZE])
+                )
+            ).all()
+        )
+    stored = pd.DataFrame(rows, columns=["vehicle_id"] + TREND_SUMS).set_index("vehicle_id")
+    missing = [v for v in ids if v not in stored.index]
+
+    if len(stored):
+        sums = stored + delta.loc[stored.index]
+        overall = stats[stats["component"] == "*"].set_index("vehicle_id")
+        updated = sums.join(trend_from_sums(sums)).join(_spreads(overall))
+        columns = TREND_SUMS + ["temperature_trend", "vibration_trend"]
+        columns += [f"{metric}_std" for metric in METRICS]
+        refreshed_at = datetime.utcnow()
+        db.execute(
+            update(features_table)
+            .where(ft.vehicle_id == bindparam("b_vid"))
+            .values(
+                refreshed_at=refreshed_at, **{col: bindparam(f"b_{col}") for col in columns}
+            ),
+            updated[columns]
+            .rename(columns=lambda col: f"b_{col}")
+            .rename_axis("b_vid")
+            .reset_index()
+            .astype(object)
+            .to_dict("records"),
+        )
+    if missing:
+        refresh_vehicle_features(db, missing)
+
+
+def mark_features_stale(db: Session, vehicle_ids: Sequence[int]) -> None:
+    # Vehicles without a row yet are picked up as missing instead
+    ids = sorted({int(v) for v in vehicle_ids})
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        db.execute(
+            update(features_table)
+            .where(features_table.c.vehicle_id.in_(ids[start : start + ID_CHUNK_SIZE]))
+            .values(stale=True)
+        )
+
+
+def pending_vehicle_ids(db: Session) -> List[int]:
+    """Vehicles whose feature row is stale or missing."""
+    return list(
+        db.execute(
+            join_features(select(vehicle_table.c.id))
+            .where(or_(features_table.c.vehicle_id.is_(None), features_table.c.stale))
+            .order_by(vehicle_table.c.id)
+        ).scalars()
+    )
+
+
+def refresh_stale_features(db: Session) -> int:
+    """
+    Recompute every stale or missing feature row, committing every
+    REFRESH_COMMIT_SIZE vehicles. Returns the number refreshed.
+    """
+    ids = pending_vehicle_ids(db)
+    for start in range(0, len(ids), REFRESH_COMMIT_SIZE):
+        refresh_vehicle_features(db, ids[start : start + REFRESH_COMMIT_SIZE])
+        db.commit()
+    return len(ids)
+
+
+def feature_store_status(db: Session) -> Dict[str, Any]:
+    return {
+        "rows": db.execute(select(func.count()).select_from(features_table)).scalar(),
+        "pending": len(pending_vehicle_ids(db)),
+        "last_refreshed_at": db.execute(select(func.max(features_table.c.refreshed_at))).scalar(),
+    }
+
+
+@event.listens_for(Session, "after_flush")
+def _refresh_features_on_child_change(session, flush_context) -> None:
+    # The flushed rows are visible to the aggregation queries here, and the
+    # new/dirty/deleted collections still describe this flush. Reassigned
+    # child rows refresh both their old and new vehicle.
+    vehicle_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, CHILD_MODELS):
+            vehicle_ids.update(
+                v for v in inspect(obj).attrs.vehicle_id.history.sum() if v is not None
+            )
+    if vehicle_ids:
+        refresh_vehicle_features(session, sorted(vehicle_ids))
@@ -0,0 +1,252 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, case, cast, func, select
+from sqlalchemy.orm import Session
+
+from app import models, risk_scores
+from app.generate_synthetic_data_and_train import (
+    materialize_missing_scores,
+    resolve_model,
+)
+
+# -----------------------------
+# Fleet risk & claim aggregation
+# -----------------------------
+#
+# Per-group sums are computed with SQL GROUP BY over the materialized risk
+# scores and the service records, then cached per (model, version,
+# grouping). Later calls only aggregate vehicles and service records added
+# since the cached watermarks and add them to the cached sums. A full
+# recompute happens when existing vehicles were re-scored (their features
+# changed), or once the entry is older than AGGREGATE_CACHE_TTL_SECONDS,
+# which also bounds staleness from in-place service record edits and from
+# score invalidations made by other processes.
+#
+# A cache hit only costs the two max(id) lookups and the in-process
+# invalidation counter (risk_scores.invalidation_count); missing scores are
+# materialized, and the score watermark read, only once one of them moved.
+
+GROUPABLE_COLUMNS = {
+    "supplier_code": models.Vehicle.supplier_code,
+    "plant_code": models.Vehicle.plant_code,
+    "region": models.Vehicle.region,
+    "model": models.Vehicle.model,
+    "model_year": models.Vehicle.model_year,
+}
+GROUP_BY_PATTERN = "^(" + "|".join(GROUPABLE_COLUMNS) + ")$"
+HIGH_RISK_THRESHOLD = 0.7
+AGGREGATE_CACHE_TTL_SECONDS = float(os.environ.get("WARRANTY_AGGREGATE_TTL", "300"))
+
+SUM_FIELDS = [
+    "vehicles",
+    "risk_sum",
+    "high_risk_vehicles",
+    "failures",
+    "service_events",
+    "warranty_claims",
+    "total_service_cost",
+    "warranty_claim_cost",
+]
+
+_cache_lock = threading.Lock()
+_cache: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+
+def _vehicle_sums(
+    db: Session, group_col, model_name: str, version: str, id_range: Tuple[int, int]
+) -> Dict[Any, Dict[str, float]]:
+    score = models.VehicleRiskScore
+    rows = db.execute(
+        select(
+            group_col,
+            func.count(),
+            func.sum(score.risk_score),
+            func.sum(case((score.risk_score >= HIGH_RISK_THRESHOLD, 1), else_=0)),
+            func.sum(cast(models.Vehicle.failure_label, Integer)),
+        )
+        .join(score, score.vehicle_id == models.Vehicle.id)
+        .where(
+            score.model_name == model_name,
+            score.model_version == version,
+            models.Vehicle.id > id_range[0],
+            models.Vehicle.id <= id_range[1],
+        )
+        .group_by(group_col)
+    )
+    return {
+        key: {
+            "vehicles": n or 0,
+            "risk_sum": risk or 0.0,
+            "high_risk_vehicles": high or 0,
+            "failures": failures or 0,
+        }
+        for key, n, risk, high, failures in rows
+    }
+
+
+def _service_sums(
+    db: Session, group_col, id_range: Tuple[int, int]
+) -> Dict[Any, Dict[str, float]]:
+    sr = models.ServiceRecord
+    rows = db.execute(
+        select(
+            group_col,
+            func.count(sr.id),
+            func.sum(cast(sr.is_warranty_claim, Integer)),
+            func.sum(sr.cost),
+            func.sum(case((sr.is_warranty_claim, sr.cost), else_=0.0)),
+        )
+        .join(models.Vehicle, models.Vehicle.id == sr.vehicle_id)
+        .where(sr.id > id_range[0], sr.id <= id_range[1])
+        .group_by(group_col)
+    )
+    return {
+        key: {
+            "service_events": n or 0,
+            "warranty_claims": claims or 0,
+            "total_service_cost": cost or 0.0,
+            "warranty_claim_cost": claim_cost or 0.0,
+        }
+        for key, n, claims, cost, claim_cost in rows
+    }
+
+
+def _add_sums(
+    target: Dict[Any, Dict[str, float]], delta: Dict[Any, Dict[str, float]]
+) -> None:
+    for key, sums in delta.items():
+        group = target.setdefault(key, {field: 0 for field in SUM_FIELDS})
+        for field, value in sums.items():
+            group[field] += value
+
+
+def _id_watermarks(db: Session) -> Dict[str, int]:
+    return {
+        "max_vehicle_id": db.execute(select(func.max(models.Vehicle.id))).scalar() or 0,
+        "max_service_id": db.execute(select(func.max(models.ServiceRecord.id))).scalar() or 0,
+    }
+
+
+def _scores_watermark(db: Session, model_name: str, version: str) -> Optional[datetime]:
+    score = models.VehicleRiskScore
+    return db.execute(
+        select(func.max(score.computed_at)).where(
+            score.model_name == model_name, score.model_version == version
+        )
+    ).scalar()
+
+
+def _rescored_existing(db: Session, model_name: str, version: str, entry: Dict[str, Any]) -> bool:
+    # Scores newer than the cached watermark on already-counted vehicles
+    # mean their features (and possibly their group) changed.
+    score = models.VehicleRiskScore
+    if entry["scores_computed_at"] is None:
+        return False
+    return (
+        db.execute(
+            select(score.vehicle_id)
+            .where(
+                score.model_name == model_name,
+                score.model_version == version,
+                score.computed_at > entry["scores_computed_at"],
+                score.vehicle_id <= entry["max_vehicle_id"],
+            )
+            .limit(1)
+        ).first()
+        is not None
+    )
+
+
+def _format_groups(sums: Dict[Any, Dict[str, float]]) -> List[Dict[str, Any]]:
+    groups = []
+    for key in sorted(sums, key=lambda k: (k is None, str(k))):
+        s = sums[key]
+        vehicles = s["vehicles"]
+        groups.append(
+            {
+                "group": str(key),
+                "vehicles": int(vehicles),
+                "mean_risk": round(s["risk_sum"] / vehicles, 4) if vehicles else 0.0,
+                "high_risk_vehicles": int(s["high_risk_vehicles"]),
+                "failure_rate": round(s["failures"] / vehicles, 4) if vehicles else 0.0,
+                "service_events": int(s["service_events"]),
+                "warranty_claims": int(s["warranty_claims"]),
+                "claims_per_vehicle": round(s["warranty_claims"] / vehicles, 4)
+                if vehicles
+                else 0.0,
+                "claim_rate": round(s["warranty_claims"] / s["service_events"], 4)
+                if s["service_events"]
+                else 0.0,
+                "total_service_cost": round(float(s["total_service_cost"]), 2),
+                "warranty_claim_cost": round(float(s["warranty_claim_cost"]), 2),
+            }
+        )
+    return groups
+
+
+def _response(
+    group_by: str, model_name: str, version: str, refresh: str, sums: Dict[Any, Dict[str, float]]
+) -> Dict[str, Any]:
+    return {
+        "group_by": group_by,
+        "model_name": model_name,
+        "model_version": version,
+        "refresh": refresh,
+        "generated_at": datetime.utcnow(),
+        "groups": _format_groups(sums),
+    }
+
+
+def fleet_risk_aggregates(db: Session, group_by: str, model_name: str) -> Dict[str, Any]:
+    model_name, entry = resolve_model(model_name)
+    version = entry["version"]
+    group_col = GROUPABLE_COLUMNS[group_by]
+
+    # Every sum below is bounded by these ids, so rows inserted while we
+    # aggregate are picked up by the next incremental pass, not twice.
+    # The invalidation count is read before scoring for the same reason.
+    marks: Dict[str, Any] = _id_watermarks(db)
+    marks["invalidations"] = risk_scores.invalidation_count()
+
+    key = (model_name, version, group_by)
+    with _cache_lock:
+        cached = _cache.get(key)
+
+    now = time.monotonic()
+    fresh = cached is not None and now - cached["built_at"] < AGGREGATE_CACHE_TTL_SECONDS
+    if fresh and all(marks[mark] == cached[mark] for mark in marks):
+        return _response(group_by, model_name, version, "cached", cached["sums"])
+
+    # Vectorized scoring of any vehicle without a stored score, so the
+    # GROUP BY below sees the whole fleet.
+    materialize_missing_scores(db, model_name, entry)
+    marks["scores_computed_at"] = _scores_watermark(db, model_name, version)
+
+    vehicle_range = (0, marks["max_vehicle_id"])
+    service_range = (0, marks["max_service_id"])
+    if fresh and not _rescored_existing(db, model_name, version, cached):
+        refresh = "incremental"
+        sums = {k: dict(v) for k, v in cached["sums"].items()}
+        vehicle_range = (cached["max_vehicle_id"], marks["max_vehicle_id"])
+        service_range = (cached["max_service_id"], marks["max_service_id"])
+        built_at = cached["built_at"]
+    else:
+        refresh = "full"
+        sums = {}
+        built_at = now
+    _add_sums(sums, _vehicle_sums(db, group_col, model_name, version, vehicle_range))
+    _add_sums(sums, _service_sums(db, group_col, service_range))
+
+    with _cache_lock:
+        _cache[key] = dict(marks, sums=sums, built_at=built_at)
+    return _response(group_by, model_name, version, refresh, sums)
+
+
+def clear_aggregate_cache(model_name: Optional[str] = None) -> None:
+    with _cache_lock:
+        for key in [k for k in _cache if model_name is None or k[0] == model_name]:
+            del _cache[key]
@@ -0,0 +1,365 @@
+import argparse
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk_load import DEFAULT_CHUNK_SIZE, BulkLoader
+
+# -----------------------------
+# Vectorized fleet simulator
+# -----------------------------
+#
+# Generates whole columns at once with a NumPy Generator instead of drawing
+# attributes row by row. Output is produced in chunks of vehicles (plus
+# their production logs, service records and sensor readings), so fleets
+# of millions of vehicles can be streamed to the DB or Parquet files with
+# flat memory. Each chunk gets its own child seed spawned from the
+# top-level seed, so the same (seed, n_vehicles, chunk_size) always
+# produces the same fleet.
+
+DEALERSHIPS = [
+    ("Cochran Auto - Pittsburgh", "Pittsburgh", "PA"),
+    ("Sunset Motors", "Los Angeles", "CA"),
+    ("Lone Star Auto", "Dallas", "TX"),
+    ("Great Lakes Motors", "Chicago", "IL"),
+    ("Bay Area Auto", "San Jose", "CA"),
+]
+MODEL_CHOICES = ["Sedan-A", "SUV-B", "Truck-C", "EV-D", "Hybrid-E"]
+SUPPLIERS = ["SUP-A", "SUP-B", "SUP-C", "SUP-X"]  # SUP-X is risky supplier
+PLANTS = ["PLANT-1", "PLANT-2", "PLANT-3"]
+COMPONENTS = ["Engine", "Transmission", "HVAC", "Brakes", "Infotainment"]
+FAULT_CODES = ["P0300", "P0420", "U0100", "C0035", "B0020"]
+SERVICE_ACTIONS = ["Replaced", "Repaired", "Software update", "Inspect & clean"]
+SHIFTS = ["A", "B", "C"]
+SENSOR_READINGS_PER_VEHICLE = 20
+MAX_MODEL_YEAR = 2025
+
+
+def us_region_from_state(state: str) -> str:
+    west = {"CA", "WA", "OR", "NV", "AZ", "CO", "UT"}
+    midwest = {"IL", "MI", "OH", "WI", "MN", "IN"}
+    south = {"TX", "FL", "GA", "NC", "SC", "AL", "TN"}
+    northeast = {"NY", "MA", "PA", "NJ"}
+
+    if state in west:
+        return "US-West"
+    if state in midwest:
+        return "US-Midwest"
+    if state in south:
+        return "US-South"
+    if state in northeast:
+        return "US-Northeast"
+    return "US-Other"
+
+
+def dealerships_frame(first_id: int = 1) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": np.arange(first_id, first_id + len(DEALERSHIPS)),
+            "name": [d[0] for d in DEALERSHIPS],
+            "city": [d[1] for d in DEALERSHIPS],
+            "state": [d[2] for d in DEALERSHIPS],
+        }
+    )
+
+
+def failure_risk(
+    mileage: np.ndarray,
+    avg_engine_temp: np.ndarray,
+    avg_vibration: np.ndarray,
+    services_last_12m: np.ndarray,
+    supplier_code: np.ndarray,
+) -> np.ndarray:
+    # Risk signal engineering, same rules as the original per-row seeder
+    risk = np.full(mileage.shape, 0.03)
+    risk += np.where(mileage > 120_000, 0.25, np.where(mileage > 90_000, 0.15, 0.0))
+    risk += np.where(avg_engine_temp > 100, 0.15, 0.0)
+    risk += np.where(avg_vibration > 4.5, 0.1, 0.0)
+    risk += np.where(services_last_12m >= 3, 0.1, 0.0)
+    risk += np.where(supplier_code == "SUP-X", 0.12, 0.0)
+    return np.clip(risk, 0.02, 0.9)
+
+
+def _simulate_chunk(
+    rng: np.random.Generator,
+    first_index: int,
+    n: int,
+    first_vehicle_id: int,
+    dealership_ids: np.ndarray,
+    today: np.datetime64,
+    now: np.datetime64,
+) -> Dict[str, pd.DataFrame]:
+    index = np.arange(first_index, first_index + n)
+    vehicle_ids = first_vehicle_id + index
+
+    dealer_idx = rng.integers(0, len(DEALERSHIPS), n)
+    regions = np.array([us_region_from_state(d[2]) for d in DEALERSHIPS])[dealer_idx]
+    model = np.array(MODEL_CHOICES)[rng.integers(0, len(MODEL_CHOICES), n)]
+    model_year = rng.integers(2018, MAX_MODEL_YEAR + 1, n)
+
+    sale_year = rng.integers(model_year, MAX_MODEL_YEAR + 1)
+    sale_month = rng.integers(1, 13, n)
+    sale_day = rng.integers(1, 29, n)
+    sale_date = (
+        pd.to_datetime({"year": sale_year, "month": sale_month, "day": sale_day})
+        .to_numpy()
+        .astype("datetime64[D]")
+    )
+    future = sale_date > today
+    sale_date[future] = today - rng.integers(30, 366, future.sum()).astype("timedelta64[D]")
+
+    age_days = (today - sale_date).astype(np.int64)
+    age_months = np.maximum(age_days / 30.0, 1.0)
+
+    base_mileage = age_months * rng.uniform(800, 1400, n)
+    mileage = np.clip(rng.normal(base_mileage, base_mileage * 0.2), 5000, 240000).astype(
+        np.int64
+    )
+
+    avg_engine_temp = rng.normal(90, 10, n)
+    avg_vibration = rng.normal(3.5, 1.0, n)
+    services_last_12m = rng.poisson(1 + mileage / 50000.0)
+
+    supplier_code = np.array(SUPPLIERS)[rng.integers(0, len(SUPPLIERS), n)]
+    plant_code = np.array(PLANTS)[rng.integers(0, len(PLANTS), n)]
+
+    risk = failure_risk(
+        mileage, avg_engine_temp, avg_vibration, services_last_12m, supplier_code
+    )
+    failure_label = rng.random(n) < risk
+
+    vehicles = pd.DataFrame(
+        {
+            "id": vehicle_ids,
+            # Derived from the id so appending to an existing fleet stays unique
+            "vin": np.char.add("VIN", np.char.zfill((vehicle_ids - 1).astype(str), 6)),
+            "model": model,
+            "model_year": model_year,
+            "oem": "Demo OEM",
+            "dealership_id": dealership_ids[dealer_idx],
+            "sale_date": sale_date,
+            "mileage": mileage,
+            "age_months": age_months,
+            "avg_engine_temp": avg_engine_temp,
+            "avg_vibration": avg_vibration,
+            "services_last_12m": services_last_12m,
+            "supplier_code": supplier_code,
+            "plant_code": plant_code,
+            "region": regions,
+            "failure_label": failure_label,
+        }
+    )
+
+    # Production log: one per vehicle
+    production_logs = pd.DataFrame(
+        {
+            "vehicle_id": vehicle_ids,
+            "plant_code": plant_code,
+            "line": np.char.add("L-", rng.integers(1, 4, n).astype(str)),
+            "shift": np.array(SHIFTS)[rng.integers(0, len(SHIFTS), n)],
+            "batch_no": np.char.add(
+                np.char.add(supplier_code, "-"), rng.integers(100, 1000, n).astype(str)
+            ),
+            "supplier_code": supplier_code,
+            "ambient_temp": rng.normal(80, 15, n),
+            "assembly_date": sale_date
+            - rng.integers(7, 61, n).astype("timedelta64[D]"),
+        }
+    )
+
+    # Service records: Poisson count per vehicle, flattened with np.repeat
+    num_services = rng.poisson(1 + mileage / 60000.0)
+    owner = np.repeat(np.arange(n), num_services)
+    m = owner.size
+    days_ago = rng.integers(30, np.maximum(60, age_days[owner] + 30) + 1)
+    owner_mileage = mileage[owner]
+    service_records = pd.DataFrame(
+        {
+            "vehicle_id": vehicle_ids[owner],
+            "service_date": today - days_ago.astype("timedelta64[D]"),
+            "mileage": np.maximum(
+                5000, (owner_mileage - rng.uniform(0, owner_mileage * 0.3)).astype(np.int64)
+            ),
+            "component": np.array(COMPONENTS)[rng.integers(0, len(COMPONENTS), m)],
+            "fault_code": np.array(FAULT_CODES)[rng.integers(0, len(FAULT_CODES), m)],
+            "action": np.array(SERVICE_ACTIONS)[rng.integers(0, len(SERVICE_ACTIONS), m)],
+            "cost": rng.uniform(80, 1800, m),
+            "is_warranty_claim": (failure_label[owner] & (rng.random(m) < 0.7))
+            | (rng.random(m) < 0.2),
+        }
+    )
+
+    # Sensor readings: short time history around each vehicle's averages
+    k = SENSOR_READINGS_PER_VEHICLE
+    sensor_owner = np.repeat(np.arange(n), k)
+    s = sensor_owner.size
+    sensor_readings = pd.DataFrame(
+        {
+            "vehicle_id": vehicle_ids[sensor_owner],
+            "timestamp": now - rng.integers(1, 73, s).astype("timedelta64[h]"),
+            "component": np.array(COMPONENTS)[rng.integers(0, len(COMPONENTS), s)],
+            "temperature": rng.normal(avg_engine_temp[sensor_owner], 5),
+            "vibration": rng.normal(avg_vibration[sensor_owner], 0.5),
+            "pressure": rng.normal(30, 3, s),
+        }
+    )
+
+    return {
+        "vehicles": vehicles,
+        "production_logs": production_logs,
+        "service_records": service_records,
+        "sensor_readings": sensor_readings,
+    }
+
+
+def simulate_fleet(
+    n_vehicles: int,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    first_vehicle_id: int = 1,
+    dealership_ids: Optional[Sequence[int]] = None,
+    today: Optional[date] = None,
+) -> Iterator[Dict[str, pd.DataFrame]]:
+    """
+    Yield the fleet chunk by chunk as {table_name: DataFrame}. Vehicle IDs
+    start at first_vehicle_id; child tables carry vehicle_id but no id of
+    their own (the sink assigns those).
+    """
+    today64 = np.datetime64(today or date.today(), "D")
+    now64 = np.datetime64(datetime.now(), "s")
+    dealer_ids = np.asarray(
+        dealership_ids if dealership_ids is not None else np.arange(1, len(DEALERSHIPS) + 1)
+    )
+
+    n_chunks = max(1, -(-n_vehicles // chunk_size))
+    child_seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for chunk_no, child_seed in enumerate(child_seeds):
+        start = chunk_no * chunk_size
+        n = min(chunk_size, n_vehicles - start)
+        if n <= 0:
+            break
+        yield _simulate_chunk(
+            np.random.default_rng(child_seed),
+            start,
+            n,
+            first_vehicle_id,
+            dealer_ids,
+            today64,
+            now64,
+        )
+
+
+# -----------------------------
+# Sinks
+# -----------------------------
+
+
+def write_fleet_to_database(
+    db: Session,
+    n_vehicles: int,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, object]:
+    loader = BulkLoader(db, chunk_size=chunk_size)
+    dealership_table = models.Dealership.__table__
+    vehicle_table = models.Vehicle.__table__
+
+    dealers = dealerships_frame(
+        first_id=loader.reserve_ids(dealership_table, len(DEALERSHIPS))
+    )
+    loader.add_frame(dealership_table, dealers)
+    first_vehicle_id = loader.reserve_ids(vehicle_table, n_vehicles)
+
+    for chunk in simulate_fleet(
+        n_vehicles,
+        seed=seed,
+        chunk_size=chunk_size,
+        first_vehicle_id=first_vehicle_id,
+        dealership_ids=dealers["id"].to_numpy(),
+    ):
+        for table_name, frame in chunk.items():
+            loader.add_frame(models.Base.metadata.tables[table_name], frame)
+        loader.flush()
+
+    return loader.finish()
+
+
+def write_fleet_to_parquet(
+    out_dir: Path,
+    n_vehicles: int,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[str, object]:
+    """Write one Parquet file per table, one row group per chunk."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Parquet output requires pyarrow to be installed.") from exc
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    writers: Dict[str, "pq.ParquetWriter"] = {}
+    rows: Dict[str, int] = {}
+
+    def write(table_name: str, frame: pd.DataFrame) -> None:
+        batch = pa.Table.from_pandas(frame, preserve_index=False)
+        if table_name not in writers:
+            writers[table_name] = pq.ParquetWriter(
+                out_dir / f"{table_name}.parquet", batch.schema
+            )
+        writers[table_name].write_table(batch)
+        rows[table_name] = rows.get(table_name, 0) + len(frame)
+
+    try:
+        write("dealerships", dealerships_frame())
+        for chunk in simulate_fleet(n_vehicles, seed=seed, chunk_size=chunk_size):
+            for table_name, frame in chunk.items():
+                write(table_name, frame)
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(rows.values())
+    return {
+        "rows": rows,
+        "total_rows": total,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(total / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic vehicle fleet.")
+    parser.add_argument("--vehicles", type=int, default=250)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument(
+        "--parquet", type=Path, default=None, help="Write Parquet files here instead of the DB"
+    )
+    args = parser.parse_args(argv)
+
+    if args.parquet is not None:
+        stats = write_fleet_to_parquet(args.parquet, args.vehicles, args.seed, args.chunk_size)
+    else:
+        from app.database import SessionLocal, engine
+
+        models.Base.metadata.create_all(bind=engine)
+        db = SessionLocal()
+        try:
+            stats = write_fleet_to_database(db, args.vehicles, args.seed, args.chunk_size)
+        finally:
+            db.close()
+    print("Simulated fleet:", stats)
+
+
+if __name__ == "__main__":
+    main()
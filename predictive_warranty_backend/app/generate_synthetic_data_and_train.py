@@ -1,21 +1,34 @@
+from sqlalchemy import event, func, inspect, select
 from sqlalchemy.orm import Session
 from app import models
-import random
+from app import (
+    compiled_scoring,
+    feature_store,
+    metrics,
+    model_artifacts,
+    model_registry,
+    risk_scores,
+    sensor_ingest,
+    sensor_timeseries,
+)
+from app.bulk_load import DEFAULT_CHUNK_SIZE
+from app.fleet_simulator import us_region_from_state, write_fleet_to_database
+from app.scoring_batcher import ScoringBatcher
+import os
+import time
 import numpy as np
 from app.database import SessionLocal, engine
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Mapping, Optional, Sequence, Tuple, Union
 from datetime import date, datetime, timedelta
+from types import SimpleNamespace
 
 import pandas as pd
+from pandas.api.types import union_categoricals
 
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.pipeline import Pipeline
-from sklearn.tree import DecisionTreeClassifier
-from sklearn.svm import SVC
-from sklearn.neural_network import MLPClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import roc_auc_score
+from joblib import Parallel, delayed
+# sklearn is imported where models are built or trained: serving loads
+# fitted pipelines on demand (see model_registry), so importing the API
+# does not pull it in.
 
 models.Base.metadata.create_all(bind=engine)
 
@@ -24,185 +37,26 @@ models.Base.metadata.create_all(bind=engine)
 # -----------------------------
 
 
-def us_region_from_state(state: str) -> str:
-    west = {"CA", "WA", "OR", "NV", "AZ", "CO", "UT"}
-    midwest = {"IL", "MI", "OH", "WI", "MN", "IN"}
-    south = {"TX", "FL", "GA", "NC", "SC", "AL", "TN"}
-    northeast = {"NY", "MA", "PA", "NJ"}
-
-    if state in west:
-        return "US-West"
-    if state in midwest:
-        return "US-Midwest"
-    if state in south:
-        return "US-South"
-    if state in northeast:
-        return "US-Northeast"
-    return "US-Other"
-
-
-def seed_database(db: Session, n_vehicles: int = 250) -> None:
+def seed_database(
+    db: Session,
+    n_vehicles: int = 250,
+    seed: int = 42,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
     if db.query(models.Vehicle).count() > 0:
         return
 
-    random.seed(42)
-    np.random.seed(42)
-
-    dealerships_data = [
-        ("Cochran Auto - Pittsburgh", "Pittsburgh", "PA"),
-        ("Sunset Motors", "Los Angeles", "CA"),
-        ("Lone Star Auto", "Dallas", "TX"),
-        ("Great Lakes Motors", "Chicago", "IL"),
-        ("Bay Area Auto", "San Jose", "CA"),
-    ]
-
-    dealerships: List[models.Dealership] = []
-    for name, city, state in dealerships_data:
-        d = models.Dealership(name=name, city=city, state=state)
-        db.add(d)
-        dealerships.append(d)
-    db.flush()
-
-    model_choices = [
-        "Sedan-A",
-        "SUV-B",
-        "Truck-C",
-        "EV-D",
-        "Hybrid-E",
-    ]
-    suppliers = ["SUP-A", "SUP-B", "SUP-C", "SUP-X"]  # SUP-X is risky supplier
-    plants = ["PLANT-1", "PLANT-2", "PLANT-3"]
-    components = ["Engine", "Transmission", "HVAC", "Brakes", "Infotainment"]
-    fault_codes = ["P0300", "P0420", "U0100", "C0035", "B0020"]
-
-    today = date.today()
-
-    for i in range(n_vehicles):
-        dealer = random.choice(dealerships)
-        model = random.choice(model_choices)
-        model_year = random.randint(2018, 2025)
-        sale_year = random.randint(model_year, 2025)
-        sale_month = random.randint(1, 12)
-        sale_day = random.randint(1, 28)
-        sale_date = date(sale_year, sale_month, sale_day)
-        if sale_date > today:
-            sale_date = today - timedelta(days=random.randint(30, 365))
-
-        age_days = (today - sale_date).days
-        age_months = max(age_days / 30.0, 1.0)
-
-        base_mileage = age_months * random.uniform(800, 1400)
-        mileage = int(np.clip(np.random.normal(base_mileage, base_mileage * 0.2), 5000, 240000))
-
-        avg_engine_temp = float(np.random.normal(90, 10))
-        avg_vibration = float(np.random.normal(3.5, 1.0))
-
-        services_last_12m = int(max(0, np.random.poisson(1 + (mileage / 50000.0))))
-
-        supplier_code = random.choice(suppliers)
-        plant_code = random.choice(plants)
-        region = us_region_from_state(dealer.state)
-
-        # Risk signal engineering
-        base_risk = 0.03
-        if mileage > 120_000:
-            base_risk += 0.25
-        elif mileage > 90_000:
-            base_risk += 0.15
-
-        if avg_engine_temp > 100:
-            base_risk += 0.15
-        if avg_vibration > 4.5:
-            base_risk += 0.1
-        if services_last_12m >= 3:
-            base_risk += 0.1
-        if supplier_code == "SUP-X":
-            base_risk += 0.12
-
-        failure_label = random.random() < min(max(base_risk, 0.02), 0.9)
-
-        vin = f"VIN{i:06d}"
-
-        vehicle = models.Vehicle(
-            vin=vin,
-            model=model,
-            model_year=model_year,
-            oem="Demo OEM",
-            dealership=dealer,
-            sale_date=sale_date,
-            mileage=mileage,
-            age_months=age_months,
-            avg_engine_temp=avg_engine_temp,
-            avg_vibration=avg_vibration,
-            services_last_12m=services_last_12m,
-            supplier_code=supplier_code,
-            plant_code=plant_code,
-            region=region,
-            failure_label=failure_label,
-        )
-        db.add(vehicle)
-        db.flush()
-
-        # Production log
-        prod_log = models.ProductionLog(
-            vehicle_id=vehicle.id,
-            plant_code=plant_code,
-            line=f"L-{random.randint(1,3)}",
-            shift=random.choice(["A", "B", "C"]),
-            batch_no=f"{supplier_code}-{random.randint(100,999)}",
-            supplier_code=supplier_code,
-            ambient_temp=float(np.random.normal(80, 15)),
-            assembly_date=sale_date - timedelta(days=random.randint(7, 60)),
-        )
-        db.add(prod_log)
-
-        # Service records
-        num_services = max(
-            0,
-            int(
-                np.random.poisson(1 + (mileage / 60000.0))
-            ),
-        )
-        for _ in range(num_services):
-            days_ago = random.randint(30, max(60, age_days + 30))
-            service_date = today - timedelta(days=days_ago)
-            sr = models.ServiceRecord(
-                vehicle_id=vehicle.id,
-                service_date=service_date,
-                mileage=max(5000, int(mileage - random.uniform(0, mileage * 0.3))),
-                component=random.choice(components),
-                fault_code=random.choice(fault_codes),
-                action=random.choice(
-                    ["Replaced", "Repaired", "Software update", "Inspect & clean"]
-                ),
-                cost=float(np.random.uniform(80, 1800)),
-                is_warranty_claim=bool(
-                    failure_label and random.random() < 0.7
-                    or random.random() < 0.2
-                ),
-            )
-            db.add(sr)
-
-        # Sensor readings (short time history)
-        for _ in range(20):
-            ts = datetime.now() - timedelta(hours=random.randint(1, 72))
-            sensor = models.SensorReading(
-                vehicle_id=vehicle.id,
-                timestamp=ts,
-                component=random.choice(components),
-                temperature=float(np.random.normal(avg_engine_temp, 5)),
-                vibration=float(np.random.normal(avg_vibration, 0.5)),
-                pressure=float(np.random.normal(30, 3)),
-            )
-            db.add(sensor)
-
-    db.commit()
+    # Whole columns are drawn at once by the fleet simulator and streamed
+    # through the Core bulk loader in chunks.
+    stats = write_fleet_to_database(db, n_vehicles, seed=seed, chunk_size=chunk_size)
+    print("Seeded database:", stats)
 
 # -----------------------------
 # ML training utilities
 # -----------------------------
 
-FEATURE_NUMERIC = [
+# Model inputs stored on the Vehicle row itself
+VEHICLE_NUMERIC = [
     "model_year",
     "mileage",
     "age_months",
@@ -211,53 +65,170 @@ FEATURE_NUMERIC = [
     "services_last_12m",
 ]
 
-FEATURE_CATEGORICAL = [
+VEHICLE_CATEGORICAL = [
     "model",
     "supplier_code",
     "plant_code",
     "region",
 ]
 
+# Plus the aggregates of the vehicle's history kept in the feature store
+FEATURE_NUMERIC = VEHICLE_NUMERIC + feature_store.DERIVED_NUMERIC
+FEATURE_CATEGORICAL = VEHICLE_CATEGORICAL + feature_store.DERIVED_CATEGORICAL
+
 DEFAULT_MODEL_NAME = "decision_tree"
-MODEL_REGISTRY: Dict[str, Dict[str, Any]] = {}
-
-
-def build_training_dataframe(db: Session) -> pd.DataFrame:
-    vehicles = db.query(models.Vehicle).all()
-    rows = []
-    for v in vehicles:
-        rows.append(
-            {
-                "model": v.model,
-                "model_year": v.model_year,
-                "mileage": v.mileage,
-                "age_months": v.age_months,
-                "avg_engine_temp": v.avg_engine_temp,
-                "avg_vibration": v.avg_vibration,
-                "services_last_12m": v.services_last_12m,
-                "supplier_code": v.supplier_code,
-                "plant_code": v.plant_code,
-                "region": v.region,
-                "failure_label": int(v.failure_label),
-            }
-        )
-    df = pd.DataFrame(rows)
-    return df
+# Worker processes used to fit the estimators in parallel (-1: all cores).
+TRAINING_N_JOBS = int(os.environ.get("WARRANTY_TRAINING_N_JOBS", "-1"))
+# Rows used to check compiled scorers against pipeline.predict_proba
+COMPILE_SAMPLE_SIZE = 512
+# Training-time budget of the kernel SVM (see kernel_models.NystroemSVM)
+SVM_TIME_BUDGET_SECONDS = float(os.environ.get("WARRANTY_SVM_TIME_BUDGET_SECONDS", "60"))
+# Also train the exact RBF SVC, whose cost grows quadratically or worse
+# with the fleet; only practical up to a few tens of thousands of vehicles
+EXACT_SVM_ENABLED = os.environ.get("WARRANTY_EXACT_SVM", "0") == "1"
+MODEL_REGISTRY = model_registry.ModelRegistry({})
 
+# Called as on_progress(model_name, state) while training runs.
+ProgressCallback = Callable[[str, str], None]
 
-def train_models_from_db(db: Session) -> Dict[str, Dict[str, Any]]:
-    df = build_training_dataframe(db)
-    if df.empty:
-        raise RuntimeError("No data to train on.")
 
-    X = df[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
-    y = df["failure_label"].astype(int)
+class ModelsNotReadyError(RuntimeError):
+    """Raised when scoring is requested before any model has been trained."""
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.25, random_state=42, stratify=y
+
+def get_model_registry() -> model_registry.ModelRegistry:
+    # Always read through this function: `from ... import MODEL_REGISTRY`
+    # binds the dict that existed at import time and misses later swaps.
+    return MODEL_REGISTRY
+
+
+def set_model_registry(registry: Mapping[str, Mapping[str, Any]]) -> None:
+    """
+    Publish a fully built registry. Rebinding the module global is a single
+    atomic operation, so readers see either the old or the new registry,
+    never a partially populated one. Plain {name: entry} dicts are wrapped
+    against the artifact manifest, their in-memory pipelines seeding the
+    model cache.
+    """
+    global MODEL_REGISTRY
+    if not isinstance(registry, model_registry.ModelRegistry):
+        registry = model_registry.build_registry(model_artifacts.read_manifest(), trained=registry)
+    MODEL_REGISTRY = registry
+
+
+TRAINING_CHUNK_SIZE = 100_000
+TRAINING_DTYPES = {
+    "model_year": np.int32,
+    "mileage": np.int32,
+    "age_months": np.float64,
+    "avg_engine_temp": np.float64,
+    "avg_vibration": np.float64,
+    "services_last_12m": np.int32,
+    **{col: np.float64 for col in feature_store.DERIVED_NUMERIC},
+    "service_count": np.int32,
+    "repeat_fault_count": np.int32,
+    "failure_label": np.int8,
+}
+
+
+def _typed_training_chunk(rows: Sequence[Any], columns: List[str]) -> Dict[str, Any]:
+    # Transpose one chunk of row tuples into typed NumPy columns; the
+    # tuples are dropped as soon as the chunk is converted.
+    values = list(zip(*rows))
+    chunk: Dict[str, Any] = {}
+    for col, column_values in zip(columns, values):
+        if col in FEATURE_CATEGORICAL:
+            chunk[col] = pd.Categorical(column_values)
+        else:
+            chunk[col] = np.fromiter(column_values, dtype=TRAINING_DTYPES[col], count=len(rows))
+    return chunk
+
+
+def max_vehicle_id(db: Session) -> int:
+    return db.execute(select(func.max(models.Vehicle.id))).scalar() or 0
+
+
+def training_watermarks(db: Session, upto_id: int) -> Dict[str, Any]:
+    """
+    Cheap description of the training data up to upto_id: vehicle and
+    feature row counts and the last feature refresh (child rows changing
+    refresh their vehicle's features). Vehicle rows edited in place are
+    not covered; /admin/retrain picks those up.
+    """
+    vehicle = models.Vehicle
+    features = models.VehicleFeatures
+    vehicles = db.execute(
+        select(func.count()).select_from(vehicle).where(vehicle.id <= upto_id)
+    ).scalar()
+    feature_rows, refreshed_at = db.execute(
+        select(func.count(), func.max(features.refreshed_at)).where(
+            features.vehicle_id <= upto_id
+        )
+    ).one()
+    return {
+        "upto_id": upto_id,
+        "vehicles": vehicles,
+        "feature_rows": feature_rows,
+        "features_refreshed_at": refreshed_at.isoformat() if refreshed_at else None,
+    }
+
+
+def source_fingerprint(db: Session, upto_id: int) -> str:
+    return model_artifacts.source_fingerprint(
+        training_watermarks(db, upto_id),
+        FEATURE_NUMERIC,
+        FEATURE_CATEGORICAL,
+        model_config_signature(),
     )
 
-    models: Dict[str, Dict[str, Any]] = {}
+
+def build_training_dataframe(
+    db: Session,
+    chunk_size: int = TRAINING_CHUNK_SIZE,
+    after_id: int = 0,
+    upto_id: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Read only the feature and label columns with one projected query,
+    fetched chunk_size rows at a time and converted to compact columns
+    (numeric arrays, category dtype for the categoricals), so memory is
+    bounded by the feature data rather than by hydrated Vehicle objects.
+    The derived features are outer-joined from the feature store.
+    after_id/upto_id restrict the read to vehicles with
+    after_id < id <= upto_id.
+    """
+    columns = FEATURE_NUMERIC + FEATURE_CATEGORICAL + ["failure_label"]
+    vehicle_table = models.Vehicle.__table__
+    derived = {c.name: c for c in feature_store.derived_columns()}
+    query = feature_store.join_features(
+        select(*[derived[col] if col in derived else vehicle_table.c[col] for col in columns])
+    ).order_by(vehicle_table.c.id)
+    if after_id:
+        query = query.where(vehicle_table.c.id > after_id)
+    if upto_id is not None:
+        query = query.where(vehicle_table.c.id <= upto_id)
+    result = db.execute(query, execution_options={"yield_per": chunk_size})
+    chunks = [_typed_training_chunk(rows, columns) for rows in result.partitions()]
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+
+    data = {}
+    for col in columns:
+        parts = [chunk[col] for chunk in chunks]
+        if col in FEATURE_CATEGORICAL:
+            data[col] = union_categoricals(parts, sort_categories=True)
+        else:
+            data[col] = np.concatenate(parts)
+    return pd.DataFrame(data, columns=columns)
+
+
+def model_configs() -> List[tuple]:
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.svm import SVC
+    from sklearn.tree import DecisionTreeClassifier
+
+    from app.kernel_models import NystroemSVM
 
     configs = [
         (
@@ -268,9 +239,14 @@ def train_models_from_db(db: Session) -> Dict[str, Dict[str, Any]]:
         ),
         (
             "svm",
-            SVC(kernel="rbf", probability=True, class_weight="balanced", random_state=42),
-            "SVM",
-            "Margin-based model for complex boundaries",
+            NystroemSVM(
+                n_components=300,
+                alpha=1e-4,
+                time_budget_seconds=SVM_TIME_BUDGET_SECONDS,
+                random_state=42,
+            ),
+            "KernelSVM",
+            "Margin-based model for complex boundaries (approximate RBF kernel)",
         ),
         (
             "neural_net",
@@ -282,60 +258,525 @@ def train_models_from_db(db: Session) -> Dict[str, Dict[str, Any]]:
             "NeuralNet",
             "Shallow neural network for non-linear patterns",
         ),
+        (
+            "sgd_logistic",
+            SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42),
+            "LinearSGD",
+            "Logistic regression fitted by SGD; updated online between retrains",
+        ),
     ]
-
-    for name, estimator, model_type, desc in configs:
-        preprocessor = ColumnTransformer(
-            transformers=[
-                ("num", StandardScaler(), FEATURE_NUMERIC),
-                ("cat", OneHotEncoder(handle_unknown="ignore"), FEATURE_CATEGORICAL),
-            ]
+    if EXACT_SVM_ENABLED:
+        configs.append(
+            (
+                "svm_exact",
+                SVC(kernel="rbf", probability=True, class_weight="balanced", random_state=42),
+                "SVM",
+                "Exact RBF-kernel SVM, for comparison with the approximate one",
+            )
         )
-        pipe = Pipeline(steps=[("prep", preprocessor), ("est", estimator)])
-        pipe.fit(X_train, y_train)
-        y_proba = pipe.predict_proba(X_test)[:, 1]
-        auc = float(roc_auc_score(y_test, y_proba))
+    return configs
+
+
+def model_config_signature() -> str:
+    # Stable description of every estimator and its hyperparameters, used
+    # in the artifact fingerprint so config edits invalidate stored models.
+    return repr(
+        [
+            (name, type(est).__name__, sorted(est.get_params().items()))
+            for name, est, _, _ in model_configs()
+        ]
+    )
+
+
+def build_preprocessor():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    return ColumnTransformer(
+        transformers=[
+            ("num", StandardScaler(), FEATURE_NUMERIC),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), FEATURE_CATEGORICAL),
+        ]
+    )
+
+
+def new_model_version() -> str:
+    return datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+
+
+def _fit_estimator(name: str, estimator, Xt_train, y_train, Xt_test, y_test):
+    # Runs in a joblib worker: fit on the already-transformed matrix and
+    # score the holdout so only the fitted estimator and AUC travel back.
+    from sklearn.metrics import roc_auc_score
+
+    estimator.fit(Xt_train, y_train)
+    y_proba = estimator.predict_proba(Xt_test)[:, 1]
+    return name, estimator, float(roc_auc_score(y_test, y_proba))
+
 
+def train_models_from_frame(
+    df: pd.DataFrame, on_progress: Optional[ProgressCallback] = None
+) -> Dict[str, Dict[str, Any]]:
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+
+    if df.empty:
+        raise RuntimeError("No data to train on.")
+
+    X = df[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
+    y = df["failure_label"].astype(int)
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.25, random_state=42, stratify=y
+    )
+
+    models: Dict[str, Dict[str, Any]] = {}
+    # One version per training run; cached scores are keyed by it.
+    version = new_model_version()
+
+    configs = model_configs()
+    if on_progress:
+        for name, *_ in configs:
+            on_progress(name, "pending")
+
+    # Every estimator sees the same features, so the scaler/encoder is fitted
+    # once and the transformed matrices are shared by all workers.
+    preprocessor = build_preprocessor()
+    Xt_train = preprocessor.fit_transform(X_train)
+    Xt_test = preprocessor.transform(X_test)
+
+    if on_progress:
+        for name, *_ in configs:
+            on_progress(name, "training")
+
+    n_jobs = min(TRAINING_N_JOBS, len(configs)) if TRAINING_N_JOBS > 0 else TRAINING_N_JOBS
+    results = Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+        delayed(_fit_estimator)(name, estimator, Xt_train, y_train, Xt_test, y_test)
+        for name, estimator, _, _ in configs
+    )
+
+    meta = {name: (model_type, desc) for name, _, model_type, desc in configs}
+    for name, estimator, auc in results:
+        model_type, desc = meta[name]
+        # Each model still ships as a self-contained pipeline for inference;
+        # they share the one fitted preprocessor instance.
+        pipe = Pipeline(steps=[("prep", preprocessor), ("est", estimator)])
         models[name] = {
+            "name": name,
             "pipeline": pipe,
             "auc": auc,
             "type": model_type,
             "description": desc,
+            "version": version,
         }
+        if on_progress:
+            on_progress(name, "ready")
 
-    return models
+    # Keep the registry in config order regardless of completion order
+    registry = {name: models[name] for name, *_ in configs}
+    compiled_scoring.compile_registry(
+        registry, FEATURE_NUMERIC, FEATURE_CATEGORICAL, sample=X_test.head(COMPILE_SAMPLE_SIZE)
+    )
+    return registry
 
 
-def predict_vehicle_risk(vehicle: models.Vehicle, model_name: str) -> float:
+def train_models_from_db(db: Session) -> Dict[str, Dict[str, Any]]:
+    return train_models_from_frame(build_training_dataframe(db))
+
+
+def training_checkpoint(
+    registry: Dict[str, Dict[str, Any]], watermark: int
+) -> Dict[str, Any]:
+    """
+    Starting point for incremental updates after a full training run: the
+    last vehicle id trained on, each model's holdout AUC as the baseline for
+    drift checks, and the scaler statistics of the full training set.
+    """
+    prep = next(iter(registry.values()))["pipeline"].named_steps["prep"]
+    scaler = prep.named_transformers_["num"]
+    return {
+        "watermark": watermark,
+        "full_trained_at": datetime.utcnow().isoformat(),
+        "baseline_auc": {name: info["auc"] for name, info in registry.items()},
+        "reference_mean": scaler.mean_.tolist(),
+        "reference_scale": scaler.scale_.tolist(),
+        "increments": [],
+    }
+
+
+def load_or_train_models(
+    db: Session,
+    force_retrain: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+) -> model_registry.ModelRegistry:
+    """
+    Use the models in the artifact store when they were built from the
+    same training data and configs (their pipelines load on first use);
+    otherwise train and store them. Only the retrain path reads the
+    training table; the check compares watermarks (source_fingerprint).
+    """
+    # Fixed upper bound, so vehicles inserted while reading are left for
+    # the next (incremental) run rather than half-included.
+    watermark = max_vehicle_id(db)
+    fingerprint = source_fingerprint(db, watermark)
+
+    manifest = None if force_retrain else model_artifacts.load_manifest(fingerprint)
+    if manifest is not None:
+        print("Using models from artifacts:", model_artifacts.ARTIFACT_DIR)
+        registry = model_registry.build_registry(manifest)
+        if on_progress:
+            for name in registry:
+                on_progress(name, "ready")
+        return registry
+
+    df = build_training_dataframe(db, upto_id=watermark)
+    trained = train_models_from_frame(df, on_progress=on_progress)
+    model_artifacts.save_models(
+        trained,
+        fingerprint,
+        FEATURE_NUMERIC,
+        FEATURE_CATEGORICAL,
+        checkpoint=training_checkpoint(trained, watermark),
+        sample=df[FEATURE_NUMERIC + FEATURE_CATEGORICAL].head(COMPILE_SAMPLE_SIZE),
+        data_hash=model_artifacts.training_fingerprint(
+            df, FEATURE_NUMERIC, FEATURE_CATEGORICAL, model_config_signature()
+        ),
+    )
+    return model_registry.build_registry(model_artifacts.read_manifest(), trained=trained)
+
+
+def resolve_model(model_name: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Return (name, registry entry) for "name" (the serving version) or
+    "name@version", falling back to the default model for unknown names.
+    Unknown versions raise model_registry.UnknownModelVersionError.
+    """
+    # Take one snapshot of the registry so a concurrent swap can't hand us
+    # a name from one registry and a pipeline from another.
+    registry = MODEL_REGISTRY
     # Extra safety: fail early if initialize_models() was never called
-    if not MODEL_REGISTRY:
-        raise RuntimeError(
+    if not registry:
+        raise ModelsNotReadyError(
             "MODEL_REGISTRY is empty. Did you call initialize_models() on startup?"
         )
 
-    if model_name not in MODEL_REGISTRY:
+    name, version = model_registry.parse_model_ref(model_name)
+    if version is not None:
+        entry = registry.version(name, version)
+        if entry is None:
+            raise model_registry.UnknownModelVersionError(
+                f"Unknown model version: {model_name}"
+            )
+        return name, entry
+
+    if name not in registry:
         # fall back to default if unknown model name comes from query
-        model_name = DEFAULT_MODEL_NAME
+        name = DEFAULT_MODEL_NAME
+    return name, registry[name]
 
-    pipe: Pipeline = MODEL_REGISTRY[model_name]["pipeline"]
-    row = pd.DataFrame(
-        [
-            {
-                "model": vehicle.model,
-                "model_year": vehicle.model_year,
-                "mileage": vehicle.mileage,
-                "age_months": vehicle.age_months,
-                "avg_engine_temp": vehicle.avg_engine_temp,
-                "avg_vibration": vehicle.avg_vibration,
-                "services_last_12m": vehicle.services_last_12m,
-                "supplier_code": vehicle.supplier_code,
-                "plant_code": vehicle.plant_code,
-                "region": vehicle.region,
-            }
-        ]
+
+def vehicles_to_feature_frame(vehicles: Sequence[models.Vehicle]) -> pd.DataFrame:
+    """
+    Build a column-oriented feature frame (one column per model feature)
+    from a sequence of Vehicle rows, without going through per-row dicts.
+    Derived features come from each vehicle's feature-store row
+    (Vehicle.features, which callers should eager-load).
+    """
+    frame = pd.DataFrame(
+        {col: [getattr(v, col) for v in vehicles] for col in VEHICLE_NUMERIC + VEHICLE_CATEGORICAL}
+    )
+    derived = pd.DataFrame(
+        [feature_store.derived_values(v.features) for v in vehicles],
+        columns=feature_store.DERIVED_FEATURES,
+    )
+    return pd.concat([frame, derived], axis=1)[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
+
+
+def _as_feature_input(
+    vehicles: Union[Sequence[Any], pd.DataFrame]
+) -> Union[Sequence[Any], pd.DataFrame]:
+    # ORM rows lack the derived features as attributes; feature rows
+    # (see _feature_row) and frames already carry every model input.
+    if isinstance(vehicles, pd.DataFrame) or not any(
+        isinstance(v, models.Vehicle) for v in vehicles
+    ):
+        return vehicles
+    return vehicles_to_feature_frame(vehicles)
+
+
+def predict_risk_batch(
+    vehicles: Union[Sequence[models.Vehicle], pd.DataFrame], model_name: str
+) -> np.ndarray:
+    """
+    Score many vehicles with a single predict_proba call.
+    Accepts either Vehicle rows or a feature frame with the model columns.
+    Returns the failure probabilities in input order.
+    """
+    _, entry = resolve_model(model_name)
+    return predict_with_entry(entry, vehicles)
+
+
+def predict_with_entry(
+    entry: Dict[str, Any], vehicles: Union[Sequence[models.Vehicle], pd.DataFrame]
+) -> np.ndarray:
+    # Score with an entry already taken from resolve_model(), so a caller
+    # scoring many chunks keeps using one model version throughout.
+    # Verified NumPy-only scorer, when the pipeline could be compiled.
+    # Read before timing: the first use of a version loads it.
+    compiled = entry.get("compiled")
+    started = time.perf_counter()
+    vehicles = _as_feature_input(vehicles)
+
+    if compiled is not None:
+        scores = compiled.predict(vehicles)
+    else:
+        if isinstance(vehicles, pd.DataFrame):
+            X = vehicles[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
+        else:
+            X = vehicles_to_feature_frame(vehicles)
+        if len(X) == 0:
+            scores = np.empty(0, dtype=float)
+        else:
+            scores = entry["pipeline"].predict_proba(X)[:, 1].astype(float)
+
+    metrics.observe_inference(
+        entry.get("name", "unknown"),
+        len(scores),
+        time.perf_counter() - started,
+        compiled is not None,
+    )
+    return scores
+
+
+def predict_with_registry(
+    registry: Dict[str, Dict[str, Any]],
+    vehicles: Union[Sequence[models.Vehicle], pd.DataFrame],
+) -> Dict[str, np.ndarray]:
+    """
+    Score the same vehicles with every model in the registry. Features are
+    encoded once per distinct preprocessing (all models of one training run
+    share it) and the matrix is fed to each estimator in turn.
+    """
+    if len(vehicles) == 0:
+        return {name: np.empty(0, dtype=float) for name in registry}
+    vehicles = _as_feature_input(vehicles)
+
+    encoded: Dict[Any, Any] = {}
+    frame: Optional[pd.DataFrame] = None
+    scores: Dict[str, np.ndarray] = {}
+    for name, entry in registry.items():
+        compiled = entry.get("compiled")
+        # The shared encode is timed with the first model that needs it
+        started = time.perf_counter()
+        if compiled is not None:
+            key = ("compiled", compiled.preprocessing_key)
+            if key not in encoded:
+                encoded[key] = compiled.encode(vehicles)
+            result = compiled.estimator_fn(encoded[key])
+        else:
+            pipe = entry["pipeline"]
+            if frame is None:
+                frame = (
+                    vehicles[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
+                    if isinstance(vehicles, pd.DataFrame)
+                    else vehicles_to_feature_frame(vehicles)
+                )
+            prep = pipe.named_steps["prep"]
+            key = ("pipeline", id(prep))
+            if key not in encoded:
+                encoded[key] = prep.transform(frame)
+            result = pipe.named_steps["est"].predict_proba(encoded[key])[:, 1]
+        scores[name] = np.asarray(result, dtype=float)
+        metrics.observe_inference(
+            name, len(result), time.perf_counter() - started, compiled is not None
+        )
+    return scores
+
+
+def ensemble_weights(registry: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """
+    AUC weights for the ensemble score: each model counts in proportion to
+    its holdout AUC above chance (0.5), so a model no better than random
+    contributes nothing. Falls back to equal weights if none beats chance.
+    """
+    skill = {name: max(float(info["auc"]) - 0.5, 0.0) for name, info in registry.items()}
+    total = sum(skill.values())
+    if total <= 0:
+        return {name: 1.0 / len(registry) for name in registry}
+    return {name: value / total for name, value in skill.items()}
+
+
+def ensemble_scores(
+    registry: Dict[str, Dict[str, Any]], scores: Dict[str, np.ndarray]
+) -> np.ndarray:
+    weights = ensemble_weights(registry)
+    return sum(weights[name] * scores[name] for name in registry)
+
+
+# Coalesces concurrent single-vehicle scoring into one vectorized call
+SCORING_BATCHER = ScoringBatcher(predict_with_entry)
+
+
+def _feature_row(vehicle: models.Vehicle) -> SimpleNamespace:
+    # Copy of the model inputs taken in the caller's thread, so a batch
+    # leader never reads another request's ORM instance.
+    return SimpleNamespace(
+        **{col: getattr(vehicle, col) for col in VEHICLE_NUMERIC + VEHICLE_CATEGORICAL},
+        **feature_store.derived_values(vehicle.features),
     )
-    proba = pipe.predict_proba(row)[:, 1][0]
-    return float(proba)
+
+
+def predict_vehicle_risk(vehicle: models.Vehicle, model_name: str) -> float:
+    _, entry = resolve_model(model_name)
+    return SCORING_BATCHER.score(entry, _feature_row(vehicle))
+
+# -----------------------------
+# Materialized risk scores
+# -----------------------------
+
+SCORE_REFRESH_CHUNK_SIZE = 5000
+
+
+def score_vehicles(
+    db: Session, vehicles: Sequence[models.Vehicle], model_name: str
+) -> np.ndarray:
+    """
+    Return risk scores for the given vehicles, reading precomputed scores
+    from vehicle_risk_scores and live-scoring (then storing) only the misses.
+    """
+    model_name, entry = resolve_model(model_name)
+    version = entry["version"]
+    ids = [v.id for v in vehicles]
+
+    cached = risk_scores.load_risk_scores(db, model_name, version, ids)
+    misses = [v for v in vehicles if v.id not in cached]
+    if misses:
+        if len(misses) == 1:
+            # Single-vehicle lookups (the detail route) share batches
+            # with concurrent requests
+            fresh = [SCORING_BATCHER.score(entry, _feature_row(misses[0]))]
+        else:
+            fresh = predict_with_entry(entry, misses)
+        risk_scores.store_risk_scores(
+            db, model_name, version, [v.id for v in misses], fresh
+        )
+        db.commit()
+        cached.update({v.id: float(p) for v, p in zip(misses, fresh)})
+
+    return np.array([cached[i] for i in ids], dtype=float)
+
+
+def score_vehicles_all_models(
+    db: Session, vehicles: Sequence[models.Vehicle], include_ensemble: bool = False
+) -> Tuple[Dict[str, np.ndarray], Optional[np.ndarray]]:
+    """
+    Scores of every registered model for the given vehicles, plus the
+    AUC-weighted ensemble when requested. Stored scores for all models are
+    read with one query; vehicles missing any of them are scored by every
+    model in one pass (see predict_with_registry) and stored.
+    Returns ({model_name: scores}, ensemble scores or None).
+    """
+    # One snapshot, so every score comes from the same registry
+    registry = MODEL_REGISTRY
+    if not registry:
+        raise ModelsNotReadyError("MODEL_REGISTRY is empty.")
+    ids = [v.id for v in vehicles]
+
+    cached = risk_scores.load_model_scores(
+        db, {name: info["version"] for name, info in registry.items()}, ids
+    )
+    misses = [v for v in vehicles if any(v.id not in cached[name] for name in registry)]
+    if misses:
+        miss_ids = [v.id for v in misses]
+        fresh = predict_with_registry(registry, misses)
+        for name, info in registry.items():
+            risk_scores.store_risk_scores(db, name, info["version"], miss_ids, fresh[name])
+            cached[name].update(zip(miss_ids, fresh[name].tolist()))
+        db.commit()
+
+    scores = {
+        name: np.array([cached[name][i] for i in ids], dtype=float) for name in registry
+    }
+    ensemble = ensemble_scores(registry, scores) if include_ensemble else None
+    return scores, ensemble
+
+
+def materialize_missing_scores(db: Session, model_name: str, entry: Dict[str, Any]) -> int:
+    """
+    Score, in chunks, every vehicle that has no stored score for this model
+    version (new vehicles, or ones whose scores were invalidated).
+    Returns the number of vehicles scored.
+    """
+    derived = {c.name: c for c in feature_store.derived_columns()}
+    columns = [
+        derived[c] if c in derived else getattr(models.Vehicle, c)
+        for c in FEATURE_NUMERIC + FEATURE_CATEGORICAL
+    ]
+    score = models.VehicleRiskScore
+    version = entry["version"]
+    scored = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            feature_store.join_features(select(models.Vehicle.id, *columns))
+            .outerjoin(
+                score,
+                (score.vehicle_id == models.Vehicle.id)
+                & (score.model_name == model_name)
+                & (score.model_version == version),
+            )
+            .where(score.vehicle_id.is_(None), models.Vehicle.id > last_id)
+            .order_by(models.Vehicle.id)
+            .limit(SCORE_REFRESH_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        frame = pd.DataFrame(rows, columns=["id"] + FEATURE_NUMERIC + FEATURE_CATEGORICAL)
+        scores = predict_with_entry(entry, frame)
+        risk_scores.store_risk_scores(db, model_name, version, frame["id"].tolist(), scores)
+        db.commit()
+        scored += len(frame)
+        last_id = int(frame["id"].iloc[-1])
+    return scored
+
+
+def refresh_risk_scores(db: Session) -> None:
+    """
+    Bulk-score the whole fleet for every registered model version and drop
+    scores that belong to older versions or models no longer registered.
+    """
+    registry = MODEL_REGISTRY
+    risk_scores.purge_unknown_models(db, list(registry))
+
+    for name, info in registry.items():
+        risk_scores.purge_stale_scores(db, name, info["version"])
+        # Models loaded from artifacts keep their version, so usually only
+        # vehicles added since the previous run need scoring here.
+        materialize_missing_scores(db, name, info)
+
+    db.commit()
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidate_scores_on_feature_change(session, flush_context, instances) -> None:
+    # Any change to a model feature column makes that vehicle's cached
+    # scores stale for every model version. (Derived features invalidate
+    # on refresh, see feature_store.)
+    feature_columns = VEHICLE_NUMERIC + VEHICLE_CATEGORICAL
+    changed_ids = [
+        obj.id
+        for obj in session.dirty
+        if isinstance(obj, models.Vehicle)
+        and obj.id is not None
+        and session.is_modified(obj)
+        and any(
+            inspect(obj).attrs[col].history.has_changes()
+            for col in feature_columns
+        )
+    ]
+    if changed_ids:
+        risk_scores.invalidate_vehicle_scores(session, changed_ids)
+
 
 def bucket_from_risk(score: float) -> str:
     if score >= 0.7:
@@ -344,21 +785,48 @@ def bucket_from_risk(score: float) -> str:
         return "Medium"
     return "Low"
 
-def initialize_models() -> None:
+
+def buckets_from_risk(scores: np.ndarray) -> np.ndarray:
+    # Vectorized bucket_from_risk for whole score arrays
+    return np.select([scores >= 0.7, scores >= 0.4], ["High", "Medium"], default="Low")
+
+
+def initialize_models(
+    force_retrain: bool = False, on_progress: Optional[ProgressCallback] = None
+) -> None:
     """
-    Create tables, seed synthetic data if needed, and train all ML models.
-    Populates the global MODEL_REGISTRY.
+    Create tables, seed synthetic data if needed, and load the ML models from
+    the artifact store (training them only if the stored ones are stale, or
+    always when force_retrain is set).
+    Swaps the finished models into MODEL_REGISTRY and refreshes the
+    vehicle_risk_scores table.
     """
-    models.Base.metadata.create_all(bind=engine)
+    models.ensure_schema(engine)
 
     db: Session = SessionLocal()
     try:
         # Seed synthetic data only if empty
         seed_database(db)
+        # Bootstrap running sensor statistics and time-series rollups for
+        # databases loaded before ingestion and bulk loads maintained them
+        if sensor_ingest.sensor_stats_empty(db):
+            sensor_ingest.rebuild_sensor_stats(db)
+        if sensor_timeseries.sensor_rollups_empty(db):
+            sensor_timeseries.rebuild_sensor_rollups(db)
+        # Derived features of new vehicles and of those whose history
+        # changed through bulk loads since the last run
+        refreshed = feature_store.refresh_stale_features(db)
+        if refreshed:
+            print("Refreshed derived features:", refreshed, "vehicles")
+
+        registry = load_or_train_models(
+            db, force_retrain=force_retrain, on_progress=on_progress
+        )
+        set_model_registry(registry)
 
-        global MODEL_REGISTRY
-        MODEL_REGISTRY = train_models_from_db(db)
+        print("Trained models:", {k: v["auc"] for k, v in registry.items()})
 
-        print("Trained models:", {k: v["auc"] for k, v in MODEL_REGISTRY.items()})
+        # Materialize scores for the new model versions
+        refresh_risk_scores(db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
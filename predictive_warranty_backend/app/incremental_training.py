@@ -0,0 +1,238 @@
+import copy
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app import compiled_scoring, feature_store, model_artifacts
+from app.database import SessionLocal
+from app.generate_synthetic_data_and_train import (
+    COMPILE_SAMPLE_SIZE,
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    ProgressCallback,
+    build_training_dataframe,
+    get_model_registry,
+    initialize_models,
+    max_vehicle_id,
+    new_model_version,
+    refresh_risk_scores,
+    set_model_registry,
+    source_fingerprint,
+)
+
+# -----------------------------
+# Incremental model updates
+# -----------------------------
+#
+# A full training run stores a checkpoint in the artifact manifest (see
+# training_checkpoint): the last vehicle id it trained on, each model's
+# holdout AUC and the scaler statistics of its training set. An
+# incremental run reads only the vehicles added after that id and, for
+# every model whose estimator supports partial_fit (MLP, SGD):
+#
+#   1. scores the new vehicles with the serving model before training on
+#      them (test-then-train), which is the increment's holdout AUC;
+#   2. folds them into the scaler's running mean/variance
+#      (StandardScaler.partial_fit); one-hot categories stay fixed and
+#      unseen values encode to all zeros;
+#   3. runs estimator.partial_fit on the transformed rows.
+#
+# Updated models get a new version; models without partial_fit (decision
+# tree, SVM) keep serving their current version. When an increment's AUC
+# falls too far below the full-training baseline, or a feature mean has
+# moved too far from the reference statistics, the run falls back to a
+# full retrain instead.
+#
+# Only appended vehicles are seen: edits to already-trained rows are
+# picked up by the next full retrain.
+
+INCREMENTAL_MIN_ROWS = int(os.environ.get("WARRANTY_INCREMENTAL_MIN_ROWS", "100"))
+INCREMENTAL_EPOCHS = int(os.environ.get("WARRANTY_INCREMENTAL_EPOCHS", "1"))
+# Drift thresholds: absolute AUC drop below the baseline, and shift of a
+# numeric feature's mean in reference standard deviations
+MAX_AUC_DROP = float(os.environ.get("WARRANTY_INCREMENTAL_MAX_AUC_DROP", "0.05"))
+MAX_MEAN_SHIFT = float(os.environ.get("WARRANTY_INCREMENTAL_MAX_MEAN_SHIFT", "0.5"))
+# Increment records kept in the checkpoint
+MAX_INCREMENT_HISTORY = 50
+
+
+def supports_partial_fit(entry: Dict[str, Any]) -> bool:
+    return hasattr(entry["pipeline"].named_steps["est"], "partial_fit")
+
+
+def _holdout_auc(entry: Dict[str, Any], X: pd.DataFrame, y: np.ndarray) -> Optional[float]:
+    # AUC is undefined when the increment holds a single class
+    if len(np.unique(y)) < 2:
+        return None
+    from sklearn.metrics import roc_auc_score
+
+    return float(roc_auc_score(y, entry["pipeline"].predict_proba(X)[:, 1]))
+
+
+def _mean_shift(X: pd.DataFrame, checkpoint: Dict[str, Any]) -> float:
+    mean = np.asarray(checkpoint["reference_mean"], dtype=float)
+    scale = np.asarray(checkpoint["reference_scale"], dtype=float)
+    batch_mean = X[FEATURE_NUMERIC].to_numpy(dtype=float).mean(axis=0)
+    return float(np.max(np.abs(batch_mean - mean) / scale))
+
+
+def _drift_reasons(record: Dict[str, Any], checkpoint: Dict[str, Any]) -> List[str]:
+    reasons = []
+    if record["mean_shift"] > MAX_MEAN_SHIFT:
+        reasons.append(f"feature mean shift {record['mean_shift']:.3f} > {MAX_MEAN_SHIFT}")
+    for name, auc in record["auc"].items():
+        baseline = checkpoint["baseline_auc"].get(name)
+        if auc is not None and baseline is not None and baseline - auc > MAX_AUC_DROP:
+            reasons.append(f"{name} AUC {auc:.3f} vs baseline {baseline:.3f}")
+    return reasons
+
+
+def _updated_entry(
+    entry: Dict[str, Any], X: pd.DataFrame, y: np.ndarray, auc: Optional[float], version: str
+) -> Dict[str, Any]:
+    # Update a copy: the serving pipeline (and the preprocessor it shares
+    # with the other models) is never modified in place.
+    pipe = copy.deepcopy(entry["pipeline"])
+    prep = pipe.named_steps["prep"]
+    estimator = pipe.named_steps["est"]
+    prep.named_transformers_["num"].partial_fit(X[FEATURE_NUMERIC])
+    Xt = prep.transform(X)
+    for _ in range(INCREMENTAL_EPOCHS):
+        estimator.partial_fit(Xt, y, classes=np.array([0, 1]))
+
+    updated = dict(entry, pipeline=pipe, version=version)
+    if auc is not None:
+        updated["auc"] = auc
+    updated["compiled"] = (
+        compiled_scoring.compile_pipeline(
+            pipe, FEATURE_NUMERIC, FEATURE_CATEGORICAL, X.head(COMPILE_SAMPLE_SIZE)
+        )
+        if compiled_scoring.COMPILED_SCORING_ENABLED
+        else None
+    )
+    return updated
+
+
+def _full_retrain(
+    record: Dict[str, Any],
+    history: List[Dict[str, Any]],
+    on_progress: Optional[ProgressCallback],
+) -> Dict[str, Any]:
+    initialize_models(force_retrain=True, on_progress=on_progress)
+    record["action"] = "full_retrain"
+    record["finished_at"] = datetime.utcnow().isoformat()
+    # The retrain wrote a fresh checkpoint; keep the increment history
+    checkpoint = model_artifacts.read_checkpoint()
+    if checkpoint is not None:
+        checkpoint["increments"] = (history + [record])[-MAX_INCREMENT_HISTORY:]
+        model_artifacts.write_checkpoint(checkpoint)
+    return record
+
+
+def _serving_checkpoint(registry: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # The stored checkpoint only applies to the model versions being served
+    manifest = model_artifacts.read_manifest()
+    if not manifest or not manifest.get("checkpoint") or not registry:
+        return None
+    stored = {name: entry.get("version") for name, entry in manifest["models"].items()}
+    if stored != {name: entry["version"] for name, entry in registry.items()}:
+        return None
+    return manifest["checkpoint"]
+
+
+def update_models_incrementally(
+    on_progress: Optional[ProgressCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Update the partial_fit-capable models from vehicles added since the
+    last checkpoint, or fall back to a full retrain (no usable checkpoint,
+    or drift beyond the thresholds). Returns the increment record:
+    rows read, holdout AUC per updated model, feature mean shift and the
+    action taken (updated | skipped | full_retrain).
+    """
+    registry = get_model_registry()
+    checkpoint = _serving_checkpoint(registry)
+    record: Dict[str, Any] = {
+        "started_at": datetime.utcnow().isoformat(),
+        "after_id": None,
+        "upto_id": None,
+        "rows": 0,
+        "positives": 0,
+        "auc": {},
+        "mean_shift": None,
+        "reason": None,
+    }
+    if checkpoint is None:
+        record["reason"] = "no checkpoint for the serving models"
+        return _full_retrain(record, [], on_progress)
+    history = list(checkpoint.get("increments", []))
+
+    db: Session = SessionLocal()
+    try:
+        # New vehicles (and bulk-loaded history) need their derived
+        # features before they are read
+        feature_store.refresh_stale_features(db)
+        after_id = checkpoint["watermark"]
+        upto_id = max_vehicle_id(db)
+        new = build_training_dataframe(db, after_id=after_id, upto_id=upto_id)
+        record.update(after_id=after_id, upto_id=upto_id, rows=len(new))
+        if len(new) < INCREMENTAL_MIN_ROWS:
+            # Leave the watermark in place until enough vehicles arrive
+            record["action"] = "skipped"
+            record["reason"] = f"fewer than {INCREMENTAL_MIN_ROWS} new vehicles"
+            record["finished_at"] = datetime.utcnow().isoformat()
+            return record
+
+        X = new[FEATURE_NUMERIC + FEATURE_CATEGORICAL]
+        y = new["failure_label"].to_numpy(dtype=int)
+        record["positives"] = int(y.sum())
+        record["mean_shift"] = _mean_shift(X, checkpoint)
+
+        updatable = [name for name, entry in registry.items() if supports_partial_fit(entry)]
+        for name in updatable:
+            record["auc"][name] = _holdout_auc(registry[name], X, y)
+
+        reasons = _drift_reasons(record, checkpoint)
+        if reasons:
+            record["reason"] = "; ".join(reasons)
+            db.close()
+            return _full_retrain(record, history, on_progress)
+
+        version = new_model_version()
+        updated = dict(registry)
+        for name in registry:
+            if name not in updatable:
+                if on_progress:
+                    on_progress(name, "ready")
+                continue
+            if on_progress:
+                on_progress(name, "training")
+            updated[name] = _updated_entry(registry[name], X, y, record["auc"][name], version)
+            if on_progress:
+                on_progress(name, "ready")
+
+        record["action"] = "updated"
+        record["finished_at"] = datetime.utcnow().isoformat()
+        checkpoint = dict(
+            checkpoint,
+            watermark=upto_id,
+            increments=(history + [record])[-MAX_INCREMENT_HISTORY:],
+        )
+        # The stored fingerprint must describe the table the models now
+        # reflect, so a restart loads them instead of retraining.
+        fingerprint = source_fingerprint(db, upto_id)
+        model_artifacts.save_models(
+            updated, fingerprint, FEATURE_NUMERIC, FEATURE_CATEGORICAL, checkpoint=checkpoint
+        )
+        set_model_registry(updated)
+        print("Incremental update:", {k: v for k, v in record.items() if k != "started_at"})
+
+        # Only the updated models have new versions to score
+        refresh_risk_scores(db)
+    finally:
+        db.close()
+    return record
@@ -0,0 +1,170 @@
+import time
+from typing import Optional
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.utils import check_random_state
+from sklearn.utils.validation import check_array, check_is_fitted, check_X_y
+
+# -----------------------------
+# Scalable kernel SVM
+# -----------------------------
+#
+# An exact RBF SVC costs O(n^2)-O(n^3) to train, and probability=True adds
+# an internal 5-fold Platt calibration on top. NystroemSVM approximates the
+# same kernel with an explicit n_components-dimensional feature map, fitted
+# on a random sample of rows, and trains a linear hinge-loss SGD classifier
+# on the mapped rows. Training is linear in the row count:
+#
+#   1. a calibration split is held out (stratified);
+#   2. the Nystroem map is fitted on at most n_components training rows;
+#   3. SGD epochs run over the mapped rows in chunks (mapped on the fly
+#      unless they fit in MAX_CACHED_VALUES), until the weights stop moving,
+#      max_epochs is reached or time_budget_seconds runs out (checked after
+#      every chunk once the first full epoch is done);
+#   4. a Platt sigmoid is fitted on the held-out decision values.
+
+# Rows mapped and fed to partial_fit at a time
+FIT_CHUNK_ROWS = 8192
+# Mapped training matrices up to this many values are kept between epochs
+MAX_CACHED_VALUES = 20_000_000
+
+
+def _rbf_scale_gamma(X) -> float:
+    # gamma="scale" as in SVC: 1 / (n_features * X.var())
+    if sp.issparse(X):
+        variance = X.multiply(X).mean() - X.mean() ** 2
+    else:
+        variance = X.var()
+    return 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+
+
+class NystroemSVM(ClassifierMixin, BaseEstimator):
+    """
+    Binary RBF-kernel SVM approximated by a Nystroem feature map and a
+    linear SGD classifier, with a separately fitted Platt calibration.
+    """
+
+    def __init__(
+        self,
+        n_components: int = 300,
+        gamma="scale",
+        alpha: float = 1e-4,
+        class_weight: Optional[str] = "balanced",
+        calibration_fraction: float = 0.2,
+        max_epochs: int = 20,
+        tol: float = 1e-3,
+        time_budget_seconds: Optional[float] = 60.0,
+        random_state: Optional[int] = None,
+    ):
+        self.n_components = n_components
+        self.gamma = gamma
+        self.alpha = alpha
+        self.class_weight = class_weight
+        self.calibration_fraction = calibration_fraction
+        self.max_epochs = max_epochs
+        self.tol = tol
+        self.time_budget_seconds = time_budget_seconds
+        self.random_state = random_state
+
+    def _mapped_chunks(self, X, order: np.ndarray):
+        for start in range(0, len(order), FIT_CHUNK_ROWS):
+            idx = order[start : start + FIT_CHUNK_ROWS]
+            yield idx, self.feature_map_.transform(X[idx])
+
+    def fit(self, X, y):
+        started = time.perf_counter()
+        X, y = check_X_y(X, y, accept_sparse="csr", dtype=np.float64)
+        self.classes_ = np.unique(y)
+        if len(self.classes_) != 2:
+            raise ValueError("NystroemSVM is a binary classifier.")
+        rng = check_random_state(self.random_state)
+        y01 = (y == self.classes_[1]).astype(int)
+
+        X_fit, X_cal, y_fit, y_cal = train_test_split(
+            X, y01, test_size=self.calibration_fraction, stratify=y01, random_state=rng
+        )
+        gamma = _rbf_scale_gamma(X_fit) if self.gamma == "scale" else float(self.gamma)
+        n_components = min(self.n_components, X_fit.shape[0])
+        self.feature_map_ = Nystroem(
+            kernel="rbf", gamma=gamma, n_components=n_components, random_state=rng
+        ).fit(X_fit)
+
+        n_fit = X_fit.shape[0]
+        if self.class_weight == "balanced":
+            counts = np.bincount(y_fit, minlength=2)
+            weights = (n_fit / (2.0 * np.maximum(counts, 1)))[y_fit]
+        else:
+            weights = np.ones(n_fit)
+
+        self.classifier_ = SGDClassifier(
+            loss="hinge", alpha=self.alpha, learning_rate="optimal", random_state=rng
+        )
+        cache = (
+            list(self._mapped_chunks(X_fit, np.arange(n_fit)))
+            if n_fit * n_components <= MAX_CACHED_VALUES
+            else None
+        )
+
+        def over_budget() -> bool:
+            return (
+                self.time_budget_seconds is not None
+                and time.perf_counter() - started > self.time_budget_seconds
+            )
+
+        self.n_epochs_ = 0
+        self.budget_exhausted_ = False
+        previous = None
+        while self.n_epochs_ < self.max_epochs and not self.budget_exhausted_:
+            if cache is not None:
+                chunks = (cache[i] for i in rng.permutation(len(cache)))
+            else:
+                chunks = self._mapped_chunks(X_fit, rng.permutation(n_fit))
+            for idx, Z in chunks:
+                self.classifier_.partial_fit(
+                    Z, y_fit[idx], classes=np.array([0, 1]), sample_weight=weights[idx]
+                )
+                # Later epochs may stop part-way through
+                if self.n_epochs_ and over_budget():
+                    self.budget_exhausted_ = True
+                    break
+            else:
+                self.n_epochs_ += 1
+            if self.n_epochs_ == 1 and over_budget():
+                self.budget_exhausted_ = True
+
+            coef = self.classifier_.coef_.ravel().copy()
+            if previous is not None:
+                moved = np.linalg.norm(coef - previous) / max(np.linalg.norm(coef), 1e-12)
+                if moved < self.tol:
+                    break
+            previous = coef
+
+        # Platt scaling on rows the classifier never saw
+        self.calibrator_ = LogisticRegression(C=1e6).fit(
+            self._decision(X_cal)[:, None], y_cal
+        )
+        self.fit_seconds_ = time.perf_counter() - started
+        return self
+
+    def _decision(self, X) -> np.ndarray:
+        out = np.empty(X.shape[0])
+        for start in range(0, X.shape[0], FIT_CHUNK_ROWS):
+            Z = self.feature_map_.transform(X[start : start + FIT_CHUNK_ROWS])
+            out[start : start + Z.shape[0]] = self.classifier_.decision_function(Z)
+        return out
+
+    def decision_function(self, X) -> np.ndarray:
+        check_is_fitted(self, "calibrator_")
+        return self._decision(check_array(X, accept_sparse="csr", dtype=np.float64))
+
+    def predict_proba(self, X) -> np.ndarray:
+        positive = self.calibrator_.predict_proba(self.decision_function(X)[:, None])[:, 1]
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[(self.predict_proba(X)[:, 1] >= 0.5).astype(int)]
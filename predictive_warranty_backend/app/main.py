@@ -1,17 +1,70 @@
-from fastapi import FastAPI, Depends, Query, HTTPException
+from fastapi import FastAPI, Depends, File, Query, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from datetime import datetime
+from typing import List, Optional
+import logging
+import os
+import time
 from .database import SessionLocal, engine, Base, get_db
 from .generate_synthetic_data_and_train import (
-    initialize_models,
     DEFAULT_MODEL_NAME,
-    MODEL_REGISTRY,
-    predict_vehicle_risk,
+    ModelsNotReadyError,
+    get_model_registry,
+    resolve_model,
+    score_vehicles,
+    score_vehicles_all_models,
     bucket_from_risk,
+    buckets_from_risk,
 )
-from .schemas import ModelInfo, VehicleSummary, VehicleDetail, ServiceRecordOut
-from .models import Vehicle
-from sqlalchemy.orm import Session
+from .training import start_training, training_status
+from .model_registry import UnknownModelVersionError, cache_status
+from .bulk_load import load_file
+from .feature_store import feature_store_status, refresh_stale_features
+from .export import (
+    DEFAULT_EXPORT_CHUNK_SIZE,
+    EXPORT_MEDIA_TYPES,
+    arrow_available,
+    stream_export,
+)
+from .schemas import (
+    ModelInfo,
+    VehicleSummary,
+    VehicleDetail,
+    SensorReadingIn,
+    SensorIngestResult,
+    SensorSeries,
+    FleetAggregateReport,
+)
+from .fleet_aggregates import GROUP_BY_PATTERN, fleet_risk_aggregates
+from .sensor_ingest import UnknownVehicleError, ingest_sensor_readings, readings_frame
+from .sensor_timeseries import METRICS as SENSOR_METRICS, sensor_series
+from .models import Vehicle, ServiceRecord
+from .db_instrumentation import track_queries
+from .metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    observe_request,
+    render_metrics,
+    stage,
+    track_stages,
+)
+from .serialization import (
+    VEHICLE_SUMMARY_FIELDS,
+    FastJSONResponse,
+    add_model_score_columns,
+    add_model_scores,
+    service_record_row,
+    to_columns,
+    vehicle_summary_row,
+)
+from .vehicle_queries import (
+    SORT_PATTERN,
+    InvalidCursorError,
+    VehicleFilters,
+    encode_cursor,
+    keyset_page,
+)
+from sqlalchemy.orm import Session, joinedload, raiseload
 
 # -----------------------------
 # FastAPI app & routes
@@ -20,6 +73,7 @@ from sqlalchemy.orm import Session
 app = FastAPI(
     title="Predictive Warranty PoC",
     description="Predictive warranty risk scoring for OEMs using synthetic data.",
+    default_response_class=FastJSONResponse,
 )
 
 origins = [
@@ -28,124 +82,354 @@ origins = [
     "http://127.0.0.1:5173",
 ]
 
+logger = logging.getLogger(__name__)
+
+# Requests issuing more statements than this are logged as likely N+1 regressions
+QUERY_COUNT_WARN_THRESHOLD = int(os.environ.get("WARRANTY_QUERY_COUNT_WARN", "20"))
+
+
+@app.middleware("http")
+async def db_query_stats(request: Request, call_next):
+    started = time.perf_counter()
+    with track_queries() as stats, track_stages() as stages:
+        response = await call_next(request)
+    # Route templates (/vehicles/{vehicle_id}) keep label cardinality bounded.
+    # Streaming bodies are sent after this point and are not included.
+    route = request.scope.get("route")
+    observe_request(
+        request.method,
+        getattr(route, "path", "unmatched"),
+        response.status_code,
+        time.perf_counter() - started,
+        stages,
+        stats.seconds,
+    )
+    response.headers["X-DB-Query-Count"] = str(stats.statements)
+    response.headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+    log = logger.warning if stats.statements > QUERY_COUNT_WARN_THRESHOLD else logger.debug
+    log(
+        "%s %s: %d SQL statements, %.2f ms in DB",
+        request.method,
+        request.url.path,
+        stats.statements,
+        stats.seconds * 1000,
+    )
+    return response
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Query-Count", "X-DB-Time-Ms"],
 )
 
 
 @app.on_event("startup")
 def on_startup() -> None:
-    # initialize_models() will create tables, seed DB, and train models
-    initialize_models()
+    # Seeding and training run in the background; the API serves immediately
+    # and reports progress on /ready.
+    start_training()
+
+
+@app.exception_handler(ModelsNotReadyError)
+def models_not_ready_handler(request: Request, exc: ModelsNotReadyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Models are still training. Check /ready."},
+    )
+
+
+@app.exception_handler(UnknownModelVersionError)
+def unknown_model_version_handler(request: Request, exc: UnknownModelVersionError):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
 
 
 @app.get("/health")
 def health():
+    # Liveness only: the process is up and answering requests.
     return {"status": "ok"}
 
 
+@app.get("/ready")
+def ready():
+    status = training_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
+@app.post("/admin/retrain", status_code=202)
+def retrain(mode: str = Query("full", regex="^(full|incremental)$")):
+    # mode=incremental updates the partial_fit models from vehicles added
+    # since the last checkpoint, falling back to a full retrain on drift.
+    if not start_training(force_retrain=True, incremental=mode == "incremental"):
+        raise HTTPException(status_code=409, detail="Training already in progress")
+    return training_status()
+
+
+@app.post("/admin/features/refresh")
+def refresh_features(db: Session = Depends(get_db)):
+    # Recomputes the derived features of vehicles with stale or missing
+    # rows, e.g. after a bulk file ingest.
+    started = time.perf_counter()
+    refreshed = refresh_stale_features(db)
+    return {
+        "refreshed": refreshed,
+        "seconds": round(time.perf_counter() - started, 3),
+        **feature_store_status(db),
+    }
+
+
+@app.post("/admin/ingest/{table_name}")
+def ingest_file(
+    table_name: str,
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, regex="^(csv|parquet)$"),
+    db: Session = Depends(get_db),
+):
+    # Streams a fleet export (CSV/Parquet) into one table in chunks.
+    if file_format is None:
+        is_parquet = (file.filename or "").lower().endswith((".parquet", ".pq"))
+        file_format = "parquet" if is_parquet else "csv"
+    try:
+        return load_file(db, file.file, table_name, file_format)
+    except (ValueError, RuntimeError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    # Prometheus scrape target: request/stage latency histograms, SQL
+    # statement timings and model inference counts.
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 @app.get("/models", response_model=List[ModelInfo])
 def list_models():
+    registry = get_model_registry()
     return [
         ModelInfo(
             name=name,
             model_type=info["type"],
             auc=info["auc"],
             description=info["description"],
+            version=info["version"],
+            versions=registry.versions(name),
+            loaded=info.loaded,
         )
-        for name, info in MODEL_REGISTRY.items()
+        for name, info in registry.items()
     ]
 
 
+@app.get("/models/cache")
+def model_cache():
+    # Lazily loaded model versions held in memory, and the hit/miss/eviction
+    # counts of the registry cache (also exported on /metrics).
+    return cache_status()
+
+
+def _score_page(
+    db: Session, vehicles: List[Vehicle], model_name: str, all_models: bool, ensemble: bool
+):
+    # Returns (risk scores of model_name, per-model scores or None,
+    # ensemble scores or None). Either flag scores every model in one pass.
+    if not (all_models or ensemble):
+        return score_vehicles(db, vehicles, model_name), None, None
+    scores, ensemble_score = score_vehicles_all_models(db, vehicles, include_ensemble=ensemble)
+    if model_name in scores:
+        risks = scores[model_name]
+    else:
+        # name@version, or an unknown name scored by the default model
+        risks = score_vehicles(db, vehicles, model_name)
+    return risks, scores if all_models else None, ensemble_score
+
+
 @app.get("/vehicles", response_model=List[VehicleSummary])
 def list_vehicles(
     model_name: str = Query(DEFAULT_MODEL_NAME),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    sort_by: str = Query("id", regex=SORT_PATTERN),
+    order: str = Query("asc", regex="^(asc|desc)$"),
+    response_format: str = Query("records", alias="format", regex="^(records|columnar)$"),
+    all_models: bool = Query(False),
+    ensemble: bool = Query(False),
+    filters: VehicleFilters = Depends(),
     db: Session = Depends(get_db),
 ):
-    vehicles = db.query(Vehicle).limit(limit).all()
-    summaries: List[VehicleSummary] = []
-
-    for v in vehicles:
-        risk = predict_vehicle_risk(v, model_name)
-        risk_bucket = bucket_from_risk(risk)
-        summaries.append(
-            VehicleSummary(
-                id=v.id,
-                vin=v.vin,
-                model=v.model,
-                model_year=v.model_year,
-                mileage=v.mileage,
-                age_months=round(v.age_months, 1),
-                dealership_name=v.dealership.name if v.dealership else "N/A",
-                region=v.region,
-                supplier_code=v.supplier_code,
-                plant_code=v.plant_code,
-                avg_engine_temp=round(v.avg_engine_temp, 1),
-                avg_vibration=round(v.avg_vibration, 2),
-                services_last_12m=v.services_last_12m,
-                failure_label=v.failure_label,
-                risk_score=round(risk, 3),
-                risk_bucket=risk_bucket,
-            )
+    """
+    format=records (default) returns a list of VehicleSummary objects;
+    format=columnar returns {"count", "fields", "columns": {field: [...]}}
+    with one array per VehicleSummary field, for bulk consumers.
+    all_models=true adds model_scores (every registered model) and
+    ensemble=true the AUC-weighted ensemble_score, from the same page read;
+    risk_score stays the score of model_name.
+    """
+    # Fetch one extra row to learn whether another page exists; its cursor
+    # is returned in the X-Next-Cursor header.
+    try:
+        query = keyset_page(
+            # Dealership and the derived features are joined in the same
+            # SELECT; any other lazy load raises instead of silently issuing
+            # one query per row.
+            filters.apply(
+                db.query(Vehicle).options(
+                    joinedload(Vehicle.dealership),
+                    joinedload(Vehicle.features),
+                    raiseload("*"),
+                )
+            ),
+            sort_by,
+            order,
+            cursor,
+            limit + 1,
         )
-    return summaries
+    except InvalidCursorError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    vehicles = query.all()
+    headers = {}
+    if len(vehicles) > limit:
+        vehicles = vehicles[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(sort_by, order, vehicles[-1])
+
+    risks, model_scores, ensemble_score = _score_page(
+        db, vehicles, model_name, all_models, ensemble
+    )
+    buckets = buckets_from_risk(risks)
+
+    # Trusted ORM rows go straight to dicts; returning the Response skips
+    # re-validation against response_model (see app/serialization.py).
+    with stage("serialization"):
+        rows = [
+            vehicle_summary_row(v, risk, bucket)
+            for v, risk, bucket in zip(vehicles, risks.tolist(), buckets.tolist())
+        ]
+        if response_format == "columnar":
+            content = to_columns(rows, VEHICLE_SUMMARY_FIELDS)
+            add_model_score_columns(content, model_scores, ensemble_score)
+        else:
+            add_model_scores(rows, model_scores, ensemble_score)
+            content = rows
+    return FastJSONResponse(content, headers=headers)
+
+
+@app.get("/vehicles/export")
+def export_vehicle_scores(
+    model_name: str = Query(DEFAULT_MODEL_NAME),
+    export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv|arrow)$"),
+    chunk_size: int = Query(DEFAULT_EXPORT_CHUNK_SIZE, ge=100, le=100_000),
+    filters: VehicleFilters = Depends(),
+):
+    # Declared before /vehicles/{vehicle_id} so "export" isn't parsed as an id
+    if export_format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=400, detail="Arrow export requires pyarrow")
+
+    # Resolve once so the whole stream is scored by a single model version
+    model_name, entry = resolve_model(model_name)
+    return StreamingResponse(
+        stream_export(export_format, model_name, entry, filters, chunk_size),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="vehicle_scores.{export_format}"',
+            "X-Model-Version": entry["version"],
+        },
+    )
 
 
 @app.get("/vehicles/{vehicle_id}", response_model=VehicleDetail)
 def get_vehicle_detail(
     vehicle_id: int,
     model_name: str = Query(DEFAULT_MODEL_NAME),
+    history_limit: int = Query(100, ge=1, le=1000),
+    all_models: bool = Query(False),
+    ensemble: bool = Query(False),
     db: Session = Depends(get_db),
 ):
-    v = db.query(Vehicle).filter(Vehicle.id == vehicle_id).first()
+    v = (
+        db.query(Vehicle)
+        .options(joinedload(Vehicle.dealership), joinedload(Vehicle.features))
+        .filter(Vehicle.id == vehicle_id)
+        .first()
+    )
     if not v:
         raise HTTPException(status_code=404, detail="Vehicle not found")
 
-    risk = predict_vehicle_risk(v, model_name)
+    risks, model_scores, ensemble_score = _score_page(
+        db, [v], model_name, all_models, ensemble
+    )
+    risk = float(risks[0])
     risk_bucket = bucket_from_risk(risk)
 
-    summary = VehicleSummary(
-        id=v.id,
-        vin=v.vin,
-        model=v.model,
-        model_year=v.model_year,
-        mileage=v.mileage,
-        age_months=round(v.age_months, 1),
-        dealership_name=v.dealership.name if v.dealership else "N/A",
-        region=v.region,
-        supplier_code=v.supplier_code,
-        plant_code=v.plant_code,
-        avg_engine_temp=round(v.avg_engine_temp, 1),
-        avg_vibration=round(v.avg_vibration, 2),
-        services_last_12m=v.services_last_12m,
-        failure_label=v.failure_label,
-        risk_score=round(risk, 3),
-        risk_bucket=risk_bucket,
+    # Newest-first history, ordered and limited in SQL
+    history = (
+        db.query(ServiceRecord)
+        .filter(ServiceRecord.vehicle_id == v.id)
+        .order_by(ServiceRecord.service_date.desc(), ServiceRecord.id.desc())
+        .limit(history_limit)
+        .all()
     )
+    with stage("serialization"):
+        summary = vehicle_summary_row(v, risk, risk_bucket)
+        add_model_scores([summary], model_scores, ensemble_score)
+        content = {
+            "summary": summary,
+            "service_history": [service_record_row(s) for s in history],
+        }
+    return FastJSONResponse(content)
 
-    history = sorted(
-        v.service_records, key=lambda s: s.service_date, reverse=True
-    )
-    service_history = [
-        ServiceRecordOut(
-            id=s.id,
-            service_date=s.service_date,
-            mileage=s.mileage,
-            component=s.component,
-            fault_code=s.fault_code,
-            action=s.action,
-            cost=s.cost,
-            is_warranty_claim=s.is_warranty_claim,
-        )
-        for s in history
-    ]
 
-    return VehicleDetail(summary=summary, service_history=service_history)
+@app.get("/vehicles/{vehicle_id}/sensors/{component}", response_model=SensorSeries)
+def get_sensor_series(
+    vehicle_id: int,
+    component: str,
+    metric: str = Query("temperature", regex=f"^({'|'.join(SENSOR_METRICS)})$"),
+    start: Optional[datetime] = Query(None),
+    end: Optional[datetime] = Query(None),
+    points: int = Query(500, ge=10, le=5000),
+    method: str = Query("minmax", regex="^(minmax|lttb)$"),
+    db: Session = Depends(get_db),
+):
+    """
+    Downsampled sensor history of one vehicle component, at most `points`
+    points between start and end (default: the whole history). Served from
+    precomputed rollups; see app/sensor_timeseries.py.
+    """
+    if db.get(Vehicle, vehicle_id) is None:
+        raise HTTPException(status_code=404, detail="Vehicle not found")
+    content = sensor_series(db, vehicle_id, component, metric, start, end, points, method)
+    return FastJSONResponse(content)
+
+
+@app.get("/fleet/aggregates", response_model=FleetAggregateReport)
+def fleet_aggregates(
+    group_by: str = Query("supplier_code", regex=GROUP_BY_PATTERN),
+    model_name: str = Query(DEFAULT_MODEL_NAME),
+    db: Session = Depends(get_db),
+):
+    # Risk, claim rate and cost per supplier/plant/region/model/model_year
+    return fleet_risk_aggregates(db, group_by, model_name)
+
+
+# Upper bound on readings per request, to keep one transaction short
+MAX_SENSOR_BATCH = int(os.environ.get("WARRANTY_MAX_SENSOR_BATCH", "50000"))
+
+
+@app.post("/sensor-readings/batch", response_model=SensorIngestResult)
+def ingest_sensor_batch(
+    readings: List[SensorReadingIn],
+    db: Session = Depends(get_db),
+):
+    if len(readings) > MAX_SENSOR_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_SENSOR_BATCH} readings per batch",
+        )
+    try:
+        result = ingest_sensor_readings(db, readings_frame(readings))
+    except UnknownVehicleError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return SensorIngestResult(**result)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,312 @@
+import bisect
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# -----------------------------
+# In-process metrics (Prometheus text format)
+# -----------------------------
+#
+# Counters and fixed-bucket histograms kept in plain dicts behind one lock
+# per metric, so recording is a bisect plus a few additions and needs no
+# extra dependency. Per-request stage times (db, scoring, serialization)
+# are accumulated in a ContextVar-carried dict, the same way
+# db_instrumentation carries QueryStats into FastAPI's threadpool, and
+# recorded by the HTTP middleware once the response is produced.
+
+METRICS_ENABLED = os.environ.get("WARRANTY_METRICS", "1") != "0"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+STAGES = ("db", "scoring", "serialization", "other")
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, labels: LabelValues = ()) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last is +Inf), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {count}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "warranty_http_request_duration_seconds",
+    "Time to produce the HTTP response, by route template.",
+    ("method", "route", "status"),
+)
+REQUEST_STAGE_SECONDS = Histogram(
+    "warranty_http_request_stage_seconds",
+    "Per-request time spent in each stage (db, scoring, serialization, other).",
+    ("route", "stage"),
+)
+DB_STATEMENT_SECONDS = Histogram(
+    "warranty_db_statement_duration_seconds",
+    "Execution time of individual SQL statements, by statement type.",
+    ("operation",),
+)
+MODEL_INFERENCE_SECONDS = Histogram(
+    "warranty_model_inference_duration_seconds",
+    "Time of one batch scoring call.",
+    ("model_name",),
+)
+MODEL_INFERENCE_CALLS = Counter(
+    "warranty_model_inference_calls_total",
+    "Scoring calls, by model and scorer (compiled or pipeline).",
+    ("model_name", "scorer"),
+)
+MODEL_INFERENCE_ROWS = Counter(
+    "warranty_model_inference_rows_total",
+    "Vehicles scored, by model.",
+    ("model_name",),
+)
+SCORING_BATCH_SIZE = Histogram(
+    "warranty_scoring_batch_size",
+    "Single-vehicle requests coalesced into one scoring call.",
+    ("model_name",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+SCORING_BATCH_FILL = Histogram(
+    "warranty_scoring_batch_fill_ratio",
+    "Coalesced batch size as a fraction of the maximum batch size.",
+    ("model_name",),
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0),
+)
+MODEL_CACHE_EVENTS = Counter(
+    "warranty_model_cache_events_total",
+    "Model registry cache lookups (hit, miss) and evictions.",
+    ("event",),
+)
+MODEL_LOAD_SECONDS = Histogram(
+    "warranty_model_load_duration_seconds",
+    "Time to load a model version from the artifact store and compile it.",
+    ("model_name",),
+)
+MODEL_CACHE_BYTES = Gauge(
+    "warranty_model_cache_bytes",
+    "Artifact size of the model versions held in memory.",
+)
+
+REGISTRY = [
+    HTTP_REQUEST_SECONDS,
+    REQUEST_STAGE_SECONDS,
+    DB_STATEMENT_SECONDS,
+    MODEL_INFERENCE_SECONDS,
+    MODEL_INFERENCE_CALLS,
+    MODEL_INFERENCE_ROWS,
+    SCORING_BATCH_SIZE,
+    SCORING_BATCH_FILL,
+    MODEL_CACHE_EVENTS,
+    MODEL_LOAD_SECONDS,
+    MODEL_CACHE_BYTES,
+]
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------
+# Per-request stages
+# -----------------------------
+
+_current_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "current_request_stages", default=None
+)
+
+
+@contextmanager
+def track_stages() -> Iterator[Dict[str, float]]:
+    stages: Dict[str, float] = {}
+    token = _current_stages.set(stages)
+    try:
+        yield stages
+    finally:
+        _current_stages.reset(token)
+
+
+def add_stage_time(name: str, seconds: float) -> None:
+    stages = _current_stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Add the time spent in the enclosed block to the current request's stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage_time(name, time.perf_counter() - started)
+
+
+def observe_request(
+    method: str,
+    route: str,
+    status: int,
+    seconds: float,
+    stages: Dict[str, float],
+    db_seconds: float,
+) -> None:
+    if not METRICS_ENABLED:
+        return
+    HTTP_REQUEST_SECONDS.observe(seconds, (method, route, str(status)))
+    timed = {"db": db_seconds, **stages}
+    # Whatever is not attributed to a stage: validation, routing, glue code
+    timed["other"] = max(0.0, seconds - sum(timed.values()))
+    for name in STAGES:
+        REQUEST_STAGE_SECONDS.observe(timed.get(name, 0.0), (route, name))
+
+
+_OPERATION = re.compile(r"\s*(\w+)")
+_KNOWN_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "PRAGMA", "WITH", "CREATE"}
+
+
+def observe_statement(statement: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    match = _OPERATION.match(statement)
+    operation = match.group(1).upper() if match else ""
+    if operation not in _KNOWN_OPERATIONS:
+        operation = "OTHER"
+    DB_STATEMENT_SECONDS.observe(seconds, (operation,))
+
+
+def observe_inference(model_name: str, rows: int, seconds: float, compiled: bool) -> None:
+    add_stage_time("scoring", seconds)
+    if not METRICS_ENABLED:
+        return
+    MODEL_INFERENCE_SECONDS.observe(seconds, (model_name,))
+    MODEL_INFERENCE_CALLS.inc((model_name, "compiled" if compiled else "pipeline"))
+    MODEL_INFERENCE_ROWS.inc((model_name,), rows)
+
+
+def observe_scoring_batch(model_name: str, size: int, max_batch: int) -> None:
+    if not METRICS_ENABLED:
+        return
+    SCORING_BATCH_SIZE.observe(size, (model_name,))
+    SCORING_BATCH_FILL.observe(size / max_batch, (model_name,))
+
+
+def observe_model_cache(event: str, resident_bytes: Optional[int] = None) -> None:
+    if not METRICS_ENABLED:
+        return
+    MODEL_CACHE_EVENTS.inc((event,))
+    if resident_bytes is not None:
+        MODEL_CACHE_BYTES.set(resident_bytes)
+
+
+def observe_model_load(model_name: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    MODEL_LOAD_SECONDS.observe(seconds, (model_name,))
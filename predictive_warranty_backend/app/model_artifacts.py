@@ -0,0 +1,248 @@
+import hashlib
+import importlib.metadata
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import joblib
+import pandas as pd
+
+# -----------------------------
+# On-disk model artifact store
+# -----------------------------
+#
+# Layout of ARTIFACT_DIR:
+#   manifest.json      fingerprint, data hash, feature lists, the serving
+#                      version of each model, the older versions kept per
+#                      model and the incremental-training checkpoint
+#   <model_name>@<version>.joblib  fitted sklearn Pipeline of one version
+#   compile_sample.joblib  rows that compiled scorers are verified on
+#                      when a pipeline is loaded (see model_registry)
+#
+# The fingerprint covers watermarks of the training data (row counts, max
+# id, last feature refresh; see source_fingerprint), the feature lists, the
+# model configs and the sklearn version, so any of those changing forces a
+# retrain, and checking it at startup never reads the training table. Full
+# retrains also record a hash of the exact frame trained on (data_hash).
+# Version files are written once and never modified; older versions stay
+# loadable (name@version) until more than MAX_VERSIONS_PER_MODEL exist.
+
+ARTIFACT_DIR = Path(os.environ.get("WARRANTY_ARTIFACT_DIR", "./artifacts"))
+MANIFEST_NAME = "manifest.json"
+SAMPLE_NAME = "compile_sample.joblib"
+# Stored versions per model, the serving one included
+MAX_VERSIONS_PER_MODEL = int(os.environ.get("WARRANTY_MODEL_VERSIONS_KEPT", "5"))
+
+
+def sklearn_version() -> str:
+    # Read from the package metadata so fingerprinting does not import sklearn
+    return importlib.metadata.version("scikit-learn")
+
+
+def artifact_filename(name: str, version: str) -> str:
+    return f"{name}@{version}.joblib"
+
+
+def _signature_digest(
+    feature_numeric: List[str], feature_categorical: List[str], config_signature: str
+):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([feature_numeric, feature_categorical]).encode())
+    digest.update(config_signature.encode())
+    digest.update(sklearn_version().encode())
+    return digest
+
+
+def source_fingerprint(
+    watermarks: Mapping[str, Any],
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    config_signature: str,
+) -> str:
+    """Fingerprint from cheap watermarks of the training data."""
+    digest = _signature_digest(feature_numeric, feature_categorical, config_signature)
+    digest.update(json.dumps(watermarks, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def training_fingerprint(
+    df: pd.DataFrame,
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    config_signature: str,
+) -> str:
+    """Hash of the full training frame; reads every value."""
+    digest = _signature_digest(feature_numeric, feature_categorical, config_signature)
+    digest.update(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _atomic_write(path: Path, write) -> None:
+    # Write to a temp file in the same directory, then rename over the
+    # target so concurrent workers never read a half-written artifact.
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    os.close(fd)
+    try:
+        write(tmp_name)
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def _write_manifest(manifest: Dict[str, Any], directory: Path) -> None:
+    def write(tmp: str) -> None:
+        with open(tmp, "w") as fh:
+            json.dump(manifest, fh, indent=2)
+
+    _atomic_write(directory / MANIFEST_NAME, write)
+
+
+def _older_versions(
+    previous: Optional[Dict[str, Any]],
+    name: str,
+    version: str,
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+) -> List[Dict[str, Any]]:
+    # Versions trained on other feature lists cannot score current inputs
+    if (
+        previous is None
+        or previous.get("feature_numeric") != feature_numeric
+        or previous.get("feature_categorical") != feature_categorical
+    ):
+        return []
+    candidates = [previous.get("models", {}).get(name)]
+    candidates += previous.get("history", {}).get(name, [])
+    older = [meta for meta in candidates if meta and meta["version"] != version]
+    return older[: MAX_VERSIONS_PER_MODEL - 1]
+
+
+def _prune_artifacts(manifest: Dict[str, Any], directory: Path) -> None:
+    # Remove pipelines no longer listed (dropped versions and models, and
+    # files in the pre-versioning <model_name>.joblib layout)
+    referenced = {meta["file"] for meta in manifest["models"].values()}
+    for metas in manifest["history"].values():
+        referenced.update(meta["file"] for meta in metas)
+    for path in directory.glob("*.joblib"):
+        if path.name != SAMPLE_NAME and path.name not in referenced:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def save_models(
+    registry: Mapping[str, Mapping[str, Any]],
+    fingerprint: str,
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    directory: Path = ARTIFACT_DIR,
+    checkpoint: Optional[Dict[str, Any]] = None,
+    sample: Optional[pd.DataFrame] = None,
+    data_hash: Optional[str] = None,
+) -> None:
+    """
+    Store the registry's serving versions and make them the manifest's.
+    Versions already on disk are not rewritten (nor loaded), and earlier
+    serving versions move to the per-model history.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    previous = read_manifest(directory)
+
+    entries: Dict[str, Dict[str, Any]] = {}
+    history: Dict[str, List[Dict[str, Any]]] = {}
+    for name, info in registry.items():
+        filename = artifact_filename(name, info["version"])
+        path = directory / filename
+        if not path.exists():
+            _atomic_write(path, lambda tmp, pipe=info["pipeline"]: joblib.dump(pipe, tmp))
+        entries[name] = {
+            "file": filename,
+            "size_bytes": path.stat().st_size,
+            "auc": info["auc"],
+            "type": info["type"],
+            "description": info["description"],
+            "version": info["version"],
+        }
+        history[name] = _older_versions(
+            previous, name, info["version"], feature_numeric, feature_categorical
+        )
+
+    if sample is not None:
+        _atomic_write(directory / SAMPLE_NAME, lambda tmp: joblib.dump(sample, tmp))
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "data_hash": data_hash,
+        "sklearn_version": sklearn_version(),
+        "feature_numeric": feature_numeric,
+        "feature_categorical": feature_categorical,
+        "models": entries,
+        "history": history,
+        "checkpoint": checkpoint,
+    }
+    # The manifest goes last: it only ever points at fully written pipelines.
+    _write_manifest(manifest, directory)
+    _prune_artifacts(manifest, directory)
+
+
+def read_manifest(directory: Path = ARTIFACT_DIR) -> Optional[Dict[str, Any]]:
+    path = directory / MANIFEST_NAME
+    if not path.exists():
+        return None
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def read_checkpoint(directory: Path = ARTIFACT_DIR) -> Optional[Dict[str, Any]]:
+    # Incremental-training state stored with the models (see incremental_training)
+    manifest = read_manifest(directory)
+    return manifest.get("checkpoint") if manifest else None
+
+
+def write_checkpoint(checkpoint: Dict[str, Any], directory: Path = ARTIFACT_DIR) -> None:
+    # Rewrites only the manifest; the stored pipelines are unchanged.
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return
+    manifest["checkpoint"] = checkpoint
+    _write_manifest(manifest, directory)
+
+
+def load_manifest(fingerprint: str, directory: Path = ARTIFACT_DIR) -> Optional[Dict[str, Any]]:
+    """
+    The manifest, if its models were trained on data with the given
+    fingerprint and every serving pipeline is on disk; None when a retrain
+    is needed. Pipelines themselves are loaded on demand (load_pipeline).
+    """
+    manifest = read_manifest(directory)
+    if manifest is None or manifest.get("fingerprint") != fingerprint:
+        return None
+    try:
+        if not all((directory / m["file"]).exists() for m in manifest["models"].values()):
+            return None
+    except (KeyError, TypeError):
+        return None
+    return manifest
+
+
+def load_pipeline(filename: str, directory: Path = ARTIFACT_DIR):
+    return joblib.load(directory / filename)
+
+
+def load_sample(directory: Path = ARTIFACT_DIR) -> Optional[pd.DataFrame]:
+    path = directory / SAMPLE_NAME
+    if not path.exists():
+        return None
+    try:
+        return joblib.load(path)
+    except (OSError, ValueError, EOFError):
+        return None
@@ -0,0 +1,319 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from app import compiled_scoring, metrics, model_artifacts
+
+# -----------------------------
+# Lazy, memory-bounded model registry
+# -----------------------------
+#
+# A registry entry keeps only the model's metadata (name, version, AUC,
+# type, description) in memory. Its fitted pipeline and compiled scorer
+# are loaded from the artifact store on the first entry["pipeline"] or
+# entry["compiled"] access and held in MODEL_CACHE, an LRU keyed by
+# (name, version) and bounded by MODEL_CACHE_MAX_BYTES. The artifact file
+# size stands in for the in-memory size. When a load pushes the cache over
+# its budget, the least recently used versions are dropped (never the one
+# just loaded) and reloaded from disk when next needed.
+#
+# Besides the serving version of each model, the registry exposes the
+# older versions kept in the artifact store, selected as "name@version".
+
+MODEL_CACHE_MAX_BYTES = int(
+    float(os.environ.get("WARRANTY_MODEL_CACHE_MB", "512")) * 1024 * 1024
+)
+# Entry keys backed by the loaded artifact rather than the metadata
+LAZY_KEYS = ("pipeline", "compiled")
+VERSION_SEPARATOR = "@"
+
+ModelKey = Tuple[str, str]
+# Returns {"pipeline": ..., "compiled": ...}
+Loader = Callable[[], Dict[str, Any]]
+
+
+class UnknownModelVersionError(LookupError):
+    """Raised for a name@version that is not in the registry."""
+
+
+class ModelCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # key -> (loaded artifact, size in bytes), least recently used first
+        self._entries: "OrderedDict[ModelKey, Tuple[Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # One lock per key being loaded, so concurrent first requests for a
+        # version load it once while other versions load in parallel
+        self._loading: Dict[ModelKey, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    def _lookup(self, key: ModelKey) -> Optional[Dict[str, Any]]:
+        # Caller holds self._lock
+        found = self._entries.get(key)
+        if found is None:
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        metrics.observe_model_cache("hit")
+        return found[0]
+
+    def get(self, key: ModelKey, loader: Loader, nbytes: int) -> Dict[str, Any]:
+        with self._lock:
+            found = self._lookup(key)
+            if found is not None:
+                return found
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # Loaded by a concurrent request while we waited
+                found = self._lookup(key)
+                if found is not None:
+                    return found
+                self.misses += 1
+                metrics.observe_model_cache("miss")
+            try:
+                started = time.perf_counter()
+                loaded = loader()
+                elapsed = time.perf_counter() - started
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+        with self._lock:
+            self.load_seconds += elapsed
+        metrics.observe_model_load(key[0], elapsed)
+        self.put(key, loaded, nbytes)
+        return loaded
+
+    def put(self, key: ModelKey, loaded: Dict[str, Any], nbytes: int) -> None:
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (loaded, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, size) = self._entries.popitem(last=False)
+                self._bytes -= size
+                self.evictions += 1
+                metrics.observe_model_cache("eviction")
+            resident = self._bytes
+        metrics.MODEL_CACHE_BYTES.set(resident)
+
+    def __contains__(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        metrics.MODEL_CACHE_BYTES.set(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_bytes": self.max_bytes,
+                "resident_bytes": self._bytes,
+                "resident": [
+                    f"{name}{VERSION_SEPARATOR}{version}" for name, version in self._entries
+                ],
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds": round(self.load_seconds, 3),
+            }
+
+
+MODEL_CACHE = ModelCache(MODEL_CACHE_MAX_BYTES)
+
+
+class ModelEntry(Mapping):
+    """
+    Registry entry: metadata held in memory, the pipeline and compiled
+    scorer fetched through the cache. Without a loader (models never
+    written to the artifact store) the artifact is pinned on the entry.
+    """
+
+    def __init__(
+        self,
+        meta: Dict[str, Any],
+        loader: Optional[Loader] = None,
+        nbytes: int = 0,
+        loaded: Optional[Dict[str, Any]] = None,
+        cache: ModelCache = MODEL_CACHE,
+    ):
+        self.meta = meta
+        self.key: ModelKey = (meta["name"], meta["version"])
+        self._loader = loader
+        self._nbytes = nbytes
+        self._cache = cache
+        self._pinned = None
+        if loaded is not None:
+            if loader is None:
+                self._pinned = loaded
+            else:
+                cache.put(self.key, loaded, nbytes)
+
+    def _artifact(self) -> Dict[str, Any]:
+        if self._loader is None:
+            return self._pinned
+        return self._cache.get(self.key, self._loader, self._nbytes)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loader is None or self.key in self._cache
+
+    def __getitem__(self, key: str) -> Any:
+        if key in LAZY_KEYS:
+            return self._artifact()[key]
+        return self.meta[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.meta
+        yield from LAZY_KEYS
+
+    def __len__(self) -> int:
+        return len(self.meta) + len(LAZY_KEYS)
+
+    def __repr__(self) -> str:
+        return f"ModelEntry({self.key[0]}{VERSION_SEPARATOR}{self.key[1]})"
+
+
+class ModelRegistry(Mapping):
+    """
+    Serving entry per model name (the mapping itself), plus the older
+    versions of each model reachable through version().
+    """
+
+    def __init__(
+        self,
+        serving: Dict[str, ModelEntry],
+        history: Optional[Dict[str, List[ModelEntry]]] = None,
+    ):
+        self._serving = serving
+        self._history = history or {}
+
+    def __getitem__(self, name: str) -> ModelEntry:
+        return self._serving[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._serving)
+
+    def __len__(self) -> int:
+        return len(self._serving)
+
+    def version(self, name: str, version: str) -> Optional[ModelEntry]:
+        serving = self._serving.get(name)
+        if serving is not None and serving["version"] == version:
+            return serving
+        for entry in self._history.get(name, []):
+            if entry["version"] == version:
+                return entry
+        return None
+
+    def versions(self, name: str) -> List[str]:
+        """Available versions of a model, serving first, then newest first."""
+        entries = [self._serving[name]] if name in self._serving else []
+        return [entry["version"] for entry in entries + self._history.get(name, [])]
+
+
+def parse_model_ref(model_ref: str) -> Tuple[str, Optional[str]]:
+    # "name" or "name@version"
+    name, _, version = model_ref.partition(VERSION_SEPARATOR)
+    return name, version or None
+
+
+def _artifact_loader(
+    filename: str,
+    feature_numeric: List[str],
+    feature_categorical: List[str],
+    directory: Path,
+) -> Loader:
+    def load() -> Dict[str, Any]:
+        pipe = model_artifacts.load_pipeline(filename, directory)
+        compiled = (
+            compiled_scoring.compile_pipeline(
+                pipe, feature_numeric, feature_categorical, model_artifacts.load_sample(directory)
+            )
+            if compiled_scoring.COMPILED_SCORING_ENABLED
+            else None
+        )
+        return {"pipeline": pipe, "compiled": compiled}
+
+    return load
+
+
+def _stored_entry(
+    name: str,
+    meta: Dict[str, Any],
+    manifest: Dict[str, Any],
+    directory: Path,
+    loaded: Optional[Dict[str, Any]] = None,
+) -> ModelEntry:
+    nbytes = meta.get("size_bytes")
+    if nbytes is None:
+        path = directory / meta["file"]
+        nbytes = path.stat().st_size if path.exists() else 0
+    return ModelEntry(
+        {
+            "name": name,
+            "auc": meta["auc"],
+            "type": meta["type"],
+            "description": meta["description"],
+            "version": meta["version"],
+        },
+        _artifact_loader(
+            meta["file"], manifest["feature_numeric"], manifest["feature_categorical"], directory
+        ),
+        nbytes,
+        loaded=loaded,
+    )
+
+
+def build_registry(
+    manifest: Optional[Dict[str, Any]],
+    trained: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    directory: Path = model_artifacts.ARTIFACT_DIR,
+) -> ModelRegistry:
+    """
+    Registry of the versions listed in the manifest. Entries in `trained`
+    become the serving ones: ModelEntry objects are reused as they are,
+    plain dicts fresh from training seed the cache with their pipeline
+    (pinned when the manifest doesn't list their version).
+    """
+    stored: Dict[str, Dict[str, Any]] = dict(manifest["models"]) if manifest else {}
+    serving: Dict[str, ModelEntry] = {}
+    if trained is None:
+        for name, meta in stored.items():
+            serving[name] = _stored_entry(name, meta, manifest, directory)
+    else:
+        for name, info in trained.items():
+            if isinstance(info, ModelEntry):
+                serving[name] = info
+                continue
+            meta = stored.get(name)
+            loaded = {key: info.get(key) for key in LAZY_KEYS}
+            if meta is not None and meta["version"] == info["version"]:
+                serving[name] = _stored_entry(name, meta, manifest, directory, loaded=loaded)
+            else:
+                entry_meta = {k: v for k, v in info.items() if k not in LAZY_KEYS}
+                serving[name] = ModelEntry(entry_meta, loaded=loaded)
+
+    history: Dict[str, List[ModelEntry]] = {}
+    if manifest:
+        for name, metas in manifest.get("history", {}).items():
+            if name in serving:
+                history[name] = [_stored_entry(name, meta, manifest, directory) for meta in metas]
+    return ModelRegistry(serving, history)
+
+
+def cache_status() -> Dict[str, Any]:
+    return MODEL_CACHE.stats()
@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    inspect,
     create_engine,
     Column,
     Integer,
@@ -8,6 +9,7 @@ from sqlalchemy import (
     Date,
     DateTime,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
 from .database import Base
@@ -17,6 +19,26 @@ from .database import Base
 # -----------------------------
 
 
+def ensure_schema(bind) -> None:
+    """
+    Create missing tables, plus indexes that were added to tables created
+    by an earlier version (create_all() alone skips existing tables).
+    Derived tables (info["derived"]) whose columns changed are dropped and
+    recreated instead of migrated; their rows are rebuilt from the source
+    tables (see feature_store.refresh_stale_features).
+    """
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if table.info.get("derived") and inspector.has_table(table.name):
+            stored = {col["name"] for col in inspector.get_columns(table.name)}
+            if stored != set(table.columns.keys()):
+                table.drop(bind=bind)
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
 class Dealership(Base):
     __tablename__ = "dealerships"
 
@@ -28,12 +50,35 @@ class Dealership(Base):
     vehicles = relationship("Vehicle", back_populates="dealership")
 
 
+# Equality filters and non-id sort keys of the vehicle listing
+# (see vehicle_queries.VehicleFilters and SORTABLE_COLUMNS)
+VEHICLE_FILTER_COLUMNS = ("region", "supplier_code", "plant_code", "model", "model_year")
+VEHICLE_SORT_COLUMNS = ("mileage", "model_year", "age_months")
+
+
+def _vehicle_listing_indexes() -> tuple:
+    # Composite indexes ending in id back keyset pagination: a page is one
+    # ordered index range when the index leads with the filter column, then
+    # the sort column, then the id tie-breaker. Unfiltered listings and the
+    # mileage range use the (sort column, id) indexes.
+    keys = [(col, "id") for col in VEHICLE_FILTER_COLUMNS + VEHICLE_SORT_COLUMNS]
+    keys += [
+        (col, sort_col, "id")
+        for col in VEHICLE_FILTER_COLUMNS
+        for sort_col in VEHICLE_SORT_COLUMNS
+        if sort_col != col
+    ]
+    unique = dict.fromkeys(keys)
+    return tuple(Index("ix_vehicles_" + "_".join(key), *key) for key in unique)
+
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
+    __table_args__ = _vehicle_listing_indexes()
 
     id = Column(Integer, primary_key=True, index=True)
     vin = Column(String, unique=True, index=True, nullable=False)
-    model = Column(String, index=True, nullable=False)
+    model = Column(String, nullable=False)
     model_year = Column(Integer, nullable=False)
     oem = Column(String, nullable=False)
 
@@ -62,10 +107,23 @@ class Vehicle(Base):
     production_logs = relationship(
         "ProductionLog", back_populates="vehicle", cascade="all, delete-orphan"
     )
+    risk_scores = relationship(
+        "VehicleRiskScore", back_populates="vehicle", cascade="all, delete-orphan"
+    )
+    sensor_stats = relationship(
+        "VehicleSensorStats", back_populates="vehicle", cascade="all, delete-orphan"
+    )
+    features = relationship(
+        "VehicleFeatures", back_populates="vehicle", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 class ServiceRecord(Base):
     __tablename__ = "service_records"
+    # Service history is read newest-first per vehicle
+    __table_args__ = (
+        Index("ix_service_records_vehicle_id_service_date", "vehicle_id", "service_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -82,6 +140,15 @@ class ServiceRecord(Base):
 
 class SensorReading(Base):
     __tablename__ = "sensor_readings"
+    # Time-range reads of one vehicle/component are a single index range
+    __table_args__ = (
+        Index(
+            "ix_sensor_readings_vehicle_id_component_timestamp",
+            "vehicle_id",
+            "component",
+            "timestamp",
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -96,6 +163,8 @@ class SensorReading(Base):
 
 class ProductionLog(Base):
     __tablename__ = "production_logs"
+    # Per-vehicle aggregation for the feature store
+    __table_args__ = (Index("ix_production_logs_vehicle_id", "vehicle_id"),)
 
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"))
@@ -107,4 +176,112 @@ class ProductionLog(Base):
     ambient_temp = Column(Float, nullable=False)
     assembly_date = Column(Date, nullable=False)
 
-    vehicle = relationship("Vehicle", back_populates="production_logs")
\ No newline at end of file
+    vehicle = relationship("Vehicle", back_populates="production_logs")
+
+
+class VehicleRiskScore(Base):
+    """Precomputed risk score for one vehicle under one trained model version."""
+
+    __tablename__ = "vehicle_risk_scores"
+    # Per model version watermark (max computed_at) and newer-than scans
+    __table_args__ = (
+        Index(
+            "ix_vehicle_risk_scores_model_name_model_version_computed_at",
+            "model_name",
+            "model_version",
+            "computed_at",
+        ),
+    )
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    model_name = Column(String, primary_key=True)
+    model_version = Column(String, primary_key=True)
+    risk_score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+    vehicle = relationship("Vehicle", back_populates="risk_scores")
+
+
+class VehicleSensorStats(Base):
+    """
+    Running sensor statistics per vehicle and component, kept in Welford
+    form (count, mean, M2) so each ingested batch is merged in O(1) per
+    reading. component == "*" aggregates all components of the vehicle.
+    """
+
+    __tablename__ = "vehicle_sensor_stats"
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    component = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
+    mean_temperature = Column(Float, nullable=False)
+    m2_temperature = Column(Float, nullable=False)
+    mean_vibration = Column(Float, nullable=False)
+    m2_vibration = Column(Float, nullable=False)
+    mean_pressure = Column(Float, nullable=False)
+    m2_pressure = Column(Float, nullable=False)
+    last_reading_at = Column(DateTime, nullable=True)
+
+    vehicle = relationship("Vehicle", back_populates="sensor_stats")
+
+
+class SensorRollup(Base):
+    """
+    Pre-aggregated sensor readings per vehicle, component and time bucket,
+    at several resolutions (see sensor_timeseries.ROLLUP_RESOLUTIONS).
+    Sums rather than means are stored so buckets merge by addition.
+    """
+
+    __tablename__ = "sensor_rollups"
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    component = Column(String, primary_key=True)
+    resolution_seconds = Column(Integer, primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False)
+    min_temperature = Column(Float, nullable=False)
+    max_temperature = Column(Float, nullable=False)
+    sum_temperature = Column(Float, nullable=False)
+    min_vibration = Column(Float, nullable=False)
+    max_vibration = Column(Float, nullable=False)
+    sum_vibration = Column(Float, nullable=False)
+    min_pressure = Column(Float, nullable=False)
+    max_pressure = Column(Float, nullable=False)
+    sum_pressure = Column(Float, nullable=False)
+
+
+class VehicleFeatures(Base):
+    """
+    Derived model features per vehicle, aggregated from its service,
+    sensor and production history (see feature_store). stale marks rows
+    whose child rows changed since they were computed. The trend_*_sum
+    columns are the running terms of the trend fits, so sensor batches
+    update the trends without rereading the rollups.
+    """
+
+    __tablename__ = "vehicle_features"
+    __table_args__ = {"info": {"derived": True}}
+
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id"), primary_key=True)
+    service_count = Column(Integer, nullable=False)
+    service_cost_total = Column(Float, nullable=False)
+    repeat_fault_count = Column(Integer, nullable=False)
+    temperature_std = Column(Float, nullable=False)
+    vibration_std = Column(Float, nullable=False)
+    pressure_std = Column(Float, nullable=False)
+    temperature_trend = Column(Float, nullable=False)
+    vibration_trend = Column(Float, nullable=False)
+    ambient_temp = Column(Float, nullable=False)
+    production_line = Column(String, nullable=False)
+    production_shift = Column(String, nullable=False)
+    trend_weight_sum = Column(Float, nullable=False, default=0.0)
+    trend_x_sum = Column(Float, nullable=False, default=0.0)
+    trend_xx_sum = Column(Float, nullable=False, default=0.0)
+    trend_temperature_sum = Column(Float, nullable=False, default=0.0)
+    trend_x_temperature_sum = Column(Float, nullable=False, default=0.0)
+    trend_vibration_sum = Column(Float, nullable=False, default=0.0)
+    trend_x_vibration_sum = Column(Float, nullable=False, default=0.0)
+    stale = Column(Boolean, nullable=False, default=False, index=True)
+    refreshed_at = Column(DateTime, nullable=False)
+
+    vehicle = relationship("Vehicle", back_populates="features")
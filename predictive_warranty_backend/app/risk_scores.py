@@ -0,0 +1,178 @@
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Sequence
+
+from sqlalchemy import and_, delete, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import models
+
+# -----------------------------
+# Materialized risk-score store
+# -----------------------------
+#
+# Scores are keyed by (vehicle_id, model_name, model_version). A retrain
+# produces a new model_version, so old rows simply stop matching and are
+# purged on the next bulk refresh; feature changes on a vehicle delete
+# that vehicle's rows so the next read re-scores it.
+#
+# Concurrent requests can miss on the same vehicle and both store its
+# score, so writes are INSERT ... ON CONFLICT DO UPDATE where the backend
+# supports it (last writer wins; both computed the same score).
+
+# Stay well below SQLite's bound-parameter limit for IN (...) lists.
+ID_CHUNK_SIZE = 500
+
+score_table = models.VehicleRiskScore.__table__
+UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# Bumped on every invalidation, so readers caching results derived from
+# the stored scores (fleet_aggregates) can tell in O(1) whether any score
+# was dropped since. Counts invalidations issued by this process only.
+_invalidations_lock = threading.Lock()
+_invalidations = 0
+
+
+def _chunks(items: Sequence[int], size: int = ID_CHUNK_SIZE) -> Iterable[Sequence[int]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def load_risk_scores(
+    db: Session, model_name: str, model_version: str, vehicle_ids: Sequence[int]
+) -> Dict[int, float]:
+    found: Dict[int, float] = {}
+    for chunk in _chunks(list(vehicle_ids)):
+        rows = db.execute(
+            select(score_table.c.vehicle_id, score_table.c.risk_score).where(
+                and_(
+                    score_table.c.model_name == model_name,
+                    score_table.c.model_version == model_version,
+                    score_table.c.vehicle_id.in_(chunk),
+                )
+            )
+        )
+        found.update({vid: score for vid, score in rows})
+    return found
+
+
+def load_model_scores(
+    db: Session, model_versions: Dict[str, str], vehicle_ids: Sequence[int]
+) -> Dict[str, Dict[int, float]]:
+    """
+    Stored scores of several models at once ({model_name: version}), read
+    with one query per id chunk. Returns {model_name: {vehicle_id: score}}.
+    """
+    found: Dict[str, Dict[int, float]] = {name: {} for name in model_versions}
+    if not model_versions:
+        return found
+    version_match = or_(
+        *[
+            and_(score_table.c.model_name == name, score_table.c.model_version == version)
+            for name, version in model_versions.items()
+        ]
+    )
+    for chunk in _chunks(list(vehicle_ids)):
+        rows = db.execute(
+            select(
+                score_table.c.model_name, score_table.c.vehicle_id, score_table.c.risk_score
+            ).where(version_match, score_table.c.vehicle_id.in_(chunk))
+        )
+        for name, vid, score in rows:
+            found[name][vid] = score
+    return found
+
+
+def _upsert_statement(db: Session):
+    dialect_insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    if dialect_insert is None:
+        return None
+    stmt = dialect_insert(score_table)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            score_table.c.vehicle_id,
+            score_table.c.model_name,
+            score_table.c.model_version,
+        ],
+        set_={
+            "risk_score": stmt.excluded.risk_score,
+            "computed_at": stmt.excluded.computed_at,
+        },
+    )
+
+
+def store_risk_scores(
+    db: Session,
+    model_name: str,
+    model_version: str,
+    vehicle_ids: Sequence[int],
+    scores: Sequence[float],
+) -> None:
+    """
+    Upsert scores for one model version. Backends without ON CONFLICT get
+    delete-then-insert of the same keys instead, which is not safe against
+    a concurrent writer of the same key.
+    """
+    ids: List[int] = [int(v) for v in vehicle_ids]
+    if not ids:
+        return
+
+    upsert = _upsert_statement(db)
+    computed_at = datetime.utcnow()
+    for start in range(0, len(ids), ID_CHUNK_SIZE):
+        chunk_ids = ids[start : start + ID_CHUNK_SIZE]
+        chunk_scores = scores[start : start + ID_CHUNK_SIZE]
+        if upsert is None:
+            db.execute(
+                delete(score_table).where(
+                    and_(
+                        score_table.c.model_name == model_name,
+                        score_table.c.model_version == model_version,
+                        score_table.c.vehicle_id.in_(chunk_ids),
+                    )
+                )
+            )
+        db.execute(
+            insert(score_table) if upsert is None else upsert,
+            [
+                {
+                    "vehicle_id": vid,
+                    "model_name": model_name,
+                    "model_version": model_version,
+                    "risk_score": float(score),
+                    "computed_at": computed_at,
+                }
+                for vid, score in zip(chunk_ids, chunk_scores)
+            ],
+        )
+
+
+def purge_stale_scores(db: Session, model_name: str, keep_version: str) -> None:
+    db.execute(
+        delete(score_table).where(
+            and_(
+                score_table.c.model_name == model_name,
+                score_table.c.model_version != keep_version,
+            )
+        )
+    )
+
+
+def purge_unknown_models(db: Session, known_models: Sequence[str]) -> None:
+    db.execute(delete(score_table).where(score_table.c.model_name.notin_(known_models)))
+
+
+def invalidation_count() -> int:
+    return _invalidations
+
+
+def invalidate_vehicle_scores(db: Session, vehicle_ids: Sequence[int]) -> None:
+    """Drop every cached score of the given vehicles, for all models."""
+    global _invalidations
+    if not vehicle_ids:
+        return
+    with _invalidations_lock:
+        _invalidations += 1
+    for chunk in _chunks(list(vehicle_ids)):
+        db.execute(delete(score_table).where(score_table.c.vehicle_id.in_(chunk)))
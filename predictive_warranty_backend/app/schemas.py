@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import date, datetime, timedelta
 
 # -----------------------------
@@ -11,6 +11,11 @@ class ModelInfo(BaseModel):
     model_type: str
     auc: float
     description: str
+    # Serving version; older ones are selectable as model_name=name@version
+    version: Optional[str] = None
+    versions: List[str] = []
+    # Whether the serving version's pipeline is currently in memory
+    loaded: Optional[bool] = None
 
 
 class ServiceRecordOut(BaseModel):
@@ -41,8 +46,71 @@ class VehicleSummary(BaseModel):
     failure_label: bool
     risk_score: float
     risk_bucket: str
+    # Only with all_models=true / ensemble=true: every registered model's
+    # score and the AUC-weighted ensemble score
+    model_scores: Optional[Dict[str, float]] = None
+    ensemble_score: Optional[float] = None
 
 
 class VehicleDetail(BaseModel):
     summary: VehicleSummary
-    service_history: List[ServiceRecordOut]
\ No newline at end of file
+    service_history: List[ServiceRecordOut]
+
+
+class SensorReadingIn(BaseModel):
+    vehicle_id: int
+    timestamp: datetime
+    component: str
+    temperature: float
+    vibration: float
+    pressure: float
+
+
+class SensorIngestResult(BaseModel):
+    inserted: int
+    vehicles_updated: int
+    seconds: float
+
+
+class SensorSeries(BaseModel):
+    vehicle_id: int
+    component: str
+    metric: str
+    method: str  # minmax | lttb
+    start: Optional[datetime]
+    end: Optional[datetime]
+    source: str  # raw | rollup_<seconds>s
+    # Width of each returned bucket; null when points are raw readings
+    resolution_seconds: Optional[int]
+    points: int
+    timestamp: List[datetime]
+    # method=lttb
+    value: Optional[List[float]] = None
+    # method=minmax
+    min: Optional[List[float]] = None
+    max: Optional[List[float]] = None
+    mean: Optional[List[float]] = None
+    count: Optional[List[int]] = None
+
+
+class FleetAggregateGroup(BaseModel):
+    group: str
+    vehicles: int
+    mean_risk: float
+    high_risk_vehicles: int
+    failure_rate: float
+    service_events: int
+    warranty_claims: int
+    claims_per_vehicle: float
+    claim_rate: float
+    total_service_cost: float
+    warranty_claim_cost: float
+
+
+class FleetAggregateReport(BaseModel):
+    group_by: str
+    model_name: str
+    model_version: str
+    refresh: str
+    generated_at: datetime
+    groups: List[FleetAggregateGroup]
@@ -0,0 +1,133 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app import metrics
+
+# -----------------------------
+# Single-vehicle scoring coalescer
+# -----------------------------
+#
+# Concurrent single-vehicle scoring requests for the same registry entry
+# (model name + version) are gathered into one batch. The first caller
+# becomes the batch leader: it waits up to the window, or until the batch
+# is full, then scores every gathered row with one vectorized call and
+# hands each waiting caller its own result. No background thread is
+# involved, and a window of 0 scores each call directly.
+#
+# The leader also stops waiting once every caller in flight for the entry
+# has joined its batch, as nobody else could: a lone caller scores at
+# once, and under load a batch closes as soon as the previous one has
+# been handed out, gathering whatever arrived while it was being scored.
+
+SCORING_BATCH_WINDOW_SECONDS = (
+    float(os.environ.get("WARRANTY_SCORING_BATCH_WINDOW_MS", "2")) / 1000.0
+)
+SCORING_MAX_BATCH = int(os.environ.get("WARRANTY_SCORING_MAX_BATCH", "64"))
+
+# score_fn(entry, rows) -> probabilities, e.g. predict_with_entry
+ScoreFn = Callable[[Dict[str, Any], List[Any]], np.ndarray]
+
+
+class _Batch:
+    __slots__ = ("entry", "rows", "futures", "closed")
+
+    def __init__(self, entry: Dict[str, Any]):
+        self.entry = entry
+        self.rows: List[Any] = []
+        self.futures: List[Future] = []
+        self.closed = threading.Event()
+
+
+class ScoringBatcher:
+    def __init__(
+        self,
+        score_fn: ScoreFn,
+        window_seconds: float = SCORING_BATCH_WINDOW_SECONDS,
+        max_batch: int = SCORING_MAX_BATCH,
+    ):
+        self.score_fn = score_fn
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        # Open batch per registry entry; the entry dict identifies the
+        # model version, so a registry swap never mixes versions in a batch.
+        self._open: Dict[int, _Batch] = {}
+        # Callers inside score() per entry, batched or not yet answered
+        self._in_flight: Dict[int, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0 and self.max_batch > 1
+
+    def score(self, entry: Dict[str, Any], row: Any) -> float:
+        """
+        Score one row (any object with the feature attributes) with the given
+        registry entry, coalesced with concurrent calls for the same entry.
+        """
+        if not self.enabled:
+            return float(self.score_fn(entry, [row])[0])
+
+        future: Future = Future()
+        key = id(entry)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _Batch(entry)
+            batch.rows.append(row)
+            batch.futures.append(future)
+            self._close_if_ready(key)
+
+        try:
+            # Time spent waiting on the batch counts towards the request's
+            # scoring stage; the leader's inference call records its own time.
+            started = time.perf_counter()
+            if leader:
+                batch.closed.wait(self.window_seconds)
+                with self._lock:
+                    if self._open.get(key) is batch:
+                        del self._open[key]
+                metrics.add_stage_time("scoring", time.perf_counter() - started)
+                self._run(batch)
+                return future.result()
+            result = future.result()
+            metrics.add_stage_time("scoring", time.perf_counter() - started)
+            return result
+        finally:
+            with self._lock:
+                remaining = self._in_flight[key] - 1
+                if remaining:
+                    self._in_flight[key] = remaining
+                else:
+                    del self._in_flight[key]
+                self._close_if_ready(key)
+
+    def _close_if_ready(self, key: int) -> None:
+        # Caller holds self._lock. Full, or holding every caller in flight:
+        # later callers start a new batch, the leader wakes now.
+        batch = self._open.get(key)
+        if batch is None:
+            return
+        if len(batch.rows) >= min(self.max_batch, self._in_flight.get(key, 0)):
+            del self._open[key]
+            batch.closed.set()
+
+    def _run(self, batch: _Batch) -> None:
+        # Rows can no longer be added: the batch was removed from _open
+        try:
+            scores = self.score_fn(batch.entry, batch.rows)
+        except Exception as exc:
+            for future in batch.futures:
+                future.set_exception(exc)
+            return
+        metrics.observe_scoring_batch(
+            batch.entry.get("name", "unknown"), len(batch.rows), self.max_batch
+        )
+        for future, score in zip(batch.futures, scores.tolist()):
+            future.set_result(score)
@@ -0,0 +1,232 @@
+import time
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, bindparam, delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app import feature_store, models, risk_scores
+from app.sensor_timeseries import METRICS, update_rollups
+
+# -----------------------------
+# Sensor ingestion & rolling statistics
+# -----------------------------
+#
+# A batch of readings is bulk-inserted, reduced to per (vehicle, component)
+# count/mean/M2 with one pandas groupby, and merged into the stored running
+# statistics with Chan et al.'s parallel update. History is never rescanned.
+# The all-component means ("*") feed Vehicle.avg_engine_temp/avg_vibration,
+# so model features stay current. The same batch is folded into the
+# time-series rollups (see sensor_timeseries) and into the derived sensor
+# features of its vehicles (see feature_store.fold_sensor_features).
+
+ALL_COMPONENTS = "*"
+ID_CHUNK_SIZE = 500
+
+sensor_table = models.SensorReading.__table__
+stats_table = models.VehicleSensorStats.__table__
+vehicle_table = models.Vehicle.__table__
+
+
+class UnknownVehicleError(ValueError):
+    def __init__(self, vehicle_ids: Sequence[int]):
+        self.vehicle_ids = list(vehicle_ids)
+        super().__init__(f"Unknown vehicle ids: {self.vehicle_ids[:20]}")
+
+
+def _batch_stats(readings: pd.DataFrame) -> pd.DataFrame:
+    """Per (vehicle_id, component) count, mean and M2 of one batch."""
+    per_component = readings.groupby(["vehicle_id", "component"], sort=False)
+    per_vehicle = readings.assign(component=ALL_COMPONENTS).groupby(
+        ["vehicle_id", "component"], sort=False
+    )
+
+    frames = []
+    for grouped in (per_component, per_vehicle):
+        agg = grouped[METRICS].agg(["count", "mean", "var"])
+        out = pd.DataFrame(index=agg.index)
+        out["count"] = agg[(METRICS[0], "count")]
+        for metric in METRICS:
+            out[f"mean_{metric}"] = agg[(metric, "mean")]
+            # var uses ddof=1; M2 = var * (n - 1), zero for single readings
+            out[f"m2_{metric}"] = agg[(metric, "var")].fillna(0.0) * (out["count"] - 1)
+        out["last_reading_at"] = grouped["timestamp"].max()
+        frames.append(out)
+    return pd.concat(frames).reset_index()
+
+
+def _load_existing_stats(db: Session, vehicle_ids: Sequence[int]) -> pd.DataFrame:
+    rows: List[Any] = []
+    for start in range(0, len(vehicle_ids), ID_CHUNK_SIZE):
+        chunk = vehicle_ids[start : start + ID_CHUNK_SIZE]
+        rows.extend(
+            db.execute(
+                select(stats_table)
+                .where(stats_table.c.vehicle_id.in_(chunk))
+                .with_for_update()
+            ).all()
+        )
+    return pd.DataFrame(rows, columns=[c.name for c in stats_table.columns])
+
+
+def merge_stats(existing: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """Combine two sets of (count, mean, M2) statistics key by key."""
+    keys = ["vehicle_id", "component"]
+    merged = batch.merge(existing, on=keys, how="left", suffixes=("_b", "_a"))
+
+    def column(name: str) -> np.ndarray:
+        # Keys without stored statistics merge in as NaN (object dtype when
+        # nothing was stored yet); they count as an empty set of readings.
+        return np.nan_to_num(merged[name].to_numpy(dtype=float))
+
+    n_a = column("count_a")
+    n_b = column("count_b")
+    n = n_a + n_b
+
+    out = merged[keys].copy()
+    out["count"] = n.astype(np.int64)
+    for metric in METRICS:
+        mean_a = column(f"mean_{metric}_a")
+        mean_b = column(f"mean_{metric}_b")
+        m2_a = column(f"m2_{metric}_a")
+        m2_b = column(f"m2_{metric}_b")
+        delta = mean_b - mean_a
+        out[f"mean_{metric}"] = mean_a + delta * n_b / n
+        out[f"m2_{metric}"] = m2_a + m2_b + delta**2 * n_a * n_b / n
+    out["last_reading_at"] = np.fmax(
+        pd.to_datetime(merged["last_reading_at_a"]).to_numpy(),
+        pd.to_datetime(merged["last_reading_at_b"]).to_numpy(),
+    )
+    return out
+
+
+def readings_frame(readings: Sequence[Any]) -> pd.DataFrame:
+    """Column-oriented frame from SensorReadingIn objects."""
+    columns = ["vehicle_id", "timestamp", "component"] + METRICS
+    return pd.DataFrame(
+        {col: [getattr(r, col) for r in readings] for col in columns}, columns=columns
+    )
+
+
+def fold_readings(db: Session, readings: pd.DataFrame) -> pd.DataFrame:
+    """
+    Fold readings that were just inserted into the time-series rollups and
+    the running statistics, in the caller's transaction. Also used by the
+    bulk loader. Returns the merged statistics rows of the batch's keys.
+    """
+    vehicle_ids = sorted(int(v) for v in readings["vehicle_id"].unique())
+    update_rollups(db, readings)
+
+    merged = merge_stats(_load_existing_stats(db, vehicle_ids), _batch_stats(readings))
+    db.execute(
+        delete(stats_table).where(
+            and_(
+                stats_table.c.vehicle_id == bindparam("b_vid"),
+                stats_table.c.component == bindparam("b_component"),
+            )
+        ),
+        [
+            {"b_vid": int(vid), "b_component": comp}
+            for vid, comp in zip(merged["vehicle_id"], merged["component"])
+        ],
+    )
+    db.execute(insert(stats_table), merged.astype(object).to_dict("records"))
+    return merged
+
+
+def ingest_sensor_readings(db: Session, readings: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Insert a batch of readings and fold it into the running statistics,
+    all in one transaction. Inserting first takes the write lock, so the
+    read-merge-write of the statistics is serialized with other ingesters.
+    """
+    started = time.perf_counter()
+    if readings.empty:
+        return {"inserted": 0, "vehicles_updated": 0, "seconds": 0.0}
+
+    vehicle_ids = sorted(int(v) for v in readings["vehicle_id"].unique())
+    known = set()
+    for start in range(0, len(vehicle_ids), ID_CHUNK_SIZE):
+        chunk = vehicle_ids[start : start + ID_CHUNK_SIZE]
+        known.update(
+            db.execute(select(vehicle_table.c.id).where(vehicle_table.c.id.in_(chunk))).scalars()
+        )
+    unknown = [v for v in vehicle_ids if v not in known]
+    if unknown:
+        raise UnknownVehicleError(unknown)
+
+    try:
+        columns = ["vehicle_id", "timestamp", "component"] + METRICS
+        db.execute(
+            insert(sensor_table),
+            readings[columns].astype(object).to_dict("records"),
+        )
+        merged = fold_readings(db, readings)
+
+        # Refresh the model features derived from sensor history
+        overall = merged[merged["component"] == ALL_COMPONENTS]
+        db.execute(
+            update(vehicle_table)
+            .where(vehicle_table.c.id == bindparam("b_id"))
+            .values(
+                avg_engine_temp=bindparam("b_temp"),
+                avg_vibration=bindparam("b_vib"),
+            ),
+            [
+                {"b_id": int(vid), "b_temp": float(temp), "b_vib": float(vib)}
+                for vid, temp, vib in zip(
+                    overall["vehicle_id"],
+                    overall["mean_temperature"],
+                    overall["mean_vibration"],
+                )
+            ],
+        )
+        # Core updates bypass the ORM flush hook, so drop cached scores here
+        risk_scores.invalidate_vehicle_scores(db, vehicle_ids)
+        # Sensor spreads and trends of the batch's vehicles, from the batch
+        feature_store.fold_sensor_features(db, readings, merged)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return {
+        "inserted": len(readings),
+        "vehicles_updated": len(vehicle_ids),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def rebuild_sensor_stats(db: Session) -> None:
+    """
+    Recompute every running statistic from the raw readings with set-based
+    SQL. Only needed for readings written before ingestion and the bulk
+    loader maintained the table (see fold_readings).
+    """
+    db.execute(delete(stats_table))
+    for component in (sensor_table.c.component, literal(ALL_COMPONENTS)):
+        n = func.count()
+        columns = [sensor_table.c.vehicle_id, component.label("component"), n.label("count")]
+        for metric in METRICS:
+            col = sensor_table.c[metric]
+            columns.append(func.avg(col).label(f"mean_{metric}"))
+            # M2 = sum(x^2) - sum(x)^2 / n
+            columns.append(
+                (func.sum(col * col) - func.sum(col) * func.sum(col) / n).label(f"m2_{metric}")
+            )
+        columns.append(func.max(sensor_table.c.timestamp).label("last_reading_at"))
+
+        group_by = [sensor_table.c.vehicle_id]
+        if component is sensor_table.c.component:
+            group_by.append(sensor_table.c.component)
+        db.execute(
+            insert(stats_table).from_select(
+                [c.name for c in stats_table.columns], select(*columns).group_by(*group_by)
+            )
+        )
+    db.commit()
+
+
+def sensor_stats_empty(db: Session) -> bool:
+    return db.execute(select(stats_table.c.vehicle_id).limit(1)).first() is None
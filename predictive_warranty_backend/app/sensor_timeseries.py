@@ -0,0 +1,385 @@
+import math
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, bindparam, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+# -----------------------------
+# Sensor time series: rollups & downsampling
+# -----------------------------
+#
+# Readings are pre-aggregated into sensor_rollups at each resolution in
+# ROLLUP_RESOLUTIONS (count, min, max and sum per metric and time bucket).
+# Buckets are aligned to the Unix epoch, so every coarse bucket is exactly
+# a set of finer ones and any rollup can be re-bucketed to a wider width.
+# Ingestion folds each batch into the buckets it touches.
+#
+# A series request reads the cheapest source that still resolves its point
+# budget: the coarsest rollup no wider than one output point, or raw
+# readings (one index range on vehicle_id, component, timestamp) when the
+# range is short or sparse. Those rows are then reduced either to
+# min/max/mean buckets, which keep spikes visible, or with LTTB
+# (Largest-Triangle-Three-Buckets) to a line that keeps the visual shape.
+
+METRICS = ["temperature", "vibration", "pressure"]
+# Bucket widths in seconds, finest first
+ROLLUP_RESOLUTIONS = tuple(
+    sorted(
+        int(r)
+        for r in os.environ.get(
+            "WARRANTY_SENSOR_ROLLUP_RESOLUTIONS", "60,600,3600,86400"
+        ).split(",")
+    )
+)
+# LTTB picks from about this many input points per output point
+LTTB_OVERSAMPLING = 4
+# Vehicles per query when rebuilding the rollups from raw readings
+ROLLUP_REBUILD_VEHICLES = 500
+ID_CHUNK_SIZE = 500
+
+sensor_table = models.SensorReading.__table__
+rollup_table = models.SensorRollup.__table__
+ROLLUP_KEYS = ["vehicle_id", "component", "resolution_seconds", "bucket_start"]
+ROLLUP_STATS = [f"{stat}_{metric}" for metric in METRICS for stat in ("min", "max", "sum")]
+
+
+def rollup_frame(readings: pd.DataFrame, resolution: int) -> pd.DataFrame:
+    """Aggregate raw readings into buckets of one resolution."""
+    keyed = readings.assign(
+        bucket_start=pd.to_datetime(readings["timestamp"]).dt.floor(f"{resolution}s")
+    )
+    agg = keyed.groupby(["vehicle_id", "component", "bucket_start"], sort=False)[METRICS].agg(
+        ["count", "min", "max", "sum"]
+    )
+    out = pd.DataFrame(index=agg.index)
+    out["count"] = agg[(METRICS[0], "count")]
+    for metric in METRICS:
+        for stat in ("min", "max", "sum"):
+            out[f"{stat}_{metric}"] = agg[(metric, stat)]
+    out = out.reset_index()
+    out.insert(2, "resolution_seconds", resolution)
+    return out
+
+
+def merge_rollups(existing: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    """Combine stored buckets with a batch's buckets, key by key."""
+    merged = batch.merge(existing, on=ROLLUP_KEYS, how="left", suffixes=("_b", "_a"))
+    out = merged[ROLLUP_KEYS].copy()
+    out["count"] = (merged["count_b"] + merged["count_a"].fillna(0)).astype(np.int64)
+    for metric in METRICS:
+        # fmin/fmax ignore the NaN of buckets that were not stored yet
+        out[f"min_{metric}"] = np.fmin(merged[f"min_{metric}_b"], merged[f"min_{metric}_a"])
+        out[f"max_{metric}"] = np.fmax(merged[f"max_{metric}_b"], merged[f"max_{metric}_a"])
+        out[f"sum_{metric}"] = merged[f"sum_{metric}_b"] + merged[f"sum_{metric}_a"].fillna(0.0)
+    out["existed"] = merged["count_a"].notna()
+    return out
+
+
+def _load_existing_rollups(db: Session, batch: pd.DataFrame, resolution: int) -> pd.DataFrame:
+    # Only the stored buckets within the batch's vehicles and time span
+    vehicle_ids = sorted(int(v) for v in batch["vehicle_id"].unique())
+    first, last = batch["bucket_start"].min(), batch["bucket_start"].max()
+    rows: List[Any] = []
+    for start in range(0, len(vehicle_ids), ID_CHUNK_SIZE):
+        chunk = vehicle_ids[start : start + ID_CHUNK_SIZE]
+        rows.extend(
+            db.execute(
+                select(rollup_table).where(
+                    rollup_table.c.vehicle_id.in_(chunk),
+                    rollup_table.c.resolution_seconds == resolution,
+                    rollup_table.c.bucket_start.between(first, last),
+                )
+            ).all()
+        )
+    existing = pd.DataFrame(rows, columns=[c.name for c in rollup_table.columns])
+    # Explicit dtypes: with no stored buckets the columns would be object
+    return existing.astype(
+        {
+            "vehicle_id": np.int64,
+            "resolution_seconds": np.int64,
+            "bucket_start": "datetime64[ns]",
+            "count": np.int64,
+            **{column: float for column in ROLLUP_STATS},
+        }
+    )
+
+
+def update_rollups(db: Session, readings: pd.DataFrame) -> None:
+    """
+    Fold a batch of raw readings into the stored rollups, in the caller's
+    transaction (see sensor_ingest.ingest_sensor_readings).
+    """
+    if readings.empty:
+        return
+    for resolution in ROLLUP_RESOLUTIONS:
+        batch = rollup_frame(readings, resolution)
+        merged = merge_rollups(_load_existing_rollups(db, batch, resolution), batch)
+        existed = merged[merged["existed"]]
+        if len(existed):
+            db.execute(
+                delete(rollup_table).where(
+                    and_(
+                        rollup_table.c.vehicle_id == bindparam("b_vid"),
+                        rollup_table.c.component == bindparam("b_component"),
+                        rollup_table.c.resolution_seconds == resolution,
+                        rollup_table.c.bucket_start == bindparam("b_bucket"),
+                    )
+                ),
+                [
+                    {"b_vid": int(vid), "b_component": comp, "b_bucket": bucket}
+                    for vid, comp, bucket in zip(
+                        existed["vehicle_id"], existed["component"], existed["bucket_start"]
+                    )
+                ],
+            )
+        db.execute(
+            insert(rollup_table),
+            merged.drop(columns="existed").astype(object).to_dict("records"),
+        )
+
+
+def rebuild_sensor_rollups(db: Session) -> None:
+    """
+    Recompute every rollup from the raw readings, a range of vehicles at a
+    time. Only needed for readings written before ingestion and the bulk
+    loader maintained the rollups (see sensor_ingest.fold_readings).
+    """
+    db.execute(delete(rollup_table))
+    max_id = db.execute(select(func.max(sensor_table.c.vehicle_id))).scalar() or 0
+    columns = ["vehicle_id", "timestamp", "component"] + METRICS
+    for low in range(0, max_id, ROLLUP_REBUILD_VEHICLES):
+        rows = db.execute(
+            select(*[sensor_table.c[c] for c in columns]).where(
+                sensor_table.c.vehicle_id > low,
+                sensor_table.c.vehicle_id <= low + ROLLUP_REBUILD_VEHICLES,
+            )
+        ).all()
+        if not rows:
+            continue
+        readings = pd.DataFrame(rows, columns=columns)
+        for resolution in ROLLUP_RESOLUTIONS:
+            db.execute(
+                insert(rollup_table),
+                rollup_frame(readings, resolution).astype(object).to_dict("records"),
+            )
+    db.commit()
+
+
+def sensor_rollups_empty(db: Session) -> bool:
+    return db.execute(select(rollup_table.c.vehicle_id).limit(1)).first() is None
+
+
+# -----------------------------
+# Downsampled series
+# -----------------------------
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the n_out points kept by Largest-Triangle-Three-Buckets.
+    The first and last points are always kept; from each of the n_out - 2
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the next bucket's average is kept.
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n) if n <= n_out else np.array([0, n - 1])
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    keep = np.empty(n_out, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[hi : edges[i + 2]].mean()
+            next_y = y[hi : edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs(
+            (x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _read_raw(
+    db: Session, vehicle_id: int, component: str, metric: str, start: datetime, end: datetime
+) -> pd.DataFrame:
+    # One raw reading is a bucket of one: count 1, min = max = sum = value
+    rows = db.execute(
+        select(sensor_table.c.timestamp, sensor_table.c[metric])
+        .where(
+            sensor_table.c.vehicle_id == vehicle_id,
+            sensor_table.c.component == component,
+            sensor_table.c.timestamp.between(start, end),
+        )
+        .order_by(sensor_table.c.timestamp)
+    ).all()
+    frame = pd.DataFrame(rows, columns=["timestamp", "value"])
+    values = frame["value"].to_numpy(dtype=float)
+    return pd.DataFrame(
+        {
+            "timestamp": pd.to_datetime(frame["timestamp"]),
+            "count": np.ones(len(frame), dtype=np.int64),
+            "min": values,
+            "max": values,
+            "sum": values,
+        }
+    )
+
+
+def _read_rollups(
+    db: Session,
+    vehicle_id: int,
+    component: str,
+    metric: str,
+    resolution: int,
+    start: datetime,
+    end: datetime,
+) -> pd.DataFrame:
+    # The bucket holding `start` is included, so ranges align to buckets
+    first_bucket = pd.Timestamp(start).floor(f"{resolution}s").to_pydatetime()
+    c = rollup_table.c
+    rows = db.execute(
+        select(
+            c.bucket_start, c.count, c[f"min_{metric}"], c[f"max_{metric}"], c[f"sum_{metric}"]
+        )
+        .where(
+            c.vehicle_id == vehicle_id,
+            c.component == component,
+            c.resolution_seconds == resolution,
+            c.bucket_start.between(first_bucket, end),
+        )
+        .order_by(c.bucket_start)
+    ).all()
+    frame = pd.DataFrame(rows, columns=["timestamp", "count", "min", "max", "sum"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    return frame
+
+
+def _rebucket(rows: pd.DataFrame, width_seconds: int) -> pd.DataFrame:
+    """Merge (count, min, max, sum) rows into epoch-aligned buckets of the given width."""
+    seconds = rows["timestamp"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    key = seconds // width_seconds * width_seconds
+    out = rows.groupby(key, sort=True).agg(
+        count=("count", "sum"), min=("min", "min"), max=("max", "max"), sum=("sum", "sum")
+    )
+    out.index = pd.to_datetime(out.index, unit="s")
+    return out.rename_axis("timestamp").reset_index()
+
+
+def _pick_resolution(max_width: float) -> Optional[int]:
+    # Coarsest rollup that is no wider than max_width seconds
+    fitting = [r for r in ROLLUP_RESOLUTIONS if r <= max_width]
+    return fitting[-1] if fitting else None
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Readings are stored as naive UTC; aware bounds are converted to match
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def series_bounds(
+    db: Session, vehicle_id: int, component: str
+) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """First and last reading time (index-only lookups)."""
+    ts = sensor_table.c.timestamp
+    where = (sensor_table.c.vehicle_id == vehicle_id, sensor_table.c.component == component)
+    first = db.execute(select(func.min(ts)).where(*where)).scalar()
+    last = db.execute(select(func.max(ts)).where(*where)).scalar()
+    return first, last
+
+
+def sensor_series(
+    db: Session,
+    vehicle_id: int,
+    component: str,
+    metric: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    points: int = 500,
+    method: str = "minmax",
+) -> Dict[str, Any]:
+    """
+    At most `points` points of one vehicle/component/metric between start
+    and end (inclusive; defaults to the whole history).
+    method="minmax" returns buckets with min/max/mean/count;
+    method="lttb" returns the LTTB-selected values.
+    Timezone-aware start/end are converted to UTC.
+    """
+    start, end = _naive_utc(start), _naive_utc(end)
+    if start is None or end is None:
+        first, last = series_bounds(db, vehicle_id, component)
+        start = start or first
+        end = end or last
+
+    rows: Optional[pd.DataFrame] = None
+    resolution: Optional[int] = None
+    source_resolution: Optional[int] = None
+    if start is not None and end is not None and start <= end:
+        span = (end - start).total_seconds()
+        oversampling = LTTB_OVERSAMPLING if method == "lttb" else 1
+        resolution = _pick_resolution(span / (points * oversampling))
+        if resolution is not None:
+            rows = _read_rollups(db, vehicle_id, component, metric, resolution, start, end)
+            if rows["count"].sum() <= points * oversampling:
+                # Sparse range: the raw readings fit the budget anyway
+                resolution, rows = None, None
+        if rows is None:
+            rows = _read_raw(db, vehicle_id, component, metric, start, end)
+        source_resolution = resolution
+
+        if len(rows) > points and method == "minmax":
+            # Narrowest bucket that keeps the count within budget, as a whole
+            # multiple of the source resolution so its buckets nest exactly.
+            # Rollup rows start at the bucket holding `start`, so the width
+            # comes from the rows' own extent e rather than start..end:
+            # epoch-aligned buckets of width w cover it with at most
+            # ceil(e / w) + 1 <= points buckets.
+            base = resolution or 1
+            seconds = rows["timestamp"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+            extent = int(seconds.max() - seconds.min())
+            width = max(base, math.ceil(extent / max(points - 1, 1) / base) * base)
+            rows = _rebucket(rows, width)
+            resolution = width
+
+    if rows is None:
+        rows = pd.DataFrame(columns=["timestamp", "count", "min", "max", "sum"])
+
+    result: Dict[str, Any] = {
+        "vehicle_id": vehicle_id,
+        "component": component,
+        "metric": metric,
+        "method": method,
+        "start": start,
+        "end": end,
+        "source": "raw" if source_resolution is None else f"rollup_{source_resolution}s",
+        # Width of each returned bucket; None when points are raw readings
+        "resolution_seconds": resolution,
+    }
+    counts = rows["count"].to_numpy(dtype=np.int64)
+    means = rows["sum"].to_numpy(dtype=float) / np.maximum(counts, 1)
+    timestamps = pd.DatetimeIndex(rows["timestamp"])
+    if method == "lttb":
+        x = timestamps.asi8.astype(float)
+        keep = lttb(x, means, points)
+        result["points"] = len(keep)
+        result["timestamp"] = timestamps[keep].to_pydatetime().tolist()
+        result["value"] = means[keep].tolist()
+    else:
+        result["points"] = len(rows)
+        result["timestamp"] = timestamps.to_pydatetime().tolist()
+        result["min"] = rows["min"].to_numpy(dtype=float).tolist()
+        result["max"] = rows["max"].to_numpy(dtype=float).tolist()
+        result["mean"] = means.tolist()
+        result["count"] = counts.tolist()
+    return result
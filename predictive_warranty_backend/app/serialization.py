@@ -0,0 +1,137 @@
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi.responses import Response
+
+from app.metrics import stage
+from app.models import ServiceRecord, Vehicle
+from app.schemas import ServiceRecordOut, VehicleSummary
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+# -----------------------------
+# Fast response serialization
+# -----------------------------
+#
+# The vehicle routes build plain dicts straight from ORM rows, which are
+# already typed by the columns, and return them in a FastJSONResponse. A
+# returned Response skips FastAPI's response_model validation and
+# jsonable_encoder pass; the declared response_model still documents the
+# (unchanged) contract in OpenAPI. Encoding uses orjson when installed.
+
+# Optional multi-model fields are only added when requested
+MODEL_SCORE_FIELDS = ["model_scores", "ensemble_score"]
+VEHICLE_SUMMARY_FIELDS = [f for f in VehicleSummary.__fields__ if f not in MODEL_SCORE_FIELDS]
+SERVICE_RECORD_FIELDS = list(ServiceRecordOut.__fields__)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_json_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded with orjson when available; encoding time is
+    recorded as the serialization stage."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with stage("serialization"):
+            return dumps(content)
+
+
+def vehicle_summary_row(v: Vehicle, risk: float, risk_bucket: str) -> Dict[str, Any]:
+    # Same fields, order and rounding as VehicleSummary
+    return {
+        "id": v.id,
+        "vin": v.vin,
+        "model": v.model,
+        "model_year": v.model_year,
+        "mileage": v.mileage,
+        "age_months": round(v.age_months, 1),
+        "dealership_name": v.dealership.name if v.dealership else "N/A",
+        "region": v.region,
+        "supplier_code": v.supplier_code,
+        "plant_code": v.plant_code,
+        "avg_engine_temp": round(v.avg_engine_temp, 1),
+        "avg_vibration": round(v.avg_vibration, 2),
+        "services_last_12m": v.services_last_12m,
+        "failure_label": bool(v.failure_label),
+        "risk_score": round(float(risk), 3),
+        "risk_bucket": risk_bucket,
+    }
+
+
+def service_record_row(s: ServiceRecord) -> Dict[str, Any]:
+    return {
+        "id": s.id,
+        "service_date": s.service_date,
+        "mileage": s.mileage,
+        "component": s.component,
+        "fault_code": s.fault_code,
+        "action": s.action,
+        "cost": float(s.cost),
+        "is_warranty_claim": bool(s.is_warranty_claim),
+    }
+
+
+def add_model_scores(
+    rows: Sequence[Dict[str, Any]],
+    model_scores: Optional[Dict[str, Any]],
+    ensemble: Optional[Any],
+) -> None:
+    """Attach per-model scores and/or the ensemble score to summary rows."""
+    if model_scores is not None:
+        values = {name: _rounded(scores) for name, scores in model_scores.items()}
+        for i, row in enumerate(rows):
+            row["model_scores"] = {name: column[i] for name, column in values.items()}
+    if ensemble is not None:
+        for row, score in zip(rows, _rounded(ensemble)):
+            row["ensemble_score"] = score
+
+
+def add_model_score_columns(
+    content: Dict[str, Any],
+    model_scores: Optional[Dict[str, Any]],
+    ensemble: Optional[Any],
+) -> None:
+    """Columnar form of add_model_scores: model_scores is {model: [...]}."""
+    columns = content["columns"]
+    if model_scores is not None:
+        columns["model_scores"] = {
+            name: _rounded(scores) for name, scores in model_scores.items()
+        }
+    if ensemble is not None:
+        columns["ensemble_score"] = _rounded(ensemble)
+    # A new list: content["fields"] may be the shared VEHICLE_SUMMARY_FIELDS
+    content["fields"] = list(content["fields"]) + [
+        field for field in MODEL_SCORE_FIELDS if field in columns
+    ]
+
+
+def _rounded(scores) -> List[float]:
+    # Same rounding as risk_score
+    return [round(float(score), 3) for score in scores]
+
+
+def to_columns(rows: Sequence[Dict[str, Any]], fields: List[str]) -> Dict[str, Any]:
+    """Compact column-oriented payload: one array per field."""
+    return {
+        "count": len(rows),
+        "fields": fields,
+        "columns": {field: [row[field] for row in rows] for field in fields},
+    }
@@ -0,0 +1,106 @@
+import threading
+import traceback
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from app.generate_synthetic_data_and_train import get_model_registry, initialize_models
+from app.incremental_training import update_models_incrementally
+
+# -----------------------------
+# Background training worker
+# -----------------------------
+#
+# Training runs in a daemon thread so the API can serve as soon as the
+# process starts. The worker builds a complete registry off to the side and
+# publishes it with set_model_registry(), so requests keep using the
+# previous models until the new ones are all ready. Incremental runs
+# (app/incremental_training.py) go through the same worker, so they never
+# overlap a full training run.
+
+_lock = threading.Lock()
+_worker: Optional[threading.Thread] = None
+_status: Dict[str, Any] = {
+    "state": "idle",  # idle | running | completed | failed
+    "mode": None,  # full | incremental
+    "models": {},  # model_name -> pending | training | ready | failed
+    "started_at": None,
+    "finished_at": None,
+    "error": None,
+    "last_increment": None,  # record of the latest incremental run
+}
+
+
+def _set_model_state(model_name: str, state: str) -> None:
+    with _lock:
+        _status["models"][model_name] = state
+
+
+def _run(force_retrain: bool, incremental: bool) -> None:
+    try:
+        if incremental:
+            record = update_models_incrementally(on_progress=_set_model_state)
+            with _lock:
+                _status["last_increment"] = record
+        else:
+            initialize_models(force_retrain=force_retrain, on_progress=_set_model_state)
+    except Exception as exc:
+        traceback.print_exc()
+        with _lock:
+            _status["state"] = "failed"
+            _status["error"] = repr(exc)
+            for name, state in _status["models"].items():
+                if state != "ready":
+                    _status["models"][name] = "failed"
+    else:
+        with _lock:
+            _status["state"] = "completed"
+    finally:
+        with _lock:
+            _status["finished_at"] = datetime.utcnow().isoformat()
+
+
+def start_training(force_retrain: bool = False, incremental: bool = False) -> bool:
+    """
+    Start a training run in the background: a full (re)train, or with
+    incremental set an update from vehicles added since the last checkpoint.
+    Returns False if a run is already in progress.
+    """
+    global _worker
+    with _lock:
+        if _worker is not None and _worker.is_alive():
+            return False
+        _status.update(
+            state="running",
+            mode="incremental" if incremental else "full",
+            models={},
+            started_at=datetime.utcnow().isoformat(),
+            finished_at=None,
+            error=None,
+        )
+        _worker = threading.Thread(
+            target=_run,
+            args=(force_retrain, incremental),
+            name="model-training",
+            daemon=True,
+        )
+        _worker.start()
+    return True
+
+
+def training_status() -> Dict[str, Any]:
+    registry = get_model_registry()
+    with _lock:
+        status = dict(_status, models=dict(_status["models"]))
+    # Serving only needs *some* trained registry; a retrain in progress
+    # keeps the previous models available.
+    status["ready"] = bool(registry)
+    status["serving_models"] = {
+        name: info["version"] for name, info in registry.items()
+    }
+    return status
+
+
+def wait_for_training(timeout: Optional[float] = None) -> None:
+    worker = _worker
+    if worker is not None:
+        worker.join(timeout)
@@ -0,0 +1,131 @@
+import base64
+import json
+from typing import Any, Optional, Tuple
+
+from fastapi import Query
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query as OrmQuery
+
+from app.models import Vehicle
+
+# -----------------------------
+# Vehicle filtering & keyset pagination
+# -----------------------------
+#
+# Pages are addressed by a cursor holding the (sort value, id) of the last
+# row served, so page N costs one index range scan no matter how deep N is
+# (unlike OFFSET, which walks every skipped row).
+
+SORTABLE_COLUMNS = {
+    "id": Vehicle.id,
+    "mileage": Vehicle.mileage,
+    "model_year": Vehicle.model_year,
+    "age_months": Vehicle.age_months,
+}
+SORT_PATTERN = "^(" + "|".join(SORTABLE_COLUMNS) + ")$"
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class VehicleFilters:
+    """Query-string filters for vehicle listings, pushed down into SQL."""
+
+    def __init__(
+        self,
+        region: Optional[str] = Query(None),
+        supplier_code: Optional[str] = Query(None),
+        plant_code: Optional[str] = Query(None),
+        model: Optional[str] = Query(None),
+        model_year: Optional[int] = Query(None),
+        mileage_min: Optional[int] = Query(None, ge=0),
+        mileage_max: Optional[int] = Query(None, ge=0),
+    ):
+        self.region = region
+        self.supplier_code = supplier_code
+        self.plant_code = plant_code
+        self.model = model
+        self.model_year = model_year
+        self.mileage_min = mileage_min
+        self.mileage_max = mileage_max
+
+    def apply(self, query: OrmQuery) -> OrmQuery:
+        for column, value in (
+            (Vehicle.region, self.region),
+            (Vehicle.supplier_code, self.supplier_code),
+            (Vehicle.plant_code, self.plant_code),
+            (Vehicle.model, self.model),
+            (Vehicle.model_year, self.model_year),
+        ):
+            if value is not None:
+                query = query.filter(column == value)
+        if self.mileage_min is not None:
+            query = query.filter(Vehicle.mileage >= self.mileage_min)
+        if self.mileage_max is not None:
+            query = query.filter(Vehicle.mileage <= self.mileage_max)
+        return query
+
+
+def encode_cursor(sort_by: str, order: str, vehicle: Vehicle) -> str:
+    payload = [sort_by, order, getattr(vehicle, sort_by), vehicle.id]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def _cursor_value(value: Any, sort_by: str) -> Any:
+    # JSON gives int, float, str, bool, None, list or dict; only a number
+    # of the sort column's type can be compared against it
+    python_type = SORTABLE_COLUMNS[sort_by].type.python_type
+    allowed = (int, float) if python_type is float else (python_type,)
+    if isinstance(value, bool) or not isinstance(value, allowed):
+        raise InvalidCursorError(f"Cursor value does not match the type of {sort_by}")
+    return value
+
+
+def decode_cursor(cursor: str, sort_by: str, order: str) -> Tuple[Any, int]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursorError("Malformed cursor") from exc
+    if not isinstance(payload, list) or len(payload) != 4:
+        raise InvalidCursorError("Malformed cursor")
+    cur_sort, cur_order, value, last_id = payload
+    if (cur_sort, cur_order) != (sort_by, order):
+        raise InvalidCursorError("Cursor was issued for a different sort order")
+    if isinstance(last_id, bool) or not isinstance(last_id, int):
+        raise InvalidCursorError("Malformed cursor")
+    return _cursor_value(value, sort_by), int(last_id)
+
+
+def keyset_page(
+    query: OrmQuery,
+    sort_by: str = "id",
+    order: str = "asc",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> OrmQuery:
+    """
+    Order by (sort column, id) and seek past the cursor. The id tie-breaker
+    makes the order total, so rows with equal sort values are never skipped
+    or repeated across pages.
+    """
+    column = SORTABLE_COLUMNS[sort_by]
+    descending = order == "desc"
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, order)
+        if sort_by == "id":
+            seek = Vehicle.id < last_id if descending else Vehicle.id > last_id
+        elif descending:
+            seek = or_(column < value, and_(column == value, Vehicle.id < last_id))
+        else:
+            seek = or_(column > value, and_(column == value, Vehicle.id > last_id))
+        query = query.filter(seek)
+
+    if sort_by == "id":
+        ordering = [Vehicle.id.desc() if descending else Vehicle.id.asc()]
+    elif descending:
+        ordering = [column.desc(), Vehicle.id.desc()]
+    else:
+        ordering = [column.asc(), Vehicle.id.asc()]
+    return query.order_by(*ordering).limit(limit)
@@ -0,0 +1,241 @@
+"""
+Read throughput under concurrent sensor ingestion.
+
+Runs the same workload against two engines on copies of one seeded SQLite
+file:
+
+  baseline  create_engine(url, check_same_thread=False), rollback journal
+  tuned     app.database.create_db_engine(url): WAL, busy timeout, pragmas
+
+Each engine gets a read-only phase, then the same readers while --writers
+processes ingest sensor batches through app.sensor_ingest. Readers page
+through vehicles with the dealership joined, like GET /vehicles. Every
+reader and writer is its own process with its own engine, like the workers
+of `uvicorn --workers N`, so contention is on SQLite locks, not the GIL.
+
+    cd predictive_warranty_backend
+    python -m benchmarks.concurrency --vehicles 20000 --readers 8 --seconds 10
+"""
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload, sessionmaker
+
+from app import models
+from app.database import create_db_engine
+from app.fleet_simulator import COMPONENTS, write_fleet_to_database
+from app.sensor_ingest import ingest_sensor_readings
+
+PAGE_SIZE = 100
+
+ENGINES = {
+    "baseline": lambda url: create_engine(url, connect_args={"check_same_thread": False}),
+    "tuned": create_db_engine,
+}
+
+
+def _session_factory(engine_name: str, path: Path):
+    return sessionmaker(bind=ENGINES[engine_name](f"sqlite:///{path}"), expire_on_commit=False)
+
+
+def seed_template(path: Path, n_vehicles: int) -> None:
+    seed_engine = create_engine(f"sqlite:///{path}")
+    models.ensure_schema(seed_engine)
+    db = sessionmaker(bind=seed_engine)()
+    try:
+        write_fleet_to_database(db, n_vehicles, seed=7)
+    finally:
+        db.close()
+        seed_engine.dispose()
+
+
+def _reader(engine_name: str, path: Path, n_vehicles: int, stop, results) -> None:
+    Session = _session_factory(engine_name, path)
+    out: Dict[str, Any] = {"role": "read", "latencies": [], "errors": 0}
+    rng = random.Random()
+    while not stop.is_set():
+        started = time.perf_counter()
+        db = Session()
+        try:
+            (
+                db.query(models.Vehicle)
+                .options(joinedload(models.Vehicle.dealership))
+                .filter(models.Vehicle.id > rng.randint(0, max(0, n_vehicles - PAGE_SIZE)))
+                .order_by(models.Vehicle.id)
+                .limit(PAGE_SIZE)
+                .all()
+            )
+            out["latencies"].append(time.perf_counter() - started)
+        except OperationalError:
+            out["errors"] += 1
+        finally:
+            db.close()
+    results.put(out)
+
+
+def _writer(
+    engine_name: str, path: Path, n_vehicles: int, batch_size: int, seed: int, stop, results
+) -> None:
+    Session = _session_factory(engine_name, path)
+    out: Dict[str, Any] = {"role": "write", "latencies": [], "errors": 0}
+    rng = np.random.default_rng(seed)
+    now = datetime.utcnow() + timedelta(days=seed)
+    while not stop.is_set():
+        frame = pd.DataFrame(
+            {
+                "vehicle_id": rng.integers(1, n_vehicles + 1, batch_size),
+                "timestamp": [now + timedelta(seconds=i) for i in range(batch_size)],
+                "component": rng.choice(COMPONENTS, batch_size),
+                "temperature": rng.normal(90, 10, batch_size),
+                "vibration": rng.normal(3.5, 1.0, batch_size),
+                "pressure": rng.normal(30, 3, batch_size),
+            }
+        )
+        now += timedelta(seconds=batch_size)
+        started = time.perf_counter()
+        db = Session()
+        try:
+            ingest_sensor_readings(db, frame)
+            out["latencies"].append(time.perf_counter() - started)
+        except OperationalError:
+            out["errors"] += 1
+        finally:
+            db.close()
+    results.put(out)
+
+
+def _summary(latencies: List[float], errors: int, seconds: float) -> Dict[str, Any]:
+    lat = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "ops": len(latencies),
+        "ops_per_second": round(len(latencies) / seconds, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 2),
+        "p95_ms": round(float(np.percentile(lat, 95)), 2),
+        "max_ms": round(float(lat.max()), 2),
+        "errors": errors,
+    }
+
+
+def run_phase(
+    engine_name: str,
+    path: Path,
+    n_vehicles: int,
+    readers: int,
+    seconds: float,
+    writers: int,
+    batch_size: int,
+) -> Dict[str, Any]:
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=_reader, args=(engine_name, path, n_vehicles, stop, results)
+        )
+        for _ in range(readers)
+    ]
+    procs += [
+        multiprocessing.Process(
+            target=_writer,
+            args=(engine_name, path, n_vehicles, batch_size, seed, stop, results),
+        )
+        for seed in range(writers)
+    ]
+    for p in procs:
+        p.start()
+    time.sleep(seconds)
+    stop.set()
+    outs = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    def collect(role: str) -> Dict[str, Any]:
+        mine = [out for out in outs if out["role"] == role]
+        return _summary(
+            [x for out in mine for x in out["latencies"]],
+            sum(out["errors"] for out in mine),
+            seconds,
+        )
+
+    result = {"reads": collect("read")}
+    if writers:
+        result["writes"] = collect("write")
+    return result
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = Path(tempfile.mkdtemp(prefix="warranty-bench-"))
+    try:
+        template = workdir / "template.db"
+        seed_template(template, args.vehicles)
+
+        report: Dict[str, Any] = {
+            "vehicles": args.vehicles,
+            "readers": args.readers,
+            "writers": args.writers,
+            "seconds_per_phase": args.seconds,
+            "sensor_batch_size": args.batch_size,
+            "engines": {},
+        }
+        for name in ENGINES:
+            path = workdir / f"{name}.db"
+            shutil.copyfile(template, path)
+            report["engines"][name] = {
+                "read_only": run_phase(
+                    name, path, args.vehicles, args.readers, args.seconds, 0, args.batch_size
+                ),
+                "read_write": run_phase(
+                    name,
+                    path,
+                    args.vehicles,
+                    args.readers,
+                    args.seconds,
+                    args.writers,
+                    args.batch_size,
+                ),
+            }
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", type=Path, help="Also write the report as JSON here")
+    args = parser.parse_args()
+
+    report = run(args)
+    for name, phases in report["engines"].items():
+        for phase, result in phases.items():
+            line = f"{name:9} {phase:10} reads/s={result['reads']['ops_per_second']:8} "
+            line += f"p95={result['reads']['p95_ms']}ms read_errors={result['reads']['errors']}"
+            if "writes" in result:
+                line += (
+                    f" | write batches={result['writes']['ops']}"
+                    f" p95={result['writes']['p95_ms']}ms"
+                    f" write_errors={result['writes']['errors']}"
+                )
+            print(line)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
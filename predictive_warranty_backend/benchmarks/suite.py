@@ -0,0 +1,409 @@
+"""
+Offline benchmark suite: seeding, training, scoring and API endpoints.
+
+Every fleet size runs in its own process against a fresh SQLite database
+and artifact directory in a temp dir (the engine URL is read when app.database
+is imported). Per size it reports:
+
+  seeding     seed_database() wall time and rows/s over all seeded tables,
+              then the feature-store refresh that training and scoring read
+  training    training-frame build time on the whole fleet, then
+              train_models_from_frame() and each estimator's fit time on a
+              sample of at most --max-train-rows vehicles
+  scoring     predict_vehicle_risk() latency percentiles and
+              predict_risk_batch() latency per batch size, for every model
+  endpoints   requests/s and latency percentiles through an in-process
+              ASGI client, plus one full streaming export
+
+Results go to a JSON file so runs can be compared over time.
+
+    cd predictive_warranty_backend
+    python -m benchmarks.suite                       # 1k, 100k and 1M vehicles
+    python -m benchmarks.suite --sizes 1000 100000 --output benchmarks/results/run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+SUITE_VERSION = 1
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds, dtype=float) * 1000
+    return {
+        "n": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def _timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+# -----------------------------
+# Stages (run inside the per-size worker process)
+# -----------------------------
+
+
+def bench_seeding(db, n_vehicles: int) -> Dict[str, Any]:
+    from sqlalchemy import func, select
+
+    from app import feature_store, models
+    from app.generate_synthetic_data_and_train import seed_database
+
+    _, seconds = _timed(seed_database, db, n_vehicles)
+    rows = {
+        table.name: db.execute(select(func.count()).select_from(table)).scalar()
+        for table in models.Base.metadata.sorted_tables
+    }
+    total = sum(rows.values())
+    # Seeding leaves the derived features unbuilt; without them training
+    # and scoring would run on the feature store's defaults
+    feature_rows, refresh_seconds = _timed(feature_store.refresh_stale_features, db)
+    return {
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "total_rows": total,
+        "rows_per_second": round(total / seconds, 1),
+        "feature_refresh_seconds": round(refresh_seconds, 3),
+        "feature_rows": feature_rows,
+    }
+
+
+def bench_training(db, max_train_rows: int) -> Dict[str, Any]:
+    from app.generate_synthetic_data_and_train import (
+        FEATURE_CATEGORICAL,
+        FEATURE_NUMERIC,
+        build_preprocessor,
+        build_training_dataframe,
+        model_configs,
+        train_models_from_frame,
+    )
+
+    df, frame_seconds = _timed(build_training_dataframe, db)
+    sample = df.sample(n=min(len(df), max_train_rows), random_state=0)
+    registry, train_seconds = _timed(train_models_from_frame, sample)
+
+    # Per-estimator fit time on the shared preprocessed matrix, one at a
+    # time (train_models_from_frame fits them in parallel).
+    Xt = build_preprocessor().fit_transform(sample[FEATURE_NUMERIC + FEATURE_CATEGORICAL])
+    y = sample["failure_label"].astype(int)
+    per_model = {}
+    for name, estimator, _, _ in model_configs():
+        _, fit_seconds = _timed(estimator.fit, Xt, y)
+        per_model[name] = {
+            "fit_seconds": round(fit_seconds, 3),
+            "auc": registry[name]["auc"],
+            "compiled": registry[name].get("compiled") is not None,
+        }
+
+    return {
+        "training_frame_rows": len(df),
+        "training_frame_seconds": round(frame_seconds, 3),
+        "train_rows": len(sample),
+        "train_models_from_frame_seconds": round(train_seconds, 3),
+        "models": per_model,
+    }, registry
+
+
+def bench_scoring(
+    db, registry: Dict[str, Any], n_single: int, batch_sizes: List[int], batch_repeats: int
+) -> Dict[str, Any]:
+    from sqlalchemy import func, select
+    from sqlalchemy.orm import joinedload
+
+    from app import models
+    from app.generate_synthetic_data_and_train import (
+        build_training_dataframe,
+        predict_risk_batch,
+        predict_vehicle_risk,
+    )
+
+    max_id = db.execute(select(func.max(models.Vehicle.id))).scalar()
+    rng = random.Random(0)
+    ids = [rng.randint(1, max_id) for _ in range(n_single)]
+    vehicles = {
+        v.id: v
+        for v in db.query(models.Vehicle)
+        .options(joinedload(models.Vehicle.features))
+        .filter(models.Vehicle.id.in_(set(ids)))
+    }
+    frame = build_training_dataframe(db, chunk_size=max(batch_sizes))
+    batch_sizes = [b for b in batch_sizes if b <= len(frame)] or [len(frame)]
+
+    results: Dict[str, Any] = {}
+    for name in registry:
+        predict_vehicle_risk(vehicles[ids[0]], name)  # warm-up
+        single = [_timed(predict_vehicle_risk, vehicles[i], name)[1] for i in ids]
+        batches = {}
+        for size in batch_sizes:
+            samples = []
+            for repeat in range(batch_repeats):
+                start = (repeat * size) % max(1, len(frame) - size + 1)
+                samples.append(_timed(predict_risk_batch, frame.iloc[start : start + size], name)[1])
+            summary = latency_summary(samples)
+            summary["rows_per_second"] = round(size / (summary["mean_ms"] / 1000), 1)
+            batches[str(size)] = summary
+        results[name] = {"single": latency_summary(single), "batch": batches}
+    return results
+
+
+async def _drive(client, paths: List[str], concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(path: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in paths))
+    wall = time.perf_counter() - started
+    summary = latency_summary(latencies)
+    summary["requests_per_second"] = round(len(paths) / wall, 1)
+    summary["errors"] = errors
+    return summary
+
+
+async def _bench_endpoints(
+    n_vehicles: int, n_requests: int, concurrency: int, export: bool
+) -> Dict[str, Any]:
+    import httpx
+
+    from app.main import app
+
+    rng = random.Random(0)
+    endpoints = {
+        "health": lambda: "/health",
+        "vehicles_page": lambda: "/vehicles?limit=100",
+        "vehicles_filtered_sorted": lambda: (
+            "/vehicles?limit=100&supplier_code=SUP-X&sort_by=mileage&order=desc"
+        ),
+        "vehicle_detail": lambda: f"/vehicles/{rng.randint(1, n_vehicles)}",
+        "fleet_aggregates": lambda: "/fleet/aggregates?group_by=region",
+    }
+
+    # No lifespan: the startup hook would start a background retrain
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_path in endpoints.items():
+            await client.get(make_path())  # warm-up
+            results[name] = await _drive(
+                client, [make_path() for _ in range(n_requests)], concurrency
+            )
+
+        if export:
+            started = time.perf_counter()
+            rows = 0
+            async with client.stream("GET", "/vehicles/export?format=ndjson") as response:
+                async for chunk in response.aiter_bytes():
+                    rows += chunk.count(b"\n")
+            seconds = time.perf_counter() - started
+            results["export_ndjson"] = {
+                "rows": rows,
+                "seconds": round(seconds, 3),
+                "rows_per_second": round(rows / seconds, 1),
+            }
+    return results
+
+
+def run_size(n_vehicles: int, workdir: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """Entry point of the worker process for one fleet size."""
+    os.environ["WARRANTY_DATABASE_URL"] = f"sqlite:///{Path(workdir) / 'warranty.db'}"
+    os.environ["WARRANTY_ARTIFACT_DIR"] = str(Path(workdir) / "artifacts")
+
+    from app import models
+    from app.database import SessionLocal, engine
+    from app.generate_synthetic_data_and_train import (
+        DEFAULT_MODEL_NAME,
+        materialize_missing_scores,
+        set_model_registry,
+    )
+
+    models.ensure_schema(engine)
+    result: Dict[str, Any] = {"fleet_size": n_vehicles}
+    db = SessionLocal()
+    try:
+        print(f"[{n_vehicles}] seeding", flush=True)
+        result["seeding"] = bench_seeding(db, n_vehicles)
+
+        print(f"[{n_vehicles}] training", flush=True)
+        result["training"], registry = bench_training(db, options["max_train_rows"])
+        set_model_registry(registry)
+
+        print(f"[{n_vehicles}] scoring", flush=True)
+        result["scoring"] = bench_scoring(
+            db,
+            registry,
+            options["single_scores"],
+            options["batch_sizes"],
+            options["batch_repeats"],
+        )
+
+        # Endpoints read materialized scores for the default model
+        _, seconds = _timed(
+            materialize_missing_scores, db, DEFAULT_MODEL_NAME, registry[DEFAULT_MODEL_NAME]
+        )
+        result["materialize_scores_seconds"] = round(seconds, 3)
+    finally:
+        db.close()
+
+    print(f"[{n_vehicles}] endpoints", flush=True)
+    result["endpoints"] = asyncio.run(
+        _bench_endpoints(
+            n_vehicles, options["requests"], options["concurrency"], options["export"]
+        )
+    )
+    return result
+
+
+# -----------------------------
+# Driver
+# -----------------------------
+
+
+def _repo_root() -> Optional[Path]:
+    for parent in Path(__file__).resolve().parents:
+        if (parent / ".git").exists():
+            return parent
+    return None
+
+
+def git_commit() -> Optional[str]:
+    """HEAD of the repository holding the suite, wherever it is run from."""
+    root = _repo_root()
+    if root is None:
+        return None
+    try:
+        return subprocess.run(
+            ["git", "-C", str(root), "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    # No git binary, or git refusing a repository owned by another user:
+    # resolve HEAD from the files
+    git_dir = root / ".git"
+    try:
+        head = (git_dir / "HEAD").read_text().strip()
+        if not head.startswith("ref: "):
+            return head
+        ref = head[len("ref: ") :]
+        if (git_dir / ref).exists():
+            return (git_dir / ref).read_text().strip()
+        for line in (git_dir / "packed-refs").read_text().splitlines():
+            if line.endswith(" " + ref):
+                return line.split(" ", 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+def environment_info() -> Dict[str, Any]:
+    import pandas
+    import sklearn
+    import sqlalchemy
+
+    return {
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "scikit_learn": sklearn.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--max-train-rows", type=int, default=10_000)
+    parser.add_argument("--single-scores", type=int, default=200)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--batch-repeats", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--no-export", dest="export", action="store_false")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    started_at = datetime.utcnow()
+    output = args.output or RESULTS_DIR / f"benchmark-{started_at:%Y%m%dT%H%M%S}.json"
+    options = {
+        "max_train_rows": args.max_train_rows,
+        "single_scores": args.single_scores,
+        "batch_sizes": args.batch_sizes,
+        "batch_repeats": args.batch_repeats,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "export": args.export,
+    }
+    report: Dict[str, Any] = {
+        "suite_version": SUITE_VERSION,
+        "started_at": started_at.isoformat() + "Z",
+        "environment": environment_info(),
+        "options": options,
+        "results": [],
+    }
+
+    for n_vehicles in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="warranty-suite-") as workdir:
+            # Fresh interpreter per size: app.database binds its engine at import
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                result = pool.submit(run_size, n_vehicles, workdir, options).result()
+        report["results"].append(result)
+
+        # Rewrite after every size so a long run leaves partial results
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+
+    for result in report["results"]:
+        seeding = result["seeding"]
+        print(
+            f"{result['fleet_size']:>9} vehicles: seed {seeding['rows_per_second']:,.0f} rows/s, "
+            f"train {result['training']['train_models_from_frame_seconds']}s "
+            f"({result['training']['train_rows']} rows)"
+        )
+        for name, scores in result["scoring"].items():
+            print(f"{'':>20}{name}: single p50 {scores['single']['p50_ms']}ms")
+        for name, stats in result["endpoints"].items():
+            rate = stats.get("requests_per_second", stats.get("rows_per_second"))
+            print(f"{'':>20}{name}: {rate}/s")
+    print("Results written to", output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The app binds its database and artifact store at import time, so both
+# point into a scratch directory before any test module imports it.
+_SCRATCH = Path(tempfile.mkdtemp(prefix="warranty-tests-"))
+os.environ.setdefault("WARRANTY_DATABASE_URL", f"sqlite:///{_SCRATCH / 'warranty.db'}")
+os.environ.setdefault("WARRANTY_ARTIFACT_DIR", str(_SCRATCH / "artifacts"))
+os.environ.setdefault("WARRANTY_TRAINING_N_JOBS", "1")
+os.environ.setdefault("WARRANTY_SVM_TIME_BUDGET_SECONDS", "5")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import feature_store, models  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.fleet_simulator import write_fleet_to_database  # noqa: E402
+
+TRAINING_FLEET_SIZE = 400
+
+
+def clear_database() -> None:
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    """Session on an empty schema; every row is removed afterwards."""
+    models.ensure_schema(engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+        clear_database()
+
+
+@pytest.fixture
+def fleet(db):
+    """Small simulated fleet with its derived features built."""
+    write_fleet_to_database(db, 60, seed=3)
+    feature_store.refresh_stale_features(db)
+    return db
+
+
+@pytest.fixture(scope="session")
+def trained():
+    """(registry, training frame) of models fitted once on a simulated fleet."""
+    from app.generate_synthetic_data_and_train import (
+        build_training_dataframe,
+        train_models_from_frame,
+    )
+
+    models.ensure_schema(engine)
+    session = SessionLocal()
+    try:
+        write_fleet_to_database(session, TRAINING_FLEET_SIZE, seed=11)
+        feature_store.refresh_stale_features(session)
+        frame = build_training_dataframe(session)
+    finally:
+        session.close()
+        clear_database()
+    return train_models_from_frame(frame), frame
+
+
+@pytest.fixture
+def serving(trained):
+    """Publish the trained models as the serving registry for one test."""
+    from app import generate_synthetic_data_and_train as gen
+
+    previous = gen.get_model_registry()
+    gen.set_model_registry(trained[0])
+    try:
+        yield gen.get_model_registry()
+    finally:
+        gen.set_model_registry(previous)
+
+
+@pytest.fixture
+def client():
+    """TestClient for the app. It is not entered, so startup training does not run."""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def artifact_store():
+    """The scratch artifact directory; its manifest is removed afterwards."""
+    from app import model_artifacts
+
+    yield model_artifacts.ARTIFACT_DIR
+    (model_artifacts.ARTIFACT_DIR / model_artifacts.MANIFEST_NAME).unlink(missing_ok=True)
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from app import models
+from app.generate_synthetic_data_and_train import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    ensemble_scores,
+    ensemble_weights,
+    predict_with_entry,
+    predict_with_registry,
+    score_vehicles_all_models,
+)
+
+
+def test_one_pass_matches_each_model(trained):
+    registry, frame = trained
+    rows = frame[FEATURE_NUMERIC + FEATURE_CATEGORICAL].head(40)
+    together = predict_with_registry(registry, rows)
+    for name, entry in registry.items():
+        np.testing.assert_allclose(together[name], predict_with_entry(entry, rows), err_msg=name)
+
+
+def test_one_pass_without_compiled_scorers(trained):
+    registry, frame = trained
+    rows = frame[FEATURE_NUMERIC + FEATURE_CATEGORICAL].head(40)
+    plain = {name: dict(entry, compiled=None) for name, entry in registry.items()}
+    together = predict_with_registry(plain, rows)
+    for name, entry in registry.items():
+        expected = entry["pipeline"].predict_proba(rows)[:, 1]
+        np.testing.assert_allclose(together[name], expected, err_msg=name)
+
+
+@pytest.mark.parametrize(
+    "aucs, expected",
+    [
+        ({"a": 0.9, "b": 0.7}, {"a": 2 / 3, "b": 1 / 3}),
+        ({"a": 0.8, "b": 0.4}, {"a": 1.0, "b": 0.0}),
+        ({"a": 0.5, "b": 0.3}, {"a": 0.5, "b": 0.5}),
+    ],
+)
+def test_ensemble_weights(aucs, expected):
+    weights = ensemble_weights({name: {"auc": auc} for name, auc in aucs.items()})
+    assert weights == pytest.approx(expected)
+
+
+def test_ensemble_is_the_weighted_mean():
+    registry = {"a": {"auc": 0.9}, "b": {"auc": 0.7}}
+    scores = {"a": np.array([0.3, 0.9]), "b": np.array([0.6, 0.0])}
+    np.testing.assert_allclose(ensemble_scores(registry, scores), [0.4, 0.6])
+
+
+def test_all_model_scores_are_stored_once(fleet, serving):
+    vehicles = fleet.query(models.Vehicle).order_by(models.Vehicle.id).limit(10).all()
+    first, ensemble = score_vehicles_all_models(fleet, vehicles, include_ensemble=True)
+    assert set(first) == set(serving)
+    assert fleet.query(models.VehicleRiskScore).count() == 10 * len(serving)
+    again, _ = score_vehicles_all_models(fleet, vehicles)
+    for name in serving:
+        np.testing.assert_array_equal(again[name], first[name])
+    np.testing.assert_allclose(ensemble, ensemble_scores(serving, first))
+
+
+def test_listing_with_all_models_and_ensemble(fleet, serving, client):
+    rows = client.get("/vehicles", params={"limit": 5, "all_models": True, "ensemble": True})
+    assert rows.status_code == 200
+    for row in rows.json():
+        assert set(row["model_scores"]) == set(serving)
+        assert 0.0 <= row["ensemble_score"] <= 1.0
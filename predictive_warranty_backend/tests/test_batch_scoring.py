@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from app import models
+from app.generate_synthetic_data_and_train import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    predict_risk_batch,
+    predict_vehicle_risk,
+)
+
+
+def test_batch_scores_match_row_by_row(trained, serving):
+    _, frame = trained
+    rows = frame[FEATURE_NUMERIC + FEATURE_CATEGORICAL].head(25)
+    for name, entry in serving.items():
+        batch = predict_risk_batch(rows, name)
+        single = [
+            entry["pipeline"].predict_proba(rows.iloc[[i]])[:, 1][0] for i in range(len(rows))
+        ]
+        np.testing.assert_allclose(batch, single, atol=1e-9, err_msg=name)
+
+
+def test_vehicle_rows_score_like_a_frame(fleet, serving):
+    vehicles = fleet.query(models.Vehicle).order_by(models.Vehicle.id).all()
+    for name in serving:
+        batch = predict_risk_batch(vehicles, name)
+        assert batch.shape == (len(vehicles),)
+        assert batch[0] == pytest.approx(predict_vehicle_risk(vehicles[0], name), abs=1e-12)
+
+
+def test_batch_scoring_of_no_rows(serving):
+    assert len(predict_risk_batch([], "decision_tree")) == 0
@@ -0,0 +1,128 @@
+import io
+
+import pandas as pd
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+from app.bulk_load import BulkLoadError, load_file
+
+
+def _vehicle_count(db) -> int:
+    return db.execute(select(func.count()).select_from(models.Vehicle.__table__)).scalar()
+
+
+def _dealership_csv(rows) -> io.BytesIO:
+    lines = ["id,name,city,state"] + [f"{i},Dealer {i},Austin,TX" for i in rows]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def test_load_assigns_ids_and_commits(db):
+    source = io.BytesIO(b"name,city,state\nA,Austin,TX\nB,Dallas,TX\n")
+    stats = load_file(db, source, "dealerships", "csv")
+    assert stats["rows"] == {"dealerships": 2}
+    assert [d.id for d in db.query(models.Dealership).order_by(models.Dealership.id)] == [1, 2]
+
+
+def test_ids_continue_after_existing_rows_across_chunks(db):
+    load_file(db, _dealership_csv([1, 2]), "dealerships", "csv")
+    source = io.BytesIO(b"name,city,state\n" + b"D,Austin,TX\n" * 5)
+    stats = load_file(db, source, "dealerships", "csv", chunk_size=2)
+    assert stats["total_rows"] == 5
+    ids = [d.id for d in db.query(models.Dealership).order_by(models.Dealership.id)]
+    assert ids == list(range(1, 8))
+
+
+def test_csv_values_are_coerced_to_column_types(fleet):
+    vehicle = fleet.query(models.Vehicle).first()
+    source = io.BytesIO(
+        b"vehicle_id,service_date,mileage,component,fault_code,action,cost,"
+        b"is_warranty_claim,ignored\n"
+        + f"{vehicle.id},2024-03-01,1200,brakes,B1,replace,99.5,True,x\n".encode()
+    )
+    load_file(fleet, source, "service_records", "csv")
+    record = (
+        fleet.query(models.ServiceRecord)
+        .filter(models.ServiceRecord.fault_code == "B1", models.ServiceRecord.cost == 99.5)
+        .one()
+    )
+    assert record.service_date.isoformat() == "2024-03-01"
+    assert record.is_warranty_claim is True
+
+
+def test_parquet_matches_csv(db, tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "dealers.parquet"
+    pd.read_csv(_dealership_csv([1, 2, 3])).to_parquet(path)
+    assert load_file(db, path, "dealerships")["rows"] == {"dealerships": 3}
+
+
+def test_missing_required_column_inserts_nothing(fleet):
+    before = _vehicle_count(fleet)
+    source = io.BytesIO(b"vin,model\nX1,Sedan\n")
+    with pytest.raises(BulkLoadError, match="Missing required columns"):
+        load_file(fleet, source, "vehicles", "csv")
+    assert _vehicle_count(fleet) == before
+
+
+def test_duplicate_id_rolls_back_every_chunk(db):
+    # The duplicate is in the third chunk; the first two must not survive
+    source = _dealership_csv([1, 2, 3, 4, 5, 1])
+    with pytest.raises(BulkLoadError, match="rolled back"):
+        load_file(db, source, "dealerships", "csv", chunk_size=2)
+    assert db.query(models.Dealership).count() == 0
+
+
+def _service_csv(vehicle_ids, header="vehicle_id,") -> io.BytesIO:
+    columns = "service_date,mileage,component,fault_code,action,cost,is_warranty_claim"
+    lines = [header + columns] + [
+        f"{vid},2024-03-01,1200,brakes,B1,replace,99.5,False" for vid in vehicle_ids
+    ]
+    return io.BytesIO("\n".join(lines).encode())
+
+
+@pytest.mark.parametrize(
+    "make_source, message",
+    [
+        (lambda vid: _service_csv([vid], header=""), "Missing required columns"),
+        (lambda vid: _service_csv([vid, ""]), "Empty values"),
+        (lambda vid: _service_csv([vid, 99_999]), r"Unknown vehicle ids .*\[99999\]"),
+    ],
+)
+def test_child_rows_need_a_known_vehicle(fleet, make_source, message):
+    vehicle_id = fleet.query(models.Vehicle.id).first()[0]
+    before = fleet.query(models.ServiceRecord).count()
+    with pytest.raises(BulkLoadError, match=message):
+        load_file(fleet, make_source(vehicle_id), "service_records", "csv")
+    assert fleet.query(models.ServiceRecord).count() == before
+
+
+def test_ingest_endpoint_rejects_orphan_rows_in_a_later_chunk(fleet, client):
+    vehicle_id = fleet.query(models.Vehicle.id).first()[0]
+    before = fleet.query(models.ServiceRecord).count()
+    source = _service_csv([vehicle_id] * 20_000 + [99_999])
+    response = client.post(
+        "/admin/ingest/service_records",
+        files={"file": ("service.csv", source.getvalue(), "text/csv")},
+    )
+    assert response.status_code == 400
+    assert "99999" in response.json()["detail"]
+    assert fleet.query(models.ServiceRecord).count() == before
+
+
+def test_ingest_endpoint_rejects_unknown_tables(db, client):
+    response = client.post(
+        "/admin/ingest/nope",
+        files={"file": ("rows.csv", _dealership_csv([1]).getvalue(), "text/csv")},
+    )
+    assert response.status_code == 400
+
+
+def test_ingest_endpoint_returns_400_on_integrity_error(db, client):
+    load_file(db, _dealership_csv([1]), "dealerships", "csv")
+    response = client.post(
+        "/admin/ingest/dealerships",
+        files={"file": ("dealers.csv", _dealership_csv([2, 1]).getvalue(), "text/csv")},
+    )
+    assert response.status_code == 400
+    assert db.query(models.Dealership).count() == 1
@@ -0,0 +1,88 @@
+import numpy as np
+
+from app.compiled_scoring import VERIFY_ATOL, compile_pipeline
+from app.generate_synthetic_data_and_train import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    build_preprocessor,
+)
+
+FEATURES = FEATURE_NUMERIC + FEATURE_CATEGORICAL
+
+
+def _pipeline(estimator, frame):
+    from sklearn.pipeline import Pipeline
+
+    pipe = Pipeline(steps=[("prep", build_preprocessor()), ("est", estimator)])
+    return pipe.fit(frame[FEATURES], frame["failure_label"].astype(int))
+
+
+def test_every_trained_model_compiles(trained):
+    registry, _ = trained
+    assert {name: entry["compiled"] is not None for name, entry in registry.items()} == {
+        name: True for name in registry
+    }
+
+
+def test_compiled_scores_match_the_pipeline(trained):
+    registry, frame = trained
+    X = frame[FEATURES]
+    for name, entry in registry.items():
+        expected = entry["pipeline"].predict_proba(X)[:, 1]
+        np.testing.assert_allclose(
+            entry["compiled"].predict(X), expected, rtol=0, atol=VERIFY_ATOL, err_msg=name
+        )
+
+
+def test_row_objects_score_like_the_frame(trained):
+    registry, frame = trained
+    scorer = next(iter(registry.values()))["compiled"]
+    X = frame[FEATURES].head(30)
+    rows = list(X.itertuples(index=False))
+    np.testing.assert_array_equal(scorer.predict(rows), scorer.predict(X))
+
+
+def test_unseen_categories_score_like_the_pipeline(trained):
+    registry, frame = trained
+    X = frame[FEATURES].head(10).copy()
+    for col in FEATURE_CATEGORICAL:
+        X[col] = X[col].astype(object)
+        X.loc[X.index[::2], col] = "never-seen"
+    for name, entry in registry.items():
+        expected = entry["pipeline"].predict_proba(X)[:, 1]
+        np.testing.assert_allclose(
+            entry["compiled"].predict(X), expected, rtol=0, atol=VERIFY_ATOL, err_msg=name
+        )
+
+
+def test_exact_svc_matches_libsvm_probabilities(trained):
+    from sklearn.svm import SVC
+
+    _, frame = trained
+    sample = frame.sample(200, random_state=0)
+    pipe = _pipeline(SVC(kernel="rbf", probability=True, random_state=42), sample)
+    scorer = compile_pipeline(pipe, FEATURE_NUMERIC, FEATURE_CATEGORICAL, sample.head(50))
+    assert scorer is not None
+    np.testing.assert_allclose(
+        scorer.predict(frame[FEATURES]),
+        pipe.predict_proba(frame[FEATURES])[:, 1],
+        rtol=0,
+        atol=VERIFY_ATOL,
+    )
+
+
+def test_unsupported_estimator_is_not_compiled(trained):
+    from sklearn.ensemble import RandomForestClassifier
+
+    _, frame = trained
+    pipe = _pipeline(RandomForestClassifier(n_estimators=5, random_state=0), frame)
+    assert compile_pipeline(pipe, FEATURE_NUMERIC, FEATURE_CATEGORICAL, frame.head(20)) is None
+
+
+def test_failed_verification_falls_back(trained, monkeypatch):
+    from app import compiled_scoring
+
+    registry, frame = trained
+    monkeypatch.setattr(compiled_scoring, "_compile_estimator", lambda est: lambda X: X[:, 0])
+    pipe = registry["decision_tree"]["pipeline"]
+    assert compile_pipeline(pipe, FEATURE_NUMERIC, FEATURE_CATEGORICAL, frame.head(20)) is None
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app import database
+from app.database import SQLITE_PRAGMAS, create_db_engine, is_sqlite
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    db_engine = create_db_engine(f"sqlite:///{tmp_path / 'pragmas.db'}")
+    yield db_engine
+    db_engine.dispose()
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("sqlite:///./warranty.db", True),
+        ("sqlite+pysqlite:///:memory:", True),
+        ("postgresql+psycopg2://user@host/warranty", False),
+    ],
+)
+def test_is_sqlite(url, expected):
+    assert is_sqlite(url) is expected
+
+
+def test_file_database_gets_pragmas_and_a_pool(file_engine):
+    assert isinstance(file_engine.pool, QueuePool)
+    assert file_engine.pool.size() == database.POOL_SIZE
+    with file_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().upper() == "WAL"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == SQLITE_PRAGMAS["busy_timeout"]
+        # NORMAL is 1
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == SQLITE_PRAGMAS["cache_size"]
+        # MEMORY is 2
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2
+
+
+def test_in_memory_database_is_not_switched_to_wal():
+    memory_engine = create_db_engine("sqlite:///:memory:")
+    with memory_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar().lower() == "memory"
+    memory_engine.dispose()
+
@@ -0,0 +1,79 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import models
+from app.export import EXPORT_COLUMN_NAMES, iter_scored_chunks, stream_export
+from app.generate_synthetic_data_and_train import predict_with_entry, resolve_model
+from app.vehicle_queries import VehicleFilters
+
+
+FILTER_NAMES = [
+    "region",
+    "supplier_code",
+    "plant_code",
+    "model",
+    "model_year",
+    "mileage_min",
+    "mileage_max",
+]
+
+
+def _filters(**values):
+    # Outside a request the Query(None) defaults must be replaced
+    return VehicleFilters(**{name: values.get(name) for name in FILTER_NAMES})
+
+
+def test_chunks_cover_the_fleet_in_id_order(fleet, serving):
+    name, entry = resolve_model("decision_tree")
+    chunks = list(iter_scored_chunks(fleet, name, entry, chunk_size=25))
+    assert [len(chunk) for chunk in chunks] == [25, 25, 10]
+    frame = pd.concat(chunks, ignore_index=True)
+    ids = [vid for (vid,) in fleet.query(models.Vehicle.id).order_by(models.Vehicle.id)]
+    assert frame["id"].tolist() == ids
+    assert list(frame.columns) == EXPORT_COLUMN_NAMES + [
+        "risk_score",
+        "risk_bucket",
+        "model_name",
+        "model_version",
+    ]
+    vehicles = fleet.query(models.Vehicle).order_by(models.Vehicle.id).all()
+    np.testing.assert_allclose(frame["risk_score"], predict_with_entry(entry, vehicles))
+    assert (frame["model_version"] == entry["version"]).all()
+
+
+def test_filters_are_pushed_down(fleet, serving):
+    name, entry = resolve_model("decision_tree")
+    region = fleet.query(models.Vehicle.region).first()[0]
+    frame = pd.concat(iter_scored_chunks(fleet, name, entry, _filters(region=region), 10))
+    expected = fleet.query(models.Vehicle).filter_by(region=region).count()
+    assert len(frame) == expected and (frame["region"] == region).all()
+
+
+def test_ndjson_export(fleet, serving, client):
+    response = client.get("/vehicles/export", params={"format": "ndjson", "chunk_size": 100})
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 60 and len({row["id"] for row in rows}) == 60
+    assert response.headers["X-Model-Version"] == rows[0]["model_version"]
+
+
+def _streamed(export_format):
+    name, entry = resolve_model("decision_tree")
+    return b"".join(stream_export(export_format, name, entry, chunk_size=25))
+
+
+def test_csv_export_has_one_header(fleet, serving):
+    frame = pd.read_csv(io.BytesIO(_streamed("csv")))
+    assert len(frame) == 60
+    assert list(frame.columns[: len(EXPORT_COLUMN_NAMES)]) == EXPORT_COLUMN_NAMES
+
+
+def test_arrow_export_is_one_stream(fleet, serving):
+    pa = pytest.importorskip("pyarrow")
+    table = pa.ipc.open_stream(_streamed("arrow")).read_all()
+    assert table.num_rows == 60
+    assert table.column("id").to_pylist() == sorted(table.column("id").to_pylist())
@@ -0,0 +1,105 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import feature_store, models
+from app.sensor_ingest import ingest_sensor_readings
+
+
+def _linear_sums(days, slope):
+    vehicle_id = pd.Series(np.ones(len(days), dtype=int))
+    starts = pd.Series([datetime(2024, 1, 1) + timedelta(days=int(d)) for d in days])
+    values = 90.0 + slope * np.asarray(days, dtype=float)
+    return feature_store._trend_sums(vehicle_id, starts, np.ones(len(days)), values, values / 10)
+
+
+def test_trend_of_a_linear_series_is_its_slope():
+    trends = feature_store.trend_from_sums(_linear_sums(np.arange(30), 0.5))
+    assert trends.loc[1, "temperature_trend"] == pytest.approx(0.5)
+    assert trends.loc[1, "vibration_trend"] == pytest.approx(0.05)
+
+
+def test_readings_in_one_bucket_have_no_trend():
+    trends = feature_store.trend_from_sums(_linear_sums([3, 3, 3], 0.5))
+    assert (trends.loc[1] == 0.0).all()
+
+
+def test_trend_sums_add_up_across_batches():
+    whole = _linear_sums(np.arange(20), -0.2)
+    parts = _linear_sums(np.arange(12), -0.2) + _linear_sums(np.arange(12, 20), -0.2)
+    np.testing.assert_allclose(parts.to_numpy(), whole.to_numpy(), rtol=1e-12)
+
+
+def test_claim_history_is_not_a_feature():
+    # Warranty claims are recorded when the labelled failure happens
+    assert not any("claim" in col for col in feature_store.DERIVED_FEATURES)
+
+
+def _batch(vehicle_ids, day, seed):
+    rng = np.random.default_rng(seed)
+    n = 40 * len(vehicle_ids)
+    return pd.DataFrame(
+        {
+            "vehicle_id": np.repeat(vehicle_ids, 40),
+            "timestamp": [
+                datetime(2030, 1, 1) + timedelta(days=day, minutes=int(m))
+                for m in rng.integers(0, 2_000, n)
+            ],
+            "component": rng.choice(["engine", "brakes"], n),
+            "temperature": rng.normal(90 + day, 5, n),
+            "vibration": rng.gamma(2.0, 0.3, n),
+            "pressure": rng.normal(30, 2, n),
+        }
+    )
+
+
+def test_folded_sensor_batches_match_a_full_recompute(fleet):
+    vehicle_ids = [vid for (vid,) in fleet.query(models.Vehicle.id).limit(4)]
+    for day in range(5):
+        ingest_sensor_readings(fleet, _batch(vehicle_ids, day * 3, seed=day))
+
+    stored = pd.read_sql(
+        fleet.query(models.VehicleFeatures)
+        .filter(models.VehicleFeatures.vehicle_id.in_(vehicle_ids))
+        .statement,
+        fleet.get_bind(),
+    ).set_index("vehicle_id")
+    expected = feature_store.compute_vehicle_features(fleet, vehicle_ids).set_index("vehicle_id")
+    numeric = [c for c in feature_store.STORED_COLUMNS if c not in feature_store.DERIVED_CATEGORICAL]
+    np.testing.assert_allclose(
+        stored.loc[vehicle_ids, numeric].to_numpy(dtype=float),
+        expected.loc[vehicle_ids, numeric].to_numpy(dtype=float),
+        rtol=1e-6,
+        atol=1e-9,
+    )
+
+
+def test_child_rows_refresh_their_vehicle(fleet):
+    vehicle = fleet.query(models.Vehicle).first()
+    before = fleet.get(models.VehicleFeatures, vehicle.id).service_count
+    fleet.add(
+        models.ServiceRecord(
+            vehicle_id=vehicle.id,
+            service_date=date(2024, 1, 1),
+            mileage=vehicle.mileage,
+            component="brakes",
+            fault_code="B0001",
+            action="replace",
+            cost=100.0,
+            is_warranty_claim=False,
+        )
+    )
+    fleet.commit()
+    fleet.expire_all()
+    assert fleet.get(models.VehicleFeatures, vehicle.id).service_count == before + 1
+
+
+def test_stale_rows_are_pending_until_refreshed(fleet):
+    vehicle_ids = [vid for (vid,) in fleet.query(models.Vehicle.id).limit(3)]
+    assert feature_store.pending_vehicle_ids(fleet) == []
+    feature_store.mark_features_stale(fleet, vehicle_ids)
+    assert feature_store.pending_vehicle_ids(fleet) == vehicle_ids
+    assert feature_store.refresh_stale_features(fleet) == 3
+    assert feature_store.pending_vehicle_ids(fleet) == []
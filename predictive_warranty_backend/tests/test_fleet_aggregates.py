@@ -0,0 +1,91 @@
+from datetime import date
+
+import pytest
+
+from app import fleet_aggregates, models
+
+
+@pytest.fixture
+def aggregates(fleet, serving, monkeypatch):
+    """Calls fleet_risk_aggregates, counting the scoring passes it makes."""
+    fleet_aggregates.clear_aggregate_cache()
+    passes = []
+    materialize = fleet_aggregates.materialize_missing_scores
+
+    def counting(db, model_name, entry):
+        passes.append(model_name)
+        return materialize(db, model_name, entry)
+
+    monkeypatch.setattr(fleet_aggregates, "materialize_missing_scores", counting)
+
+    def call():
+        return fleet_aggregates.fleet_risk_aggregates(fleet, "region", "dt")
+
+    call.passes = passes
+    yield call
+    fleet_aggregates.clear_aggregate_cache()
+
+
+def test_cache_hit_skips_scoring(aggregates):
+    first = aggregates()
+    second = aggregates()
+    assert (first["refresh"], second["refresh"]) == ("full", "cached")
+    assert second["groups"] == first["groups"]
+    assert len(aggregates.passes) == 1
+    assert sum(group["vehicles"] for group in first["groups"]) == 60
+
+
+def test_new_vehicle_is_added_incrementally(aggregates, fleet):
+    aggregates()
+    template = fleet.query(models.Vehicle).first()
+    columns = [c.key for c in models.Vehicle.__table__.columns if c.key != "id"]
+    vehicle = models.Vehicle(**{c: getattr(template, c) for c in columns})
+    vehicle.vin = "TESTVIN0000000001"
+    fleet.add(vehicle)
+    fleet.commit()
+    after = aggregates()
+    assert after["refresh"] == "incremental"
+    assert sum(group["vehicles"] for group in after["groups"]) == 61
+    assert len(aggregates.passes) == 2
+
+
+def test_service_record_rescores_its_vehicle(aggregates, fleet):
+    before = aggregates()
+    vehicle = fleet.query(models.Vehicle).first()
+    fleet.add(
+        models.ServiceRecord(
+            vehicle_id=vehicle.id,
+            service_date=date(2024, 1, 1),
+            mileage=vehicle.mileage,
+            component="brakes",
+            fault_code="B0001",
+            action="replace",
+            cost=100.0,
+            is_warranty_claim=True,
+        )
+    )
+    fleet.commit()
+    after = aggregates()
+    # The record changes the vehicle's derived features, so its scores
+    # were invalidated and the cached sums can't be reused
+    assert after["refresh"] == "full"
+    events = lambda result: sum(group["service_events"] for group in result["groups"])
+    assert events(after) == events(before) + 1
+
+
+def test_invalidated_scores_force_a_full_recompute(aggregates, fleet):
+    aggregates()
+    vehicle = fleet.query(models.Vehicle).first()
+    vehicle.mileage += 50_000
+    fleet.commit()
+    after = aggregates()
+    assert after["refresh"] == "full"
+    assert len(aggregates.passes) == 2
+    assert sum(group["vehicles"] for group in after["groups"]) == 60
+
+
+def test_risk_scores_have_a_watermark_index(db):
+    columns = [
+        tuple(index.columns.keys()) for index in models.VehicleRiskScore.__table__.indexes
+    ]
+    assert ("model_name", "model_version", "computed_at") in columns
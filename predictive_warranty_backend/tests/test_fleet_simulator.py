@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import models
+from app.fleet_simulator import (
+    SENSOR_READINGS_PER_VEHICLE,
+    failure_risk,
+    simulate_fleet,
+    us_region_from_state,
+    write_fleet_to_database,
+)
+
+TODAY = date(2025, 6, 1)
+
+
+def _fleet(n, seed, chunk_size=1_000, first_vehicle_id=1):
+    chunks = list(
+        simulate_fleet(
+            n, seed=seed, chunk_size=chunk_size, first_vehicle_id=first_vehicle_id, today=TODAY
+        )
+    )
+    return {
+        table: pd.concat([chunk[table] for chunk in chunks], ignore_index=True)
+        for table in chunks[0]
+    }
+
+
+def _without_clock(fleet):
+    # Sensor timestamps count back from the wall clock
+    return {t: f.drop(columns="timestamp", errors="ignore") for t, f in fleet.items()}
+
+
+def test_same_seed_same_fleet():
+    a, b = _without_clock(_fleet(300, seed=5)), _without_clock(_fleet(300, seed=5))
+    for table in a:
+        pd.testing.assert_frame_equal(a[table], b[table])
+    c = _without_clock(_fleet(300, seed=6))
+    assert not a["vehicles"]["mileage"].equals(c["vehicles"]["mileage"])
+
+
+def test_fleet_shape_across_chunks():
+    fleet = _fleet(250, seed=1, chunk_size=100, first_vehicle_id=1_001)
+    vehicles = fleet["vehicles"]
+    assert vehicles["id"].tolist() == list(range(1_001, 1_251))
+    assert vehicles["vin"].is_unique
+    assert (fleet["production_logs"]["vehicle_id"] == vehicles["id"]).all()
+    per_vehicle = fleet["sensor_readings"].groupby("vehicle_id").size()
+    assert (per_vehicle == SENSOR_READINGS_PER_VEHICLE).all() and len(per_vehicle) == 250
+    assert fleet["service_records"]["vehicle_id"].isin(vehicles["id"]).all()
+    assert (vehicles["sale_date"] <= np.datetime64(TODAY)).all()
+
+
+def test_failure_risk_rules():
+    risk = failure_risk(
+        np.array([10_000, 100_000, 130_000, 130_000]),
+        np.array([90.0, 90.0, 105.0, 105.0]),
+        np.array([3.0, 3.0, 5.0, 5.0]),
+        np.array([0, 0, 3, 3]),
+        np.array(["SUP-A", "SUP-A", "SUP-A", "SUP-X"]),
+    )
+    np.testing.assert_allclose(risk, [0.03, 0.18, 0.63, 0.75])
+
+
+@pytest.mark.parametrize(
+    "state, region",
+    [
+        ("CA", "US-West"),
+        ("MI", "US-Midwest"),
+        ("TX", "US-South"),
+        ("NY", "US-Northeast"),
+        ("AK", "US-Other"),
+    ],
+)
+def test_regions(state, region):
+    assert us_region_from_state(state) == region
+
+
+def test_written_fleet_appends_with_fresh_ids(db):
+    write_fleet_to_database(db, 40, seed=1)
+    write_fleet_to_database(db, 25, seed=2)
+    ids = [vid for (vid,) in db.query(models.Vehicle.id).order_by(models.Vehicle.id)]
+    assert ids == list(range(1, 66))
+    readings = db.query(models.SensorReading).count()
+    assert readings == 65 * SENSOR_READINGS_PER_VEHICLE
+    assert db.query(models.VehicleSensorStats).filter_by(component="*").count() == 65
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from app import incremental_training, model_artifacts
+from app import generate_synthetic_data_and_train as gen
+from app.compiled_scoring import VERIFY_ATOL
+
+FEATURES = gen.FEATURE_NUMERIC + gen.FEATURE_CATEGORICAL
+PARTIAL_FIT_MODELS = {"neural_net", "sgd_logistic"}
+
+
+def test_partial_fit_support(trained):
+    registry, _ = trained
+    supported = {
+        name for name, entry in registry.items() if incremental_training.supports_partial_fit(entry)
+    }
+    assert supported == PARTIAL_FIT_MODELS
+
+
+def test_update_leaves_the_serving_pipeline_alone(trained):
+    registry, frame = trained
+    entry = registry["sgd_logistic"]
+    scaler = entry["pipeline"].named_steps["prep"].named_transformers_["num"]
+    seen, mean = scaler.n_samples_seen_, scaler.mean_.copy()
+    coef = entry["pipeline"].named_steps["est"].coef_.copy()
+
+    new = frame.head(80)
+    y = new["failure_label"].to_numpy(dtype=int)
+    updated = incremental_training._updated_entry(entry, new[FEATURES], y, 0.7, "v2")
+
+    assert scaler.n_samples_seen_ == seen
+    np.testing.assert_array_equal(scaler.mean_, mean)
+    np.testing.assert_array_equal(entry["pipeline"].named_steps["est"].coef_, coef)
+    new_scaler = updated["pipeline"].named_steps["prep"].named_transformers_["num"]
+    assert new_scaler.n_samples_seen_ == seen + len(new)
+    assert not np.array_equal(updated["pipeline"].named_steps["est"].coef_, coef)
+    assert (updated["version"], updated["auc"]) == ("v2", 0.7)
+
+
+def test_updated_model_compiles_to_the_same_scores(trained):
+    registry, frame = trained
+    new = frame.head(80)
+    y = new["failure_label"].to_numpy(dtype=int)
+    for name in PARTIAL_FIT_MODELS:
+        updated = incremental_training._updated_entry(registry[name], new[FEATURES], y, None, "v2")
+        assert updated["auc"] == registry[name]["auc"]
+        np.testing.assert_allclose(
+            updated["compiled"].predict(frame[FEATURES]),
+            updated["pipeline"].predict_proba(frame[FEATURES])[:, 1],
+            rtol=0,
+            atol=VERIFY_ATOL,
+            err_msg=name,
+        )
+
+
+def test_mean_shift_in_reference_deviations(trained):
+    registry, frame = trained
+    checkpoint = gen.training_checkpoint(registry, watermark=0)
+    X = frame[FEATURES].copy()
+    assert incremental_training._mean_shift(X, checkpoint) < 0.1
+    column = gen.FEATURE_NUMERIC.index("mileage")
+    X["mileage"] += 2 * checkpoint["reference_scale"][column]
+    assert incremental_training._mean_shift(X, checkpoint) == pytest.approx(2.0, abs=0.1)
+
+
+@pytest.mark.parametrize(
+    "mean_shift, auc, expected",
+    [
+        (0.1, {"sgd_logistic": 0.79}, 0),
+        (0.9, {"sgd_logistic": 0.79}, 1),
+        (0.1, {"sgd_logistic": 0.60}, 1),
+        (0.9, {"sgd_logistic": 0.60, "neural_net": 0.50}, 3),
+        # Single-class increments have no AUC
+        (0.1, {"sgd_logistic": None}, 0),
+    ],
+)
+def test_drift_reasons(mean_shift, auc, expected):
+    checkpoint = {"baseline_auc": {"sgd_logistic": 0.80, "neural_net": 0.80}}
+    record = {"mean_shift": mean_shift, "auc": auc}
+    assert len(incremental_training._drift_reasons(record, checkpoint)) == expected
+
+
+@pytest.fixture
+def incremental_setup(fleet, serving, artifact_store, monkeypatch):
+    """Serving models checkpointed before every vehicle of the fleet."""
+    model_artifacts.save_models(
+        dict(serving.items()),
+        "fingerprint",
+        gen.FEATURE_NUMERIC,
+        gen.FEATURE_CATEGORICAL,
+        checkpoint=gen.training_checkpoint(serving, watermark=0),
+    )
+    monkeypatch.setattr(incremental_training, "INCREMENTAL_MIN_ROWS", 10)
+    retrains = []
+    monkeypatch.setattr(
+        incremental_training, "initialize_models", lambda **kwargs: retrains.append(kwargs)
+    )
+    return serving, retrains
+
+
+def test_increment_updates_partial_fit_models_only(incremental_setup, monkeypatch):
+    serving, retrains = incremental_setup
+    monkeypatch.setattr(incremental_training, "MAX_AUC_DROP", 1.0)
+    monkeypatch.setattr(incremental_training, "MAX_MEAN_SHIFT", 100.0)
+    before = {name: serving[name]["version"] for name in serving}
+
+    record = incremental_training.update_models_incrementally()
+
+    assert record["action"] == "updated" and not retrains
+    assert record["rows"] == 60 and record["after_id"] == 0
+    after = gen.get_model_registry()
+    changed = {name for name in after if after[name]["version"] != before[name]}
+    assert changed == PARTIAL_FIT_MODELS
+    assert model_artifacts.read_checkpoint()["watermark"] == record["upto_id"]
+
+
+def test_drift_falls_back_to_a_full_retrain(incremental_setup, monkeypatch):
+    serving, retrains = incremental_setup
+    monkeypatch.setattr(incremental_training, "MAX_MEAN_SHIFT", -1.0)
+    before = {name: serving[name]["version"] for name in serving}
+
+    record = incremental_training.update_models_incrementally()
+
+    assert record["action"] == "full_retrain"
+    assert "feature mean shift" in record["reason"]
+    assert retrains == [{"force_retrain": True, "on_progress": None}]
+    after = gen.get_model_registry()
+    assert {name: after[name]["version"] for name in after} == before
+
+
+def test_too_few_new_vehicles_are_skipped(incremental_setup, monkeypatch):
+    _, retrains = incremental_setup
+    monkeypatch.setattr(incremental_training, "INCREMENTAL_MIN_ROWS", 1_000)
+    record = incremental_training.update_models_incrementally()
+    assert record["action"] == "skipped" and not retrains
+    assert model_artifacts.read_checkpoint()["watermark"] == 0
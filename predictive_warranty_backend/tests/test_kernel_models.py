@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from sklearn.metrics import roc_auc_score
+
+from app import kernel_models
+from app.kernel_models import NystroemSVM, _rbf_scale_gamma
+
+
+def _circles(n, seed=0):
+    # Not linearly separable: the label is the distance from the origin
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 2))
+    y = (np.hypot(X[:, 0], X[:, 1]) > 1.2).astype(int)
+    return X, y
+
+
+def test_learns_a_non_linear_boundary():
+    X, y = _circles(1_500)
+    model = NystroemSVM(n_components=100, random_state=0).fit(X, y)
+    X_test, y_test = _circles(500, seed=1)
+    assert roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]) > 0.95
+
+
+def test_probabilities_and_labels():
+    X, y = _circles(600)
+    model = NystroemSVM(n_components=50, random_state=0).fit(X, y)
+    proba = model.predict_proba(X[:20])
+    np.testing.assert_allclose(proba.sum(axis=1), 1.0)
+    assert ((proba >= 0) & (proba <= 1)).all()
+    assert set(model.predict(X)) <= {0, 1}
+
+
+def test_fit_is_reproducible():
+    X, y = _circles(600)
+    a = NystroemSVM(n_components=50, random_state=3).fit(X, y).predict_proba(X)
+    b = NystroemSVM(n_components=50, random_state=3).fit(X, y).predict_proba(X)
+    np.testing.assert_array_equal(a, b)
+
+
+def test_streams_mapped_chunks_when_too_large_to_cache(monkeypatch):
+    monkeypatch.setattr(kernel_models, "MAX_CACHED_VALUES", 0)
+    monkeypatch.setattr(kernel_models, "FIT_CHUNK_ROWS", 128)
+    X, y = _circles(1_500)
+    model = NystroemSVM(n_components=100, random_state=0).fit(X, y)
+    X_test, y_test = _circles(500, seed=1)
+    assert roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]) > 0.95
+
+
+def test_time_budget_stops_after_the_first_epoch():
+    X, y = _circles(600)
+    model = NystroemSVM(n_components=50, time_budget_seconds=0.0, random_state=0).fit(X, y)
+    assert model.n_epochs_ == 1 and model.budget_exhausted_
+
+
+def test_sparse_input_gamma_matches_dense():
+    X, _ = _circles(200)
+    assert _rbf_scale_gamma(sp.csr_matrix(X)) == pytest.approx(_rbf_scale_gamma(X))
+
+
+def test_rejects_more_than_two_classes():
+    X, _ = _circles(90)
+    with pytest.raises(ValueError):
+        NystroemSVM().fit(X, np.arange(90) % 3)
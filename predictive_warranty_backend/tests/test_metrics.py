@@ -0,0 +1,70 @@
+import time
+
+
+from app import metrics
+from app.metrics import Counter, Gauge, Histogram, stage, track_stages
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, ("/a",))
+    lines = histogram.render()
+    assert 'test_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{route="/a"} 2.65' in lines
+    assert 'test_seconds_count{route="/a"} 4' in lines
+
+
+def test_counter_and_gauge_render_labels_escaped():
+    counter = Counter("test_total", "Test.", ("name",))
+    counter.inc(('a"b',), 2)
+    counter.inc(('a"b',))
+    gauge = Gauge("test_bytes", "Test.")
+    gauge.set(7)
+    assert counter.render()[-1] == 'test_total{name="a\\"b"} 3.0'
+    assert gauge.render() == ["# HELP test_bytes Test.", "# TYPE test_bytes gauge", "test_bytes 7"]
+
+
+def test_stage_times_only_recorded_inside_a_request():
+    with stage("scoring"):
+        pass  # no current request: nothing to record, no error
+    with track_stages() as stages:
+        with stage("scoring"):
+            time.sleep(0.01)
+        with stage("scoring"):
+            pass
+    assert set(stages) == {"scoring"}
+    assert stages["scoring"] >= 0.01
+
+
+def test_other_stage_is_the_unattributed_remainder():
+    route = "/test-stages"
+    metrics.observe_request("GET", route, 200, 1.0, {"scoring": 0.25}, db_seconds=0.5)
+    lines = metrics.REQUEST_STAGE_SECONDS.render()
+    for name, seconds in [("db", 0.5), ("scoring", 0.25), ("serialization", 0.0), ("other", 0.25)]:
+        sample = f'warranty_http_request_stage_seconds_sum{{route="{route}",stage="{name}"}}'
+        assert f"{sample} {seconds}" in lines, name
+
+
+def test_statement_operations_are_bounded():
+    metrics.observe_statement("  select 1", 0.001)
+    metrics.observe_statement("VACUUM", 0.001)
+    text = "\n".join(metrics.DB_STATEMENT_SECONDS.render())
+    assert 'operation="SELECT"' in text
+    assert 'operation="OTHER"' in text
+    assert "VACUUM" not in text
+
+
+def test_metrics_endpoint_reports_route_templates(fleet, serving, client):
+    vehicle_id = client.get("/vehicles", params={"limit": 1}).json()[0]["id"]
+    response = client.get(f"/vehicles/{vehicle_id}")
+    assert int(response.headers["X-DB-Query-Count"]) > 0
+
+    body = client.get("/metrics")
+    assert body.headers["content-type"] == metrics.PROMETHEUS_CONTENT_TYPE
+    text = body.text
+    assert 'route="/vehicles/{vehicle_id}"' in text
+    assert f'route="/vehicles/{vehicle_id}"' not in text
+    assert 'warranty_http_request_stage_seconds_count{route="/vehicles",stage="scoring"}' in text
@@ -0,0 +1,105 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app import generate_synthetic_data_and_train as gen
+from app import model_artifacts, models
+
+
+def _add_service_record(db, vehicle):
+    db.add(
+        models.ServiceRecord(
+            vehicle_id=vehicle.id,
+            service_date=date(2024, 1, 1),
+            mileage=vehicle.mileage,
+            component="brakes",
+            fault_code="B0001",
+            action="replace",
+            cost=100.0,
+            is_warranty_claim=False,
+        )
+    )
+    db.commit()
+
+
+def test_source_fingerprint_is_stable(fleet):
+    upto = gen.max_vehicle_id(fleet)
+    assert gen.source_fingerprint(fleet, upto) == gen.source_fingerprint(fleet, upto)
+
+
+def test_source_fingerprint_follows_feature_refreshes(fleet):
+    upto = gen.max_vehicle_id(fleet)
+    before = gen.source_fingerprint(fleet, upto)
+    _add_service_record(fleet, fleet.query(models.Vehicle).first())
+    assert gen.source_fingerprint(fleet, upto) != before
+
+
+def test_source_fingerprint_covers_configs(fleet):
+    marks = gen.training_watermarks(fleet, gen.max_vehicle_id(fleet))
+    signature = gen.model_config_signature()
+    fingerprint = lambda sig: model_artifacts.source_fingerprint(
+        marks, gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL, sig
+    )
+    assert fingerprint(signature) != fingerprint(signature + "changed")
+
+
+def _fingerprint(frame, signature=None):
+    signature = signature or gen.model_config_signature()
+    return model_artifacts.training_fingerprint(
+        frame, gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL, signature
+    )
+
+
+def test_training_fingerprint_covers_data_and_configs(trained):
+    _, frame = trained
+    fingerprint = _fingerprint(frame)
+    assert fingerprint == _fingerprint(frame.copy())
+    assert fingerprint != _fingerprint(frame.head(len(frame) - 1))
+    assert fingerprint != _fingerprint(frame, gen.model_config_signature() + "changed")
+
+
+def test_stored_pipelines_round_trip(trained, artifact_store):
+    registry, frame = trained
+    model_artifacts.save_models(registry, "abc", gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL)
+    stored = model_artifacts.load_manifest("abc")["models"]
+    assert set(stored) == set(registry)
+    rows = frame[gen.FEATURE_NUMERIC + gen.FEATURE_CATEGORICAL].head(20)
+    for name, entry in registry.items():
+        assert stored[name]["version"] == entry["version"]
+        pipeline = model_artifacts.load_pipeline(stored[name]["file"])
+        np.testing.assert_array_equal(
+            pipeline.predict_proba(rows), entry["pipeline"].predict_proba(rows)
+        )
+
+
+def test_other_fingerprint_or_broken_manifest_means_retrain(trained, artifact_store):
+    model_artifacts.save_models(trained[0], "abc", gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL)
+    assert model_artifacts.load_manifest("other") is None
+    (artifact_store / model_artifacts.MANIFEST_NAME).write_text("{not json")
+    assert model_artifacts.load_manifest("abc") is None
+
+
+@pytest.fixture
+def stored_models(fleet, trained, artifact_store):
+    registry = trained[0]
+    model_artifacts.save_models(
+        registry,
+        gen.source_fingerprint(fleet, gen.max_vehicle_id(fleet)),
+        gen.FEATURE_NUMERIC,
+        gen.FEATURE_CATEGORICAL,
+    )
+    return registry
+
+
+def test_startup_with_matching_artifacts_skips_the_training_read(
+    stored_models, fleet, monkeypatch
+):
+    def no_read(*args, **kwargs):
+        raise AssertionError("the training table was read")
+
+    monkeypatch.setattr(gen, "build_training_dataframe", no_read)
+    registry = gen.load_or_train_models(fleet)
+    assert {name: registry[name]["version"] for name in registry} == {
+        name: entry["version"] for name, entry in stored_models.items()
+    }
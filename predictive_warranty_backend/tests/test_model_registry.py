@@ -0,0 +1,135 @@
+import threading
+import time
+
+import pytest
+
+from app import models
+from app.model_registry import (
+    ModelCache,
+    ModelEntry,
+    ModelRegistry,
+    build_registry,
+    parse_model_ref,
+)
+
+
+def _loader(calls, key, delay=0.0):
+    def load():
+        calls.append(key)
+        time.sleep(delay)
+        return {"pipeline": f"pipe-{key}", "compiled": None}
+
+    return load
+
+
+def test_least_recently_used_is_evicted():
+    cache = ModelCache(max_bytes=250)
+    calls = []
+    for key in ["a", "b"]:
+        cache.get((key, "1"), _loader(calls, key), 100)
+    cache.get(("a", "1"), _loader(calls, "a"), 100)  # hit: "b" is now oldest
+    cache.get(("c", "1"), _loader(calls, "c"), 100)
+
+    assert calls == ["a", "b", "c"]
+    assert ("b", "1") not in cache
+    assert ("a", "1") in cache and ("c", "1") in cache
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+    assert stats["resident"] == ["a@1", "c@1"] and stats["resident_bytes"] == 200
+
+
+def test_evicted_version_reloads_on_next_use():
+    cache = ModelCache(max_bytes=100)
+    calls = []
+    cache.get(("a", "1"), _loader(calls, "a"), 100)
+    cache.get(("b", "1"), _loader(calls, "b"), 100)
+    assert cache.get(("a", "1"), _loader(calls, "a"), 100)["pipeline"] == "pipe-a"
+    assert calls == ["a", "b", "a"]
+
+
+def test_oversized_version_stays_resident_alone():
+    cache = ModelCache(max_bytes=50)
+    cache.get(("big", "1"), _loader([], "big"), 500)
+    assert ("big", "1") in cache
+    assert cache.stats()["resident"] == ["big@1"]
+
+
+def test_concurrent_first_requests_load_once():
+    cache = ModelCache(max_bytes=1_000)
+    calls = []
+    loader = _loader(calls, "a", delay=0.05)
+    threads = [
+        threading.Thread(target=cache.get, args=(("a", "1"), loader, 100)) for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert calls == ["a"]
+
+
+def _entry(cache, name, version, calls):
+    meta = {"name": name, "version": version, "auc": 0.7, "type": "T", "description": ""}
+    return ModelEntry(meta, _loader(calls, f"{name}@{version}"), 100, cache=cache)
+
+
+def test_entry_metadata_does_not_load_the_artifact():
+    cache = ModelCache(max_bytes=1_000)
+    calls = []
+    entry = _entry(cache, "dt", "2", calls)
+    assert (entry["version"], entry["auc"]) == ("2", 0.7)
+    assert not entry.loaded and calls == []
+    assert entry["pipeline"] == "pipe-dt@2"
+    assert entry.loaded and calls == ["dt@2"]
+
+
+def test_registry_versions():
+    cache = ModelCache(max_bytes=1_000)
+    calls = []
+    serving = _entry(cache, "dt", "3", calls)
+    history = [_entry(cache, "dt", "2", calls), _entry(cache, "dt", "1", calls)]
+    registry = ModelRegistry({"dt": serving}, {"dt": history})
+
+    assert list(registry) == ["dt"]
+    assert registry.versions("dt") == ["3", "2", "1"]
+    assert registry.version("dt", "3") is serving
+    assert registry.version("dt", "1")["pipeline"] == "pipe-dt@1"
+    assert registry.version("dt", "9") is None
+    assert registry.version("svm", "3") is None
+
+
+@pytest.mark.parametrize(
+    "ref, expected",
+    [("dt", ("dt", None)), ("dt@20240101", ("dt", "20240101")), ("dt@", ("dt", None))],
+)
+def test_parse_model_ref(ref, expected):
+    assert parse_model_ref(ref) == expected
+
+
+def test_stored_versions_are_reachable_by_name_and_version(trained, artifact_store):
+    from app import generate_synthetic_data_and_train as gen
+    from app import model_artifacts
+
+    registry, _ = trained
+    model_artifacts.save_models(
+        registry, "first", gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL, directory=artifact_store
+    )
+    newer = {name: dict(entry, version="newer") for name, entry in registry.items()}
+    model_artifacts.save_models(
+        newer, "second", gen.FEATURE_NUMERIC, gen.FEATURE_CATEGORICAL, directory=artifact_store
+    )
+    stored = build_registry(model_artifacts.read_manifest(artifact_store), directory=artifact_store)
+
+    old_version = registry["decision_tree"]["version"]
+    assert stored.versions("decision_tree") == ["newer", old_version]
+    old = stored.version("decision_tree", old_version)
+    assert old["pipeline"] is not None
+
+
+def test_unknown_version_is_a_404(fleet, serving, client):
+    vehicle_id = fleet.query(models.Vehicle.id).first()[0]
+    version = serving["decision_tree"]["version"]
+    ok = client.get(f"/vehicles/{vehicle_id}", params={"model_name": f"decision_tree@{version}"})
+    assert ok.status_code == 200
+    missing = client.get(f"/vehicles/{vehicle_id}", params={"model_name": "decision_tree@nope"})
+    assert missing.status_code == 404
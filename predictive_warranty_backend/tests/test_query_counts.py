@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import text
+
+from app.db_instrumentation import track_queries
+
+
+def _query_count(client, url, **params) -> int:
+    response = client.get(url, params=params)
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-DB-Query-Count"])
+
+
+def test_track_queries_counts_statements(db):
+    with track_queries() as stats:
+        db.execute(text("SELECT 1"))
+        db.execute(text("SELECT 2"))
+    assert stats.statements == 2
+    assert stats.seconds > 0
+    with track_queries() as nested:
+        db.execute(text("SELECT 3"))
+    assert (stats.statements, nested.statements) == (2, 1)
+
+
+@pytest.mark.parametrize("extra", [{}, {"all_models": True, "ensemble": True}])
+def test_vehicle_list_queries_do_not_grow_with_page_size(fleet, serving, extra, client):
+    # First call materializes the missing scores
+    _query_count(client, "/vehicles", limit=50, **extra)
+    small = _query_count(client, "/vehicles", limit=5, **extra)
+    large = _query_count(client, "/vehicles", limit=50, **extra)
+    assert small == large
+    # Page read plus one read of the stored scores for every model
+    assert large <= 2
+
+
+def test_vehicle_detail_query_count_is_fixed(fleet, serving, client):
+    ids = [row["id"] for row in client.get("/vehicles", params={"limit": 10}).json()]
+    counts = {_query_count(client, f"/vehicles/{vehicle_id}") for vehicle_id in ids}
+    assert len(counts) == 1
+    # Vehicle with joins, its stored score, its service history
+    assert counts.pop() <= 3
+
+
+def test_query_count_header_is_per_request(fleet, serving, client):
+    _query_count(client, "/vehicles", limit=5)
+    assert _query_count(client, "/health") == 0
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import models, risk_scores
+from app.database import SessionLocal
+from app.generate_synthetic_data_and_train import score_vehicles
+
+
+def _vehicle_ids(db, n):
+    return [vid for (vid,) in db.query(models.Vehicle.id).order_by(models.Vehicle.id).limit(n)]
+
+
+def test_storing_existing_keys_replaces_them(fleet):
+    ids = _vehicle_ids(fleet, 3)
+    risk_scores.store_risk_scores(fleet, "dt", "v1", ids, [0.1, 0.2, 0.3])
+    risk_scores.store_risk_scores(fleet, "dt", "v1", ids[1:], [0.5, 0.6])
+    fleet.commit()
+    assert risk_scores.load_risk_scores(fleet, "dt", "v1", ids) == dict(
+        zip(ids, [0.1, 0.5, 0.6])
+    )
+
+
+def test_second_writer_of_a_missed_key_does_not_conflict(fleet):
+    ids = _vehicle_ids(fleet, 2)
+    # Both requests found no stored score; the second stores after the
+    # first already committed the same keys
+    other = SessionLocal()
+    try:
+        assert risk_scores.load_risk_scores(other, "dt", "v1", ids) == {}
+        risk_scores.store_risk_scores(fleet, "dt", "v1", ids, [0.1, 0.2])
+        fleet.commit()
+        risk_scores.store_risk_scores(other, "dt", "v1", ids, [0.1, 0.2])
+        other.commit()
+    finally:
+        other.close()
+    assert fleet.query(models.VehicleRiskScore).count() == 2
+
+
+def test_purges_keep_only_the_current_version_of_known_models(fleet):
+    ids = _vehicle_ids(fleet, 2)
+    for name, version in [("dt", "v1"), ("dt", "v2"), ("old", "v1")]:
+        risk_scores.store_risk_scores(fleet, name, version, ids, [0.1, 0.2])
+    risk_scores.purge_stale_scores(fleet, "dt", keep_version="v2")
+    risk_scores.purge_unknown_models(fleet, ["dt"])
+    fleet.commit()
+    stored = {(s.model_name, s.model_version) for s in fleet.query(models.VehicleRiskScore)}
+    assert stored == {("dt", "v2")}
+
+
+def test_misses_are_scored_and_stored(fleet, serving):
+    vehicles = fleet.query(models.Vehicle).order_by(models.Vehicle.id).limit(10).all()
+    version = serving["decision_tree"]["version"]
+    first = score_vehicles(fleet, vehicles, "decision_tree")
+    stored = risk_scores.load_risk_scores(
+        fleet, "decision_tree", version, [v.id for v in vehicles]
+    )
+    assert stored == {v.id: score for v, score in zip(vehicles, first.tolist())}
+    np.testing.assert_array_equal(score_vehicles(fleet, vehicles, "decision_tree"), first)
+
+
+def test_feature_change_drops_the_vehicles_scores(fleet, serving):
+    vehicles = fleet.query(models.Vehicle).order_by(models.Vehicle.id).limit(2).all()
+    score_vehicles(fleet, vehicles, "decision_tree")
+    vehicles[0].mileage += 1000
+    vehicles[1].vin = vehicles[1].vin + "X"  # not a model feature
+    fleet.commit()
+    remaining = {s.vehicle_id for s in fleet.query(models.VehicleRiskScore)}
+    assert remaining == {vehicles[1].id}
+
+
+class _Bind:
+    def __init__(self, dialect):
+        self.dialect = dialect
+
+
+class _Session:
+    def __init__(self, dialect):
+        self.bind = _Bind(dialect)
+
+    def get_bind(self):
+        return self.bind
+
+
+@pytest.mark.parametrize("dialect", [postgresql.dialect(), sqlite.dialect()])
+def test_writes_are_upserts(dialect):
+    stmt = risk_scores._upsert_statement(_Session(dialect))
+    sql = str(stmt.compile(dialect=dialect))
+    assert "ON CONFLICT (vehicle_id, model_name, model_version) DO UPDATE" in sql
+
+
+def test_other_backends_fall_back_to_delete_and_insert():
+    from sqlalchemy.dialects import mysql
+
+    assert risk_scores._upsert_statement(_Session(mysql.dialect())) is None
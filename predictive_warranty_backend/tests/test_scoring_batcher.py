@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.scoring_batcher import ScoringBatcher
+
+
+class _Recorder:
+    """score_fn doubling each row, recording batch sizes; can be held."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self, entry, rows):
+        self.batches.append(len(rows))
+        self.started.set()
+        self.release.wait(5)
+        return np.asarray(rows, dtype=float) * 2
+
+
+def test_lone_caller_does_not_wait_for_the_window():
+    recorder = _Recorder()
+    batcher = ScoringBatcher(recorder, window_seconds=1.0, max_batch=8)
+    started = time.perf_counter()
+    assert batcher.score({"name": "m"}, 3) == 6.0
+    assert time.perf_counter() - started < 0.5
+    assert recorder.batches == [1]
+
+
+def test_callers_arriving_during_scoring_share_the_next_batch():
+    recorder = _Recorder()
+    recorder.release.clear()
+    batcher = ScoringBatcher(recorder, window_seconds=1.0, max_batch=8)
+    entry = {"name": "m"}
+    results = {}
+
+    def call(value):
+        results[value] = batcher.score(entry, value)
+
+    first = threading.Thread(target=call, args=(0,))
+    first.start()
+    assert recorder.started.wait(5)
+    # Queued while the first batch is being scored
+    others = [threading.Thread(target=call, args=(v,)) for v in range(1, 4)]
+    for thread in others:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while batcher._in_flight.get(id(entry)) != 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    recorder.release.set()
+    for thread in [first] + others:
+        thread.join(5)
+    assert time.perf_counter() - started < 0.5
+    assert recorder.batches == [1, 3]
+    assert results == {v: 2.0 * v for v in range(4)}
+
+
+def test_full_batch_closes_at_max_size():
+    recorder = _Recorder()
+    recorder.release.clear()
+    batcher = ScoringBatcher(recorder, window_seconds=1.0, max_batch=2)
+    entry = {"name": "m"}
+    threads = [threading.Thread(target=batcher.score, args=(entry, v)) for v in range(5)]
+    threads[0].start()
+    assert recorder.started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while batcher._in_flight.get(id(entry)) != 5 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    recorder.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert sorted(recorder.batches) == [1, 2, 2]
+
+
+def test_zero_window_scores_each_call_directly():
+    recorder = _Recorder()
+    batcher = ScoringBatcher(recorder, window_seconds=0, max_batch=8)
+    assert not batcher.enabled
+    assert [batcher.score({"name": "m"}, v) for v in (1, 2)] == [2.0, 4.0]
+    assert recorder.batches == [1, 1]
+
+
+def test_scoring_errors_reach_every_caller():
+    def failing(entry, rows):
+        raise ValueError("broken model")
+
+    batcher = ScoringBatcher(failing, window_seconds=0.2, max_batch=8)
+    errors = []
+
+    def call(value):
+        with pytest.raises(ValueError):
+            batcher.score({"name": "m"}, value)
+        errors.append(value)
+
+    threads = [threading.Thread(target=call, args=(v,)) for v in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert sorted(errors) == [0, 1, 2]
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import models
+from app.sensor_ingest import (
+    ALL_COMPONENTS,
+    METRICS,
+    _batch_stats,
+    ingest_sensor_readings,
+    merge_stats,
+    rebuild_sensor_stats,
+    stats_table,
+)
+
+KEYS = ["vehicle_id", "component"]
+
+
+def _readings(n, vehicle_ids=(1, 2, 3), seed=0, start=datetime(2024, 1, 1)):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "vehicle_id": rng.choice(vehicle_ids, n),
+            "timestamp": [start + timedelta(minutes=int(m)) for m in rng.integers(0, 10_000, n)],
+            "component": rng.choice(["engine", "brakes"], n),
+            "temperature": rng.normal(90, 8, n),
+            "vibration": rng.gamma(2.0, 0.3, n),
+            "pressure": rng.normal(30, 2, n) + 1e4,  # large offset: M2 must not cancel
+        }
+    )
+
+
+def _fold(state, batch):
+    # What fold_readings stores: merged rows replace the batch's keys
+    merged = merge_stats(state, _batch_stats(batch))
+    if state.empty:
+        return merged
+    untouched = state.merge(merged[KEYS], on=KEYS, how="left", indicator=True)
+    untouched = untouched[untouched["_merge"] == "left_only"].drop(columns="_merge")
+    return pd.concat([untouched, merged], ignore_index=True)
+
+
+def _sorted(frame):
+    return frame.sort_values(KEYS).reset_index(drop=True)
+
+
+def test_merged_batches_match_one_pass():
+    readings = _readings(3_000)
+    state = pd.DataFrame(columns=[c.name for c in stats_table.columns])
+    for lo, hi in [(0, 100), (100, 101), (101, 1_700), (1_700, 3_000)]:
+        state = _fold(state, readings.iloc[lo:hi])
+    expected = _sorted(_batch_stats(readings))
+    state = _sorted(state)
+
+    assert state[KEYS].values.tolist() == expected[KEYS].values.tolist()
+    np.testing.assert_array_equal(state["count"], expected["count"])
+    for metric in METRICS:
+        np.testing.assert_allclose(state[f"mean_{metric}"], expected[f"mean_{metric}"])
+        np.testing.assert_allclose(state[f"m2_{metric}"], expected[f"m2_{metric}"], rtol=1e-8)
+    assert (
+        pd.to_datetime(state["last_reading_at"]) == pd.to_datetime(expected["last_reading_at"])
+    ).all()
+
+
+def test_batch_stats_include_the_all_component_rows():
+    readings = _readings(200)
+    stats = _batch_stats(readings).set_index(KEYS)
+    for vid, group in readings.groupby("vehicle_id"):
+        overall = stats.loc[(vid, ALL_COMPONENTS)]
+        assert overall["count"] == len(group)
+        assert overall["mean_temperature"] == pytest.approx(group["temperature"].mean())
+        assert overall["m2_vibration"] == pytest.approx(
+            ((group["vibration"] - group["vibration"].mean()) ** 2).sum()
+        )
+
+
+def test_single_reading_has_zero_m2():
+    stats = _batch_stats(_readings(1))
+    assert (stats[[f"m2_{metric}" for metric in METRICS]] == 0).all().all()
+
+
+def test_ingested_batches_keep_whole_history_stats(fleet):
+    vehicle_ids = [vid for (vid,) in fleet.query(models.Vehicle.id).limit(3)]
+    # The simulated history was written outside ingestion
+    rebuild_sensor_stats(fleet)
+    for seed in (1, 2):
+        ingest_sensor_readings(
+            fleet, _readings(300, vehicle_ids, seed=seed, start=datetime(2030, 1, 1))
+        )
+    history = pd.read_sql(
+        fleet.query(models.SensorReading).statement, fleet.get_bind()
+    )
+    stored = pd.read_sql(fleet.query(models.VehicleSensorStats).statement, fleet.get_bind())
+    stored = stored.set_index(KEYS)
+    for vid in vehicle_ids:
+        group = history[history["vehicle_id"] == vid]
+        row = stored.loc[(vid, ALL_COMPONENTS)]
+        assert row["count"] == len(group)
+        for metric in METRICS:
+            values = group[metric].to_numpy()
+            assert row[f"mean_{metric}"] == pytest.approx(values.mean())
+            assert row[f"m2_{metric}"] == pytest.approx(((values - values.mean()) ** 2).sum())
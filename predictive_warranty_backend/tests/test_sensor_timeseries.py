@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import models
+from app.sensor_ingest import ingest_sensor_readings
+from app.sensor_timeseries import lttb, sensor_series
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 50), (1000, 3), (101, 100), (7, 5)])
+def test_lttb_keeps_exactly_the_budget(n, n_out):
+    rng = np.random.default_rng(0)
+    x = np.arange(n, dtype=float)
+    keep = lttb(x, rng.normal(size=n), n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+@pytest.mark.parametrize("n, n_out, expected", [(5, 10, 5), (5, 5, 5), (50, 2, 2), (0, 10, 0)])
+def test_lttb_small_inputs_and_budgets(n, n_out, expected):
+    x = np.arange(n, dtype=float)
+    assert len(lttb(x, x, n_out)) == expected
+
+
+def test_lttb_keeps_a_spike():
+    y = np.zeros(1000)
+    y[417] = 100.0
+    keep = lttb(np.arange(1000, dtype=float), y, 20)
+    assert 417 in keep
+
+
+@pytest.fixture
+def series_source(fleet):
+    reading = fleet.query(models.SensorReading).first()
+    return fleet, reading.vehicle_id, reading.component
+
+
+@pytest.mark.parametrize("method", ["minmax", "lttb"])
+def test_series_respects_the_point_budget(series_source, method):
+    db, vehicle_id, component = series_source
+    result = sensor_series(db, vehicle_id, component, "temperature", points=10, method=method)
+    assert 0 < result["points"] <= 10
+    assert len(result["timestamp"]) == result["points"]
+
+
+@pytest.fixture
+def dense_series(fleet):
+    """Three weeks of readings every 7 minutes, with rollups, on one vehicle."""
+    vehicle_id = fleet.query(models.Vehicle.id).first()[0]
+    first = datetime(2030, 1, 1)
+    n = 4_000
+    rng = np.random.default_rng(0)
+    readings = pd.DataFrame(
+        {
+            "vehicle_id": vehicle_id,
+            "timestamp": [first + timedelta(minutes=7 * i) for i in range(n)],
+            "component": "pump",
+            "temperature": rng.normal(90, 5, n),
+            "vibration": rng.gamma(2.0, 0.3, n),
+            "pressure": rng.normal(30, 2, n),
+        }
+    )
+    ingest_sensor_readings(fleet, readings)
+    return fleet, vehicle_id, first, readings["timestamp"].iloc[-1]
+
+
+def test_minmax_with_an_unaligned_start_stays_within_budget(dense_series):
+    db, vehicle_id, first, last = dense_series
+    for offset_minutes in (1, 59, 61, 23 * 60 + 59):
+        start = first + timedelta(minutes=offset_minutes)
+        for points in (10, 11, 17, 40):
+            result = sensor_series(
+                db, vehicle_id, "pump", "temperature", start=start, end=last, points=points
+            )
+            assert result["source"].startswith("rollup_")
+            assert 0 < result["points"] <= points, (offset_minutes, points)
+
+
+def test_aware_bounds_are_compared_as_utc(series_source):
+    db, vehicle_id, component = series_source
+    naive = sensor_series(db, vehicle_id, component, "temperature", points=50)
+    end = naive["end"].replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=2)))
+    aware = sensor_series(db, vehicle_id, component, "temperature", end=end, points=50)
+    assert aware["end"] == naive["end"]
+    assert aware["timestamp"] == naive["timestamp"]
+
+
+def test_aware_end_without_start_is_not_a_server_error(series_source, client):
+    db, vehicle_id, component = series_source
+    response = client.get(
+        f"/vehicles/{vehicle_id}/sensors/{component}",
+        params={"end": "2100-01-01T00:00:00Z", "points": 50},
+    )
+    assert response.status_code == 200
+    assert response.json()["points"] > 0
@@ -0,0 +1,80 @@
+import json
+from datetime import date, datetime
+
+import pytest
+
+from app import serialization
+from app.schemas import VehicleSummary
+from app.serialization import (
+    VEHICLE_SUMMARY_FIELDS,
+    add_model_score_columns,
+    add_model_scores,
+    dumps,
+    to_columns,
+)
+
+CONTENT = {
+    "id": 1,
+    "name": "sensor °C",
+    "service_date": date(2024, 3, 1),
+    "computed_at": datetime(2024, 3, 1, 12, 30),
+    "scores": [0.125, 0.5],
+}
+
+
+def test_dumps_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    decoded = json.loads(dumps(CONTENT))
+    assert decoded["service_date"] == "2024-03-01"
+    assert decoded["computed_at"] == "2024-03-01T12:30:00"
+    assert decoded["name"] == CONTENT["name"]
+
+
+def test_dumps_with_orjson_matches_fallback(monkeypatch):
+    pytest.importorskip("orjson")
+    fast = json.loads(dumps(CONTENT))
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert fast == json.loads(dumps(CONTENT))
+
+
+def test_dumps_rejects_unknown_types(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_to_columns_round_trips_rows():
+    rows = [{"a": 1, "b": "x"}, {"a": 2, "b": "y"}]
+    content = to_columns(rows, ["a", "b"])
+    assert content == {
+        "count": 2,
+        "fields": ["a", "b"],
+        "columns": {"a": [1, 2], "b": ["x", "y"]},
+    }
+
+
+def test_model_scores_are_added_in_both_shapes():
+    rows = [{"id": 1}, {"id": 2}]
+    add_model_scores(rows, {"svm": [0.12345, 0.5]}, [0.3333, 0.6666])
+    assert rows[0] == {"id": 1, "model_scores": {"svm": 0.123}, "ensemble_score": 0.333}
+
+    content = to_columns([{"id": 1}, {"id": 2}], VEHICLE_SUMMARY_FIELDS[:1])
+    add_model_score_columns(content, {"svm": [0.12345, 0.5]}, None)
+    assert content["fields"] == ["id", "model_scores"]
+    assert content["columns"]["model_scores"] == {"svm": [0.123, 0.5]}
+
+
+def test_vehicle_rows_validate_against_schema(fleet, serving, client):
+    rows = client.get("/vehicles", params={"limit": 10}).json()
+    assert len(rows) == 10
+    for row in rows:
+        assert list(row) == VEHICLE_SUMMARY_FIELDS
+        assert VehicleSummary(**row).dict(exclude_none=True) == row
+
+
+def test_columnar_vehicles_match_records(fleet, serving, client):
+    records = client.get("/vehicles", params={"limit": 20}).json()
+    columnar = client.get("/vehicles", params={"limit": 20, "format": "columnar"}).json()
+    assert columnar["count"] == len(records)
+    assert columnar["fields"] == VEHICLE_SUMMARY_FIELDS
+    assert to_columns(records, VEHICLE_SUMMARY_FIELDS) == columnar
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import generate_synthetic_data_and_train as gen
+from app.generate_synthetic_data_and_train import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    model_configs,
+    train_models_from_frame,
+)
+
+
+def test_models_share_one_fitted_preprocessor(trained):
+    registry, _ = trained
+    preprocessors = {id(entry["pipeline"].named_steps["prep"]) for entry in registry.values()}
+    assert len(preprocessors) == 1
+    assert len({entry["version"] for entry in registry.values()}) == 1
+
+
+def test_registry_keeps_config_order(trained):
+    registry, _ = trained
+    assert list(registry) == [name for name, *_ in model_configs()]
+    for entry in registry.values():
+        assert 0.0 <= entry["auc"] <= 1.0, entry["name"]
+
+
+def test_parallel_training_matches_sequential(trained, monkeypatch):
+    _, frame = trained
+    rows = frame[FEATURE_NUMERIC + FEATURE_CATEGORICAL].head(50)
+    states = []
+
+    monkeypatch.setattr(gen, "TRAINING_N_JOBS", 1)
+    sequential = train_models_from_frame(frame)
+    monkeypatch.setattr(gen, "TRAINING_N_JOBS", 2)
+    parallel = train_models_from_frame(frame, on_progress=lambda *event: states.append(event))
+
+    for name in sequential:
+        assert parallel[name]["auc"] == pytest.approx(sequential[name]["auc"]), name
+        np.testing.assert_allclose(
+            parallel[name]["pipeline"].predict_proba(rows),
+            sequential[name]["pipeline"].predict_proba(rows),
+            err_msg=name,
+        )
+    for name in sequential:
+        progress = [state for model, state in states if model == name]
+        assert progress == ["pending", "training", "ready"], name
+
+
+def test_empty_frame_is_rejected():
+    with pytest.raises(RuntimeError):
+        train_models_from_frame(pd.DataFrame())
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from app import models
+from app.generate_synthetic_data_and_train import (
+    FEATURE_CATEGORICAL,
+    FEATURE_NUMERIC,
+    TRAINING_DTYPES,
+    build_training_dataframe,
+    vehicles_to_feature_frame,
+)
+
+
+def test_columns_are_compactly_typed(db, fleet):
+    frame = build_training_dataframe(db)
+    assert len(frame) == 60
+    assert list(frame.columns) == FEATURE_NUMERIC + FEATURE_CATEGORICAL + ["failure_label"]
+    for col in FEATURE_CATEGORICAL:
+        assert isinstance(frame[col].dtype, pd.CategoricalDtype), col
+    for col in FEATURE_NUMERIC + ["failure_label"]:
+        assert frame[col].dtype == TRAINING_DTYPES[col], col
+
+
+def test_chunking_does_not_change_the_frame(db, fleet):
+    whole = build_training_dataframe(db)
+    chunked = build_training_dataframe(db, chunk_size=7)
+    # Categories are unioned across chunks, so the codes stay comparable
+    pd.testing.assert_frame_equal(chunked, whole)
+
+
+def test_id_range_is_half_open(db, fleet):
+    ids = [vid for (vid,) in db.query(models.Vehicle.id).order_by(models.Vehicle.id)]
+    after_id, upto_id = ids[9], ids[29]
+    frame = build_training_dataframe(db, after_id=after_id, upto_id=upto_id)
+    whole = build_training_dataframe(db)
+    assert len(frame) == 20
+    expected = whole.iloc[10:30].reset_index(drop=True)
+    pd.testing.assert_frame_equal(frame.astype(object), expected.astype(object))
+
+
+def test_empty_range_gives_empty_frame(db, fleet):
+    frame = build_training_dataframe(db, after_id=10**9)
+    assert frame.empty
+    assert list(frame.columns) == FEATURE_NUMERIC + FEATURE_CATEGORICAL + ["failure_label"]
+
+
+def test_matches_the_scoring_feature_frame(db, fleet):
+    vehicles = db.query(models.Vehicle).order_by(models.Vehicle.id).all()
+    scoring = vehicles_to_feature_frame(vehicles)
+    training = build_training_dataframe(db)
+    np.testing.assert_allclose(
+        training[FEATURE_NUMERIC].to_numpy(dtype=float),
+        scoring[FEATURE_NUMERIC].to_numpy(dtype=float),
+    )
+    for col in FEATURE_CATEGORICAL:
+        assert training[col].astype(str).tolist() == scoring[col].astype(str).tolist(), col
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from app import training
+from app.generate_synthetic_data_and_train import get_model_registry, set_model_registry
+
+
+@pytest.fixture
+def blocked_training(monkeypatch):
+    """Replace training with a run that waits for release and then
+    publishes the registry passed to release(). release.started is set
+    once the run has reported its first progress."""
+    gate = threading.Event()
+    started = threading.Event()
+    outcome = {}
+
+    def fake_initialize(force_retrain=False, on_progress=None):
+        on_progress("decision_tree", "training")
+        started.set()
+        gate.wait(5)
+        if "error" in outcome:
+            raise outcome["error"]
+        set_model_registry(outcome["registry"])
+        on_progress("decision_tree", "ready")
+
+    def release(registry=None, error=None):
+        if error is not None:
+            outcome["error"] = error
+        outcome["registry"] = registry
+        gate.set()
+        training.wait_for_training(5)
+
+    release.started = started
+    monkeypatch.setattr(training, "initialize_models", fake_initialize)
+    previous = get_model_registry()
+    yield release
+    gate.set()
+    training.wait_for_training(5)
+    set_model_registry(previous)
+
+
+def test_not_ready_until_the_first_registry_is_published(trained, blocked_training, client):
+    set_model_registry({})
+    assert training.start_training()
+    # The worker thread reports progress asynchronously
+    assert blocked_training.started.wait(5)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["state"] == "running"
+    assert response.json()["models"] == {"decision_tree": "training"}
+
+    blocked_training(trained[0])
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["state"] == "completed"
+    assert body["serving_models"] == {name: e["version"] for name, e in trained[0].items()}
+
+
+def test_one_run_at_a_time(serving, blocked_training, client):
+    assert training.start_training()
+    assert client.post("/admin/retrain").status_code == 409
+    # The previous models keep serving while the retrain runs
+    assert client.get("/ready").status_code == 200
+    blocked_training(serving)
+
+
+def test_failed_run_keeps_serving_previous_models(serving, blocked_training, client):
+    assert training.start_training(force_retrain=True)
+    blocked_training(error=RuntimeError("boom"))
+
+    body = client.get("/ready").json()
+    assert body["state"] == "failed"
+    assert "boom" in body["error"]
+    assert body["models"] == {"decision_tree": "failed"}
+    assert body["ready"]
+    assert get_model_registry() is serving
+
+
+def test_scoring_before_the_first_registry_is_a_503(fleet, serving, client):
+    set_model_registry({})
+    response = client.get("/vehicles", params={"limit": 5})
+    assert response.status_code == 503
+    assert "/ready" in response.json()["detail"]
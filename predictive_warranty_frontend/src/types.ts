@@ -3,6 +3,9 @@ export interface ModelInfo {
   model_type: string;
   auc: number;
   description: string;
+  version?: string;
+  versions?: string[];
+  loaded?: boolean;
 }
 
 export interface VehicleSummary {
@@ -22,6 +25,9 @@ export interface VehicleSummary {
   failure_label: boolean;
   risk_score: number;
   risk_bucket: string;
+  // Only with all_models=true / ensemble=true
+  model_scores?: Record<string, number>;
+  ensemble_score?: number;
 }
 
 export interface ServiceRecord {